@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of the Cam result decoding helpers
+
+Times collectBinaryArray, DB_convert2array and stringLookupConv on
+decoded getMotionDetectConfig / getWifiConfig answers, and the complete
+decoders Cam applies to them: with only the raw fields read ("decode.*")
+and with every derived field computed ("decode.*.all").
+
+    python benchmarks/bench_decode.py [-n ITERATIONS]
+"""
+
+import argparse
+
+from harness import Settings, benchmark, per_op
+from foscontrol.camera.base import CamBase
+from foscontrol.camera.commands import _decode_motion_detect_config, _decode_wifi_config
+from foscontrol.camera.result import ResultObj
+from foscontrol.camera.schedule import MotionSchedule
+from foscontrol.simulator import VirtualCamera
+from foscontrol.utils.dictionaries import BD_alarmAction, DC_WifiAuth, DC_motionDetectSensitivity
+
+# one column value per camera, as in a ResultBatch of a large fleet
+FLEET = 5000
+
+
+def _answers():
+    vcam = VirtualCamera("bench")
+    login = {"usr": "admin", "pwd": ""}
+    vcam.handle("setMotionDetectConfig", dict(
+        login, isEnable="1", linkage="13", sensitivity="2",
+        **{f"schedule{d}": str(0xFFFFFF000000 >> d) for d in range(7)},
+        **{f"area{r}": str(0x2AA >> (r % 2)) for r in range(10)}))
+    vcam.handle("setWifiConfig", dict(login, isEnable="1", ssid="camnet", authMode="2",
+                                      encryptType="4", psk="s3cr3t"))
+    return {cmd: vcam.handle(cmd, login)[2] for cmd in ("getMotionDetectConfig", "getWifiConfig")}
+
+
+def cases():
+    answers = _answers()
+    motion = CamBase._decode_response(answers["getMotionDetectConfig"], False, ["isEnable"])
+    wifi = CamBase._decode_response(answers["getWifiConfig"], False, None)
+    fresh = lambda res: ResultObj(dict(res.data))
+    linkage = [i % 16 for i in range(FLEET)]
+    sensitivity = [i % 5 for i in range(FLEET)]
+    return {
+        "collectBinaryArray.schedule": lambda: fresh(motion).collectBinaryArray(
+            "schedule", "_schedules", 48),
+        "collectBinaryArray.area": lambda: fresh(motion).collectBinaryArray("area", "_areas", 10),
+        "MotionSchedule.from_cgi": lambda: MotionSchedule.from_cgi(motion),
+        "MotionSchedule.compile": lambda: MotionSchedule.compile(
+            "mon-fri 07:00-09:00, 17:00-23:30; sat,sun 22:00-06:00"),
+        "DB_convert2array.linkage": lambda: fresh(motion).DB_convert2array(
+            "linkage", "_linkage", BD_alarmAction),
+        "stringLookupConv.authMode": lambda: fresh(wifi).stringLookupConv(
+            wifi.authMode, DC_WifiAuth, "_auth_desc"),
+        "decode.motionDetectConfig": lambda: _decode_motion_detect_config(fresh(motion)),
+        "decode.wifiConfig": lambda: _decode_wifi_config(fresh(wifi)),
+        "decode.motionDetectConfig.all": lambda: _decode_motion_detect_config(fresh(motion)).data,
+        "decode.wifiConfig.all": lambda: _decode_wifi_config(fresh(wifi)).data,
+        "copy.resultobj": lambda: fresh(motion),
+        f"toTuples.linkage.{FLEET}": lambda: BD_alarmAction.toTuples(linkage),
+        f"lookupMany.sensitivity.{FLEET}": lambda: DC_motionDetectSensitivity.lookupMany(
+            sensitivity),
+    }
+
+
+@benchmark("decode")
+def bench_decode(settings: Settings):
+    number = settings.scale(20000, 2000)
+    return [per_op(name, fn, number, settings) for name, fn in cases().items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    settings = Settings(repeat=3)
+    for name, fn in cases().items():
+        m = per_op(name, fn, args.iterations, settings)
+        print(f"{m.name:32} {m.value:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
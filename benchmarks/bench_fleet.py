@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Fleet fan-out scaling: one getDevState on 1 to 1000 simulated cameras
+
+Every simulated camera answers after a fixed latency, so the wall time
+shows how well CamFleet overlaps the round trips.
+
+    python benchmarks/bench_fleet.py [--latency SECONDS] [--concurrency N]
+"""
+
+import argparse
+
+from harness import Settings, benchmark, wall
+from foscontrol.fleet import CamFleet
+from foscontrol.simulator import Simulator, CameraProfile, CommandProfile
+from foscontrol.utils.network import ConnectionPool
+
+COUNTS = (1, 10, 100, 1000)
+
+
+def fan_out(fleet: CamFleet) -> None:
+    failed = [r for r in fleet.run("getDevState") if not r.ok]
+    if failed:
+        raise RuntimeError(f"{len(failed)} cameras failed, first: {failed[0].error}")
+
+
+def measure(settings: Settings, counts, latency: float, concurrency: int):
+    sim = Simulator()
+    sim.add_cameras(max(counts), profile=CameraProfile(CommandProfile(latency=latency)))
+    res = []
+    with sim:
+        inventory = sim.inventory()
+        for count in counts:
+            fleet = CamFleet(inventory[:count], max_concurrency=concurrency,
+                             pool=ConnectionPool())
+            try:
+                res.append(wall(f"fleet.getDevState.{count}", lambda: fan_out(fleet), settings,
+                                cameras=count, latency=latency, concurrency=concurrency))
+            finally:
+                fleet.close()
+    return res
+
+
+@benchmark("fleet")
+def bench_fleet(settings: Settings):
+    counts = COUNTS[:3] if settings.quick else COUNTS
+    return measure(settings, counts, latency=0.02, concurrency=64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    for m in measure(Settings(repeat=3), COUNTS, args.latency, args.concurrency):
+        cameras = m.params["cameras"]
+        print(f"{cameras:5} cameras: {m.value:7.3f} s  ({cameras / m.value:8.1f} cameras/s)")
+
+
+if __name__ == "__main__":
+    main()
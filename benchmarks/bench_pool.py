@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Requests/sec of CamBase.sendcommand with and without connection pooling
+
+Runs a simulated camera and issues getDevState polls through a fresh
+urlopen per call (the old transport), through the keep-alive
+ConnectionPool (the default transport) and through AsyncCamBase.
+
+    python benchmarks/bench_pool.py [-n REQUESTS]
+"""
+
+import time
+import asyncio
+import argparse
+
+from harness import Settings, benchmark, rate
+from foscontrol import CamBase, AsyncCamBase
+from foscontrol.simulator import Simulator, CameraProfile
+from foscontrol.utils.network import ConnectionPool, create_url_opener
+from foscontrol.utils.aionetwork import AsyncConnectionPool
+
+
+def run(cam: CamBase, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        cam.getDevState()
+    return requests / (time.perf_counter() - start)
+
+
+def run_async(host: str, port: int, requests: int) -> float:
+    async def polls():
+        cam = AsyncCamBase("http", host, port, "admin", "", pool=AsyncConnectionPool())
+        start = time.perf_counter()
+        for _ in range(requests):
+            await cam.getDevState()
+        return requests / (time.perf_counter() - start)
+    return asyncio.run(polls())
+
+
+@benchmark("roundtrip")
+def bench_roundtrip(settings: Settings):
+    requests = settings.scale(1000, 200)
+    sim = Simulator()
+    vcam = sim.add_camera(profile=CameraProfile(serialize=False))
+    with sim:
+        host, port = vcam.address
+        unpooled = CamBase("http", host, port, "admin", "", coalesce=[])
+        unpooled.url_opener = create_url_opener(None)
+        pooled = CamBase("http", host, port, "admin", "", pool=ConnectionPool(), coalesce=[])
+        return [
+            rate("sendcommand.urlopen", "req/s", lambda: run(unpooled, requests // 4),
+                 settings, requests=requests // 4),
+            rate("sendcommand.pooled", "req/s", lambda: run(pooled, requests),
+                 settings, requests=requests),
+            rate("sendcommand.async", "req/s", lambda: run_async(host, port, requests),
+                 settings, requests=requests),
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    sim = Simulator()
+    vcam = sim.add_camera(profile=CameraProfile(serialize=False))
+    with sim:
+        host, port = vcam.address
+        unpooled = CamBase("http", host, port, "admin", "")
+        unpooled.url_opener = create_url_opener(None)
+        pooled = CamBase("http", host, port, "admin", "", pool=ConnectionPool())
+
+        before = run(unpooled, args.requests)
+        after = run(pooled, args.requests)
+        aio = run_async(host, port, args.requests)
+
+    print(f"urlopen per request: {before:10.1f} req/s")
+    print(f"pooled keep-alive:   {after:10.1f} req/s  ({after / before:.2f}x)")
+    print(f"asyncio keep-alive:  {aio:10.1f} req/s  ({aio / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
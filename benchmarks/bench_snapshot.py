@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Snapshot throughput: snapPicture2 (whole body in memory) vs. snapPictureTo
+
+    python benchmarks/bench_snapshot.py [-n SNAPSHOTS] [--size BYTES]
+"""
+
+import io
+import time
+import argparse
+
+from harness import Settings, benchmark, rate
+from foscontrol import CamBase
+from foscontrol.simulator import Simulator, CameraProfile, VirtualCamera
+from foscontrol.utils.network import ConnectionPool
+
+# snapPicture2 answers are limited to 512000 bytes (see docs/cgi-notes.txt)
+SIZES = (60 * 1024, 500 * 1000)
+
+
+def throughput(fn, snapshots: int, size: int) -> float:
+    """MB/s of fn called snapshots times"""
+    start = time.perf_counter()
+    for _ in range(snapshots):
+        fn()
+    return snapshots * size / (time.perf_counter() - start) / 1e6
+
+
+def add_camera(sim: Simulator, size: int) -> VirtualCamera:
+    return sim.add_camera(f"snap{size}", profile=CameraProfile(snapshot_size=size,
+                                                               serialize=False))
+
+
+@benchmark("snapshot")
+def bench_snapshot(settings: Settings):
+    snapshots = settings.scale(100, 20)
+    sim = Simulator()
+    vcams = {size: add_camera(sim, size) for size in SIZES}
+    res = []
+    with sim:
+        for size, vcam in vcams.items():
+            cam = CamBase("http", *vcam.address, "admin", "", pool=ConnectionPool(), coalesce=[])
+            buf = bytearray(512000)
+            res.append(rate(f"snapPicture2.{size}", "MB/s",
+                            lambda: throughput(cam.snapPicture2, snapshots, size),
+                            settings, size=size, snapshots=snapshots))
+            res.append(rate(f"snapPictureTo.buffer.{size}", "MB/s",
+                            lambda: throughput(lambda: cam.snapPictureTo(buf), snapshots, size),
+                            settings, size=size, snapshots=snapshots))
+            res.append(rate(f"snapPictureTo.file.{size}", "MB/s",
+                            lambda: throughput(lambda: cam.snapPictureTo(io.BytesIO()),
+                                               snapshots, size),
+                            settings, size=size, snapshots=snapshots))
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--snapshots", type=int, default=200)
+    parser.add_argument("--size", type=int, default=SIZES[0])
+    args = parser.parse_args()
+
+    sim = Simulator()
+    vcam = add_camera(sim, args.size)
+    with sim:
+        cam = CamBase("http", *vcam.address, "admin", "", pool=ConnectionPool())
+        buf = bytearray(max(args.size, 512000))
+        whole = throughput(cam.snapPicture2, args.snapshots, args.size)
+        into = throughput(lambda: cam.snapPictureTo(buf), args.snapshots, args.size)
+    print(f"snapPicture2:         {whole:8.1f} MB/s")
+    print(f"snapPictureTo buffer: {into:8.1f} MB/s  ({into / whole:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
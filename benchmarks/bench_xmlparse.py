@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of CGI answer parsing: minidom DOM vs. flat scanner
+
+Also compares ResultObj with the typed records in time per answer and in
+memory per retained result.
+
+    python benchmarks/bench_xmlparse.py [-n ITERATIONS]
+"""
+
+import timeit
+import argparse
+import tracemalloc
+
+from harness import Measurement, Settings, benchmark, per_op
+from foscontrol.camera.base import CamBase
+from foscontrol.camera.commands import RECORDS
+from foscontrol.utils.xmlparse import parse_generic, parse_cgi_result
+
+
+def _doc(fields):
+    body = "".join(f"    <{k}>{v}</{k}>\n" for k, v in fields)
+    return f"<CGI_Result>\n{body}</CGI_Result>\n".encode()
+
+
+BODIES = {
+    "getDevState": _doc([
+        ("result", 0), ("IOAlarm", 0), ("motionDetectAlarm", 1), ("soundAlarm", 0),
+        ("record", 0), ("sdState", 0), ("sdFreeSpace", "0k"), ("sdTotalSpace", "0k"),
+        ("ntpState", 1), ("ddnsState", 0), ("url", "http%3A%2F%2Fxx0000.myfoscam.org%3A88"),
+        ("upnpState", 1), ("isWifiConnected", 0), ("wifiConnectedAP", ""),
+        ("infraLedState", 0)]),
+    "getDevInfo": _doc([
+        ("result", 0), ("productName", "FI9821W V2"), ("serialNo", "0000000000000001"),
+        ("devName", "Garden &amp; Gate"), ("mac", "00626E4A1C37"), ("year", 2016), ("mon", 5),
+        ("day", 30), ("hour", 10), ("min", 22), ("sec", 31), ("timeZone", 0),
+        ("firmwareVer", "1.11.1.18"), ("hardwareVer", "1.4.1.10")]),
+    "getMotionDetectConfig": _doc(
+        [("result", 0), ("isEnable", 1), ("linkage", 5), ("snapInterval", 1),
+         ("sensitivity", 1), ("triggerInterval", 0)]
+        + [(f"schedule{d}", 281474976710655) for d in range(7)]
+        + [(f"area{r}", 1023) for r in range(10)]),
+    "getWifiConfig": _doc([
+        ("result", 0), ("isEnable", 1), ("isUseWifi", 1), ("ssid", "camnet"),
+        ("netType", 0), ("encryptType", 4), ("psk", "s3cr3t%21"), ("authMode", 2),
+        ("keyFormat", 0), ("defaultKey", 1), ("key1", ""), ("key2", ""), ("key3", ""),
+        ("key4", ""), ("key1Len", 64), ("key2Len", 64), ("key3Len", 64), ("key4Len", 64)]),
+}
+
+
+def footprint(name: str, build, count: int = 2000) -> Measurement:
+    """Bytes allocated per result kept alive"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(count)]
+    size = (tracemalloc.get_traced_memory()[0] - before) / len(kept)
+    tracemalloc.stop()
+    return Measurement(name, "bytes", size, size, [size], False, {"count": count})
+
+
+@benchmark("xmlparse")
+def bench_xmlparse(settings: Settings):
+    number = settings.scale(5000, 500)
+    res = []
+    for name, body in BODIES.items():
+        res.append(per_op(f"xml.minidom.{name}", lambda: parse_generic(body), number // 5,
+                          settings, bytes=len(body)))
+        res.append(per_op(f"xml.scanner.{name}", lambda: parse_cgi_result(body), number,
+                          settings, bytes=len(body)))
+        # the whole conversion of an answer body into a ResultObj
+        res.append(per_op(f"resultobj.{name}",
+                          lambda: CamBase._decode_response(body, False, ["isEnable"]),
+                          number, settings, bytes=len(body)))
+        record = RECORDS[name]
+        res.append(per_op(f"record.{name}",
+                          lambda: CamBase._decode_response(body, False, None, record),
+                          number, settings, bytes=len(body)))
+    body = BODIES["getDevState"]
+    res.append(footprint("footprint.resultobj.getDevState",
+                         lambda: CamBase._decode_response(body, False, None)))
+    res.append(footprint("footprint.record.getDevState",
+                         lambda: CamBase._decode_response(body, False, None,
+                                                          RECORDS["getDevState"])))
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'command':24} {'minidom us':>11} {'scanner us':>11} {'speedup':>8}")
+    for name, body in BODIES.items():
+        assert parse_cgi_result(body) == parse_generic(body)
+        old = timeit.timeit(lambda: parse_generic(body), number=args.iterations)
+        new = timeit.timeit(lambda: parse_cgi_result(body), number=args.iterations)
+        print(f"{name:24} {old / args.iterations * 1e6:11.2f} "
+              f"{new / args.iterations * 1e6:11.2f} {old / new:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
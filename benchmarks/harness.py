@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Registry, timing and JSON result handling of the benchmark suite
+
+Benchmark modules register functions with ``@benchmark``; each takes a
+Settings object and returns a list of Measurements.  ``run.py`` collects
+and runs them and writes one JSON document per run, which can be compared
+with the result of another commit.
+"""
+
+import gc
+import sys
+import json
+import time
+import timeit
+import platform
+import statistics
+import subprocess
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, __file__.rsplit("/benchmarks/", 1)[0])
+
+
+class Settings(NamedTuple):
+    """Run-wide parameters"""
+    quick: bool = False
+    repeat: int = 5
+
+    def scale(self, full: int, quick: int) -> int:
+        return quick if self.quick else full
+
+
+class Measurement(NamedTuple):
+    """Outcome of one benchmark case
+
+    ``value`` is the median of the samples; ``higher_is_better`` tells the
+    comparison which direction is a regression.
+    """
+    name: str
+    unit: str
+    value: float
+    best: float
+    samples: List[float]
+    higher_is_better: bool
+    params: Dict[str, object] = {}
+
+
+BENCHMARKS: Dict[str, Callable[[Settings], List[Measurement]]] = {}
+
+
+def benchmark(group: str) -> Callable:
+    """Register a benchmark function under a group name"""
+    def register(fn: Callable[[Settings], List[Measurement]]) -> Callable:
+        if group in BENCHMARKS:
+            raise ValueError(f"Duplicate benchmark group: {group}")
+        BENCHMARKS[group] = fn
+        return fn
+    return register
+
+
+def per_op(name: str, fn: Callable[[], object], number: int, settings: Settings,
+           **params) -> Measurement:
+    """Microseconds per call of fn (timeit, gc disabled)"""
+    fn()  # warm up caches and lazy imports
+    timer = timeit.Timer(fn)
+    samples = [t / number * 1e6 for t in timer.repeat(settings.repeat, number)]
+    return Measurement(name, "us/op", statistics.median(samples), min(samples),
+                       samples, False, params)
+
+
+def rate(name: str, unit: str, fn: Callable[[], float], settings: Settings,
+         **params) -> Measurement:
+    """Throughput; fn performs one run and returns its amount of work per second"""
+    fn()
+    samples = []
+    for _ in range(settings.repeat):
+        gc.collect()
+        samples.append(fn())
+    return Measurement(name, unit, statistics.median(samples), max(samples),
+                       samples, True, params)
+
+
+def wall(name: str, fn: Callable[[], object], settings: Settings, **params) -> Measurement:
+    """Seconds of wall time per run of fn"""
+    fn()
+    samples = []
+    for _ in range(settings.repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return Measurement(name, "s", statistics.median(samples), min(samples),
+                       samples, False, params)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                             cwd=__file__.rsplit("/benchmarks/", 1)[0], timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def document(measurements: List[Measurement], settings: Settings) -> Dict[str, object]:
+    """JSON-serializable result of a run"""
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "quick": settings.quick,
+            "repeat": settings.repeat,
+        },
+        "results": [m._asdict() for m in measurements],
+    }
+
+
+def compare(old: Dict[str, object], new: Dict[str, object],
+            threshold: float = 0.10) -> List[str]:
+    """Print old vs. new per case; return the names that regressed by more than threshold"""
+    before = {r["name"]: r for r in old["results"]}
+    regressions = []
+    print(f"{'case':52} {'before':>12} {'after':>12} {'change':>8}")
+    for r in new["results"]:
+        o = before.get(r["name"])
+        if o is None or not o["value"] or not r["value"]:
+            continue
+        if r["higher_is_better"]:
+            change = r["value"] / o["value"] - 1.0
+        else:
+            change = o["value"] / r["value"] - 1.0
+        flag = ""
+        if change < -threshold:
+            regressions.append(r["name"])
+            flag = "  REGRESSION"
+        print(f"{r['name']:52} {o['value']:12.3f} {r['value']:12.3f} {change:+7.1%}{flag}")
+    return regressions
+
+
+def load(filename: str) -> Dict[str, object]:
+    with open(filename) as f:
+        return json.load(f)
@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Run the benchmark suite and write the results as JSON
+
+    python benchmarks/run.py [--quick] [-o results.json] [--only GROUP ...]
+    python benchmarks/run.py -o new.json --compare old.json
+
+Every bench_*.py module registers its cases with harness.benchmark; they
+run against in-process simulated cameras, so no hardware is needed.
+With --compare the exit status is 1 if a case got slower than the
+threshold.
+"""
+
+import os
+import sys
+import json
+import argparse
+import importlib
+
+from harness import BENCHMARKS, Settings, compare, document, load
+
+
+def discover() -> None:
+    here = os.path.dirname(os.path.abspath(__file__))
+    for filename in sorted(os.listdir(here)):
+        if filename.startswith("bench_") and filename.endswith(".py"):
+            importlib.import_module(filename[:-3])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-o", "--output", help="JSON result file (default: stdout)")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, smaller fleets")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per case")
+    parser.add_argument("--only", nargs="+", metavar="GROUP", help="run only these groups")
+    parser.add_argument("--compare", metavar="FILE", help="earlier result to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown counted as regression (default: 0.10)")
+    args = parser.parse_args()
+
+    discover()
+    groups = args.only or sorted(BENCHMARKS)
+    unknown = [g for g in groups if g not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)} (have: {', '.join(sorted(BENCHMARKS))})")
+
+    settings = Settings(quick=args.quick, repeat=args.repeat)
+    measurements = []
+    for group in groups:
+        print(f"running {group} ...", file=sys.stderr, flush=True)
+        measurements.extend(BENCHMARKS[group](settings))
+    result = document(measurements, settings)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        regressions = compare(load(args.compare), result, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,5 +5,9 @@ Python interface to Foscam CGI API for HD models
 from foscontrol.camera.base import CamBase
 from foscontrol.camera.extended import Cam
 from foscontrol.camera.result import ResultObj
+from foscontrol.camera.asynccam import AsyncCamBase, AsyncCam
+from foscontrol.fleet import CamFleet, CameraSpec
+from foscontrol.utils.deadline import CamTimeoutError, Deadline
 
-__all__ = ["Cam", "CamBase", "ResultObj"]
+__all__ = ["Cam", "CamBase", "ResultObj", "AsyncCam", "AsyncCamBase", "CamFleet", "CameraSpec",
+           "CamTimeoutError", "Deadline"]
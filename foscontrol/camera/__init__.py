@@ -2,6 +2,11 @@
 
 from .base import CamBase
 from .extended import Cam
-from .result import ResultObj
+from .result import ResultObj, ResultRecord
+from .asynccam import AsyncCamBase, AsyncCam
+from .cache import ResultCache
+from .schedule import MotionSchedule
+from .recordlist import RecordEntry
 
-__all__ = ["CamBase", "Cam", "ResultObj"]
\ No newline at end of file
+__all__ = ["CamBase", "Cam", "ResultObj", "ResultRecord", "AsyncCamBase", "AsyncCam", "ResultCache",
+           "MotionSchedule", "RecordEntry"]
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""Motion detection areas as NumPy boolean grids (optional, needs numpy)
+
+The camera divides the picture into 10x10 blocks.  Row r is sent as
+``area<r>``, an integer whose bit c is set when block (r, c) is watched;
+getMotionDetectConfig answers with the same value as a 10-character
+binary string (bit 9 first).  Here a mask is a (10, 10) bool array
+indexed [row, column], and a stack of masks has shape (N, 10, 10).
+"""
+
+from typing import Any, List, Sequence, Union
+from ..utils.arrays import require_numpy
+
+AREA_ROWS = 10
+AREA_COLS = 10
+
+
+def _np() -> Any:
+    return require_numpy("Motion detection area masks")
+
+
+def masks_from_values(values: Any) -> Any:
+    """Masks from area integers
+
+    Args:
+        values: Array-like of shape (..., 10), one integer per row
+
+    Returns:
+        bool array of shape (..., 10, 10)
+    """
+    np = _np()
+    values = np.asarray(values, dtype=np.int64)
+    return ((values[..., None] >> np.arange(AREA_COLS)) & 1).astype(bool)
+
+
+def values_from_masks(masks: Any) -> Any:
+    """Area integers from masks, the inverse of masks_from_values
+
+    Args:
+        masks: bool array-like of shape (..., 10, 10)
+
+    Returns:
+        int64 array of shape (..., 10)
+    """
+    np = _np()
+    masks = np.asarray(masks, dtype=bool)
+    if masks.shape[-2:] != (AREA_ROWS, AREA_COLS):
+        raise ValueError(f"Area masks must be 10x10, got {masks.shape[-2:]}")
+    return (masks.astype(np.int64) << np.arange(AREA_COLS)).sum(axis=-1)
+
+
+def area_mask(areas: Union[Sequence[str], Sequence[int], Any]) -> Any:
+    """Mask of one camera
+
+    Args:
+        areas: The 10 rows as binary strings (getMotionDetectConfig,
+            Cam's _areas) or integers, or a result with area0..area9
+
+    Returns:
+        (10, 10) bool array
+    """
+    if hasattr(areas, "get"):
+        areas = [areas.get(f"area{row}") for row in range(AREA_ROWS)]
+    if len(areas) != AREA_ROWS:
+        raise ValueError(f"Need {AREA_ROWS} area rows, got {len(areas)}")
+    return masks_from_values([int(a, 2) if isinstance(a, str) else int(a) for a in areas])
+
+
+def mask_areas(mask: Any) -> List[str]:
+    """Binary strings of a mask, as taken by Cam.setMotionDetectConfig"""
+    return [format(int(v), f"0{AREA_COLS}b") for v in values_from_masks(mask)]
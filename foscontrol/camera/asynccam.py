@@ -0,0 +1,238 @@
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable
+import ssl
+import time
+import inspect
+from ..utils.aionetwork import AsyncConnectionPool, default_async_pool
+from ..utils.network import Body, MultipartEncoder
+from ..utils.singleflight import AsyncSingleFlight
+from ..utils.deadline import resolve_deadline
+from ..utils.metrics import RequestTiming
+from .base import CamBase, DEFAULT_COALESCE, _check_coalesce
+from .extended import Cam
+from .result import ResultObj, copy_result
+from .cache import ResultCache
+from .patch import PATCHABLE, AsyncPatcher
+from .recordlist import RecordEntry, RecordQuery, aiter_records
+from .snapshot import SnapshotInfo, SinkWriter, JPEG_SOI, MAX_ERROR_BODY
+from .mjpeg import AsyncMJPEGStream
+
+
+class AsyncCamBase(CamBase):
+    """Asyncio interface to camera with core functionality
+
+    Offers the same command methods as CamBase, but each of them returns a
+    coroutine.  Commands, parameters and result decoding are inherited from
+    CamBase, only the transport differs.
+    """
+
+    def __init__(self,
+                 prot: str,
+                 host: str,
+                 port: int,
+                 user: str,
+                 password: str,
+                 context: Optional[ssl.SSLContext] = None,
+                 pool: Optional[AsyncConnectionPool] = None,
+                 cache: Optional[ResultCache] = None,
+                 coalesce: Optional[List[str]] = None,
+                 timeout: Optional[float] = 10.0,
+                 connect_timeout: Optional[float] = None,
+                 typed: bool = False):
+        """Initialize camera connection
+
+        Args:
+            prot: Protocol ("http" or "https")
+            host: Hostname
+            port: Port number
+            user: Username
+            password: Password
+            context: SSL context for HTTPS
+            pool: Async connection pool (default: shared pool of the running loop)
+            cache: Optional result cache for idempotent getters, may be shared
+            coalesce: Read-only commands for which concurrent identical requests
+                share one round trip (default: DEFAULT_COALESCE, [] disables)
+            timeout: Default seconds per command (None: wait forever)
+            connect_timeout: Cap for establishing a TCP connection
+            typed: Return typed, slotted records (camera.commands.RECORDS)
+                instead of ResultObj for the commands that have one
+        """
+        self.base = f"{prot}://{host}:{port}/cgi-bin/CGIProxy.fcgi"
+        self.user = user
+        self.password = password
+        self.context = context
+        self._pool = pool
+        self.cache = cache
+        self.coalesce = _check_coalesce(DEFAULT_COALESCE if coalesce is None else coalesce)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.typed = typed
+        self.observers: List[Callable[[RequestTiming], Any]] = []
+
+    _flights = AsyncSingleFlight(share=copy_result)
+
+    @property
+    def pool(self) -> AsyncConnectionPool:
+        if self._pool is None:
+            self._pool = default_async_pool()
+        return self._pool
+
+    async def sendcommand(self, cmd: str,
+                          param: Optional[Dict[str, Any]] = None,
+                          raw: bool = False,
+                          doBool: Optional[List[str]] = None,
+                          headers: Optional[Dict[str, str]] = None,
+                          data: Optional[Body] = None,
+                          timeout: Optional[float] = None) -> ResultObj:
+        """Send command to camera and return result
+
+        Timeouts, budgets and bodies work as in CamBase.sendcommand.
+        """
+        if headers is None and isinstance(data, MultipartEncoder):
+            headers = data.headers
+        key = self._flight_key(cmd, param, raw, doBool, data)
+        if key is not None:
+            return await self._flights.do(key, self._sendcommand, cmd, param, raw, doBool,
+                                          headers, data, timeout,
+                                          deadline=resolve_deadline(timeout, self.timeout))
+        return await self._sendcommand(cmd, param, raw, doBool, headers, data, timeout)
+
+    async def _sendcommand(self, cmd: str,
+                           param: Optional[Dict[str, Any]],
+                           raw: bool,
+                           doBool: Optional[List[str]],
+                           headers: Optional[Dict[str, str]],
+                           data: Optional[Body],
+                           timeout: Optional[float] = None) -> ResultObj:
+        url, data = self._prepare_request(cmd, param, data)
+        if self.observers:
+            return await self._sendcommand_observed(cmd, url, data, headers, raw, doBool, timeout)
+        response = await self.pool.request(url, data=data, headers=headers,
+                                           **self._opener_args(timeout))
+        return self._decode_response(await response.read(), raw, doBool,
+                                     self._record(cmd))
+
+    async def _sendcommand_observed(self, cmd: str, url: str, data: Optional[Body],
+                                    headers: Optional[Dict[str, str]], raw: bool,
+                                    doBool: Optional[List[str]],
+                                    timeout: Optional[float]) -> ResultObj:
+        response = None
+        headers_at = body_at = parsed_at = 0.0
+        body = b""
+        start = time.perf_counter()
+        try:
+            response = await self.pool.request(url, data=data, headers=headers,
+                                               **self._opener_args(timeout))
+            headers_at = time.perf_counter()
+            body = await response.read()
+            body_at = time.perf_counter()
+            res = self._decode_response(body, raw, doBool, self._record(cmd))
+            parsed_at = time.perf_counter()
+        except BaseException as e:
+            self._notify(cmd, start, response, headers_at, body_at, parsed_at,
+                         len(url) + len(data or b""), len(body), e)
+            raise
+        self._notify(cmd, start, response, headers_at, body_at, parsed_at,
+                     len(url) + len(data or b""), len(body))
+        return res
+
+    async def call(self, cmd: str, param: Optional[Dict[str, Any]] = None) -> ResultObj:
+        """Run a command with parameters already in CGI form (see CamBase.call)"""
+        return await self._call(cmd, param)
+
+    async def _call(self, cmd: str,
+                    param: Optional[Dict[str, Any]] = None,
+                    raw: bool = False,
+                    doBool: Optional[List[str]] = None,
+                    decode: Optional[Callable[[ResultObj], ResultObj]] = None) -> ResultObj:
+        cached = self._cache_lookup(cmd, param)
+        if cached is not None:
+            return cached
+        res = await self.sendcommand(cmd, param, raw=raw, doBool=doBool)
+        if decode is not None:
+            res = decode(res)
+        return self._cache_update(cmd, param, res)
+
+    async def snapPictureTo(self, sink: Any, chunk_size: int = 64 * 1024) -> SnapshotInfo:
+        """Stream a snapshot (snapPicture2) into a file, socket or buffer
+
+        Like CamBase.snapPictureTo; a sink whose ``write`` returns an
+        awaitable, or that has a ``drain`` coroutine (asyncio.StreamWriter),
+        is awaited after each chunk.
+        """
+        writer = SinkWriter(sink)
+        drain = getattr(sink, "drain", None)
+        url, _ = self._prepare_request("snapPicture2", None, None)
+        start = time.perf_counter()
+        response = await self.pool.request(url, **self._opener_args())
+        try:
+            head = b""
+            while len(head) < len(JPEG_SOI):
+                chunk = await response.read(chunk_size)
+                if not chunk:
+                    break
+                head += chunk
+            first_byte = time.perf_counter() - start
+
+            if head[:len(JPEG_SOI)] != JPEG_SOI:
+                body = [head]
+                size = len(head)
+                while size < MAX_ERROR_BODY:
+                    chunk = await response.read(MAX_ERROR_BODY - size)
+                    if not chunk:
+                        break
+                    body.append(chunk)
+                    size += len(chunk)
+                res = self._decode_response(b"".join(body), False, None)
+                info = SnapshotInfo(0, time.perf_counter() - start, first_byte, res)
+                if self.observers:
+                    self._notify_snapshot(url, start, response, info, size)
+                return info
+
+            chunk = head
+            while chunk:
+                written = writer.write(memoryview(chunk))
+                if inspect.isawaitable(written):
+                    await written
+                if drain is not None:
+                    await drain()
+                chunk = await response.read(chunk_size)
+        finally:
+            response.close()
+        info = SnapshotInfo(writer.offset, time.perf_counter() - start, first_byte)
+        if self.observers:
+            self._notify_snapshot(url, start, response, info, info.nbytes)
+        return info
+
+    async def openMJStream(self, queue_size: int = 2,
+                           max_frame_size: int = 512 * 1024) -> AsyncMJPEGStream:
+        """Open the MJPEG stream of the sub stream (see CamBase.openMJStream)
+
+        Returns:
+            AsyncMJPEGStream yielding frames as memoryviews with async for
+        """
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        url, _ = self._prepare_request("GetMJStream", None, None)
+        url = url.replace("/CGIProxy.fcgi?", "/CGIStream.cgi?", 1)
+        response = await self.pool.request(url, **self._opener_args())
+        # the deadline covers opening the stream, not the endless body
+        response.deadline = None
+        return AsyncMJPEGStream(response, queue_size=queue_size, max_frame_size=max_frame_size)
+
+    def iterRecordList(self, recordPath: int, startTime: Optional[int] = None,
+                       endTime: Optional[int] = None,
+                       recordType: Optional[int] = None) -> AsyncIterator[RecordEntry]:
+        """Async iterator over all recordings (see CamBase.iterRecordList)"""
+        return aiter_records(self, RecordQuery(recordPath, startTime, endTime, recordType))
+
+
+class AsyncCam(AsyncCamBase, Cam):
+    """Asyncio version of Cam, with the same decoded getters and setters"""
+
+    _patcher = AsyncPatcher()
+
+    async def patchMotionDetectConfig(self, **changes: Any) -> Optional[ResultObj]:
+        return await self._patcher.patch(self, PATCHABLE["setMotionDetectConfig"], changes)
+
+    async def patchWifiConfig(self, **changes: Any) -> Optional[ResultObj]:
+        return await self._patcher.patch(self, PATCHABLE["setWifiConfig"], changes)
@@ -1,13 +1,45 @@
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Iterator, Tuple, Callable
 import ssl
-from urllib.parse import urlencode, urljoin
+import time
+from urllib.parse import urlencode
 from urllib.request import Request 
-from ..utils.network import create_url_opener, my_urlopen, encode_multipart
-from ..utils.dictionaries import DictBits, DictChar
-from .result import ResultObj
+from ..utils.network import ConnectionPool, default_pool, Body, MultipartEncoder
+from ..utils.xmlparse import parse_cgi_result
+from .result import ResultObj, copy_result
+from .cache import ResultCache
+from .snapshot import SnapshotInfo, SinkWriter, JPEG_SOI, MAX_ERROR_BODY
+from .mjpeg import MJPEGStream
+from .recordlist import RecordEntry, RecordQuery, iter_records
+from ..utils.singleflight import SingleFlight
+from ..utils.deadline import Deadline, resolve_deadline
+from ..utils.metrics import RequestTiming
+from .commands import COMMANDS, RECORDS, encode_params, with_commands
 
+# Commands merged by default when several threads issue them at once
+DEFAULT_COALESCE = frozenset({
+    "getDevState", "getDevInfo", "snapPicture", "snapPicture2",
+    "getMotionDetectConfig", "getVideoStreamParam", "getMirrorAndFlipSetting",
+    "getIPInfo", "getWifiConfig", "getDevTimeConfig", "getPTZSpeed",
+    "getInfraLedConfig", "getRecordList",
+})
+
+
+def _check_coalesce(commands) -> frozenset:
+    commands = frozenset(commands)
+    for cmd in commands:
+        # setters, PTZ moves etc. have side effects and must each reach the camera
+        if not cmd.startswith(("get", "snapPicture")):
+            raise ValueError(f"Command cannot be coalesced: {cmd}")
+    return commands
+
+
+@with_commands(COMMANDS)
 class CamBase:
-    """Base interface to camera with core functionality"""
+    """Base interface to camera with core functionality
+
+    The command methods (getDevInfo, setMotionDetectConfig, ...) are
+    generated from the table in camera.commands.
+    """
 
     def __init__(self, 
                  prot: str,
@@ -15,7 +47,13 @@ class CamBase:
                  port: int,
                  user: str,
                  password: str,
-                 context: Optional[ssl.SSLContext] = None):
+                 context: Optional[ssl.SSLContext] = None,
+                 pool: Optional[ConnectionPool] = None,
+                 cache: Optional[ResultCache] = None,
+                 coalesce: Optional[List[str]] = None,
+                 timeout: Optional[float] = 10.0,
+                 connect_timeout: Optional[float] = None,
+                 typed: bool = False):
         """Initialize camera connection
         
         Args:
@@ -25,47 +63,196 @@ class CamBase:
             user: Username
             password: Password
             context: SSL context for HTTPS
+            pool: Keep-alive connection pool (default: shared process-wide pool)
+            cache: Optional result cache for idempotent getters, may be shared
+            coalesce: Read-only commands for which concurrent identical requests
+                share one round trip (default: DEFAULT_COALESCE, [] disables)
+            timeout: Default seconds per command (None: wait forever)
+            connect_timeout: Cap for establishing a TCP connection
+            typed: Return typed, slotted records (camera.commands.RECORDS)
+                instead of ResultObj for the commands that have one
         """
         self.base = f"{prot}://{host}:{port}/cgi-bin/CGIProxy.fcgi"
         self.user = user
         self.password = password
         self.context = context
-        self.url_opener = create_url_opener(context)
+        self.pool = pool if pool is not None else default_pool()
+        self.url_opener = self.pool.opener(context)
+        self.cache = cache
+        self.coalesce = _check_coalesce(DEFAULT_COALESCE if coalesce is None else coalesce)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.typed = typed
+        self.observers: List[Callable[[RequestTiming], Any]] = []
+
+    # in-flight requests, shared by all camera objects of the process
+    _flights = SingleFlight(share=copy_result)
+
+    @property
+    def user(self) -> str:
+        return self._user
+
+    @user.setter
+    def user(self, value: str) -> None:
+        self._user = value
+        self._credentials = None
+
+    @property
+    def password(self) -> str:
+        return self._password
+
+    @password.setter
+    def password(self, value: str) -> None:
+        self._password = value
+        self._credentials = None
 
     def sendcommand(self, cmd: str, 
                     param: Optional[Dict[str, Any]] = None,
                     raw: bool = False,
                     doBool: Optional[List[str]] = None,
                     headers: Optional[Dict[str, str]] = None,
-                    data: Optional[bytes] = None) -> ResultObj:
-        """Send command to camera and return result"""
-        if param is None:
-            param = {}
-            
-        param.update({
-            'cmd': cmd,
-            'usr': self.user,
-            'pwd': self.password
-        })
-        
-        if data is None:
-            url = f"{self.base}?{urlencode(param)}"
-            data = self.url_opener(url, context=self.context).read()
-        else:
-            url = self.base
-            req = Request(url, data=data, headers=headers)
-            data = self.url_opener(req, context=self.context).read()
+                    data: Optional[Body] = None,
+                    timeout: Optional[float] = None) -> ResultObj:
+        """Send command to camera and return result
+
+        The command must finish within ``timeout`` seconds (default: the
+        camera's timeout) and within the active budget, if any; otherwise
+        CamTimeoutError is raised.
+
+        ``data`` is sent as POST body, with cmd and the credentials in the
+        query; a MultipartEncoder is streamed and brings its own headers.
+        """
+        if headers is None and isinstance(data, MultipartEncoder):
+            headers = data.headers
+        key = self._flight_key(cmd, param, raw, doBool, data)
+        if key is not None:
+            return self._flights.do(key, self._sendcommand, cmd, param, raw, doBool,
+                                    headers, data, timeout,
+                                    deadline=resolve_deadline(timeout, self.timeout))
+        return self._sendcommand(cmd, param, raw, doBool, headers, data, timeout)
+
+    def add_observer(self, observer: Callable[[RequestTiming], Any]) -> None:
+        """Call observer(RequestTiming) after every request to the camera
+
+        Observers run in the requesting thread and should be quick; see
+        utils.metrics.MetricsCollector for a ready-made aggregator.
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer: Callable[[RequestTiming], Any]) -> None:
+        self.observers.remove(observer)
+
+    def _notify(self, cmd: str, start: float, response: Any, headers_at: float,
+                body_at: float, parsed_at: float, bytes_out: int, bytes_in: int,
+                error: Optional[BaseException] = None) -> None:
+        """Pass the timing of a finished request to the observers
+
+        Timestamps are time.perf_counter() values; a phase that was not
+        reached is given as 0.0.
+        """
+        connect = getattr(response, "connect_time", 0.0)
+        end = parsed_at or body_at or headers_at or time.perf_counter()
+        timing = RequestTiming(
+            self.base, cmd, connect,
+            max(0.0, (headers_at or end) - start - connect),
+            body_at - headers_at if body_at and headers_at else 0.0,
+            parsed_at - body_at if parsed_at and body_at else 0.0,
+            bytes_out, bytes_in, error)
+        for observer in self.observers:
+            observer(timing)
+
+    def budget(self, seconds: float) -> Deadline:
+        """Time budget shared by all commands issued inside a with block"""
+        return Deadline(seconds)
+
+    def _opener_args(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "context": self.context,
+            "deadline": resolve_deadline(timeout, self.timeout),
+            "connect_timeout": self.connect_timeout,
+        }
+
+    def _flight_key(self, cmd: str, param: Optional[Dict[str, Any]], raw: bool,
+                    doBool: Optional[List[str]], data: Optional[Body]) -> Optional[Tuple]:
+        """Identity of a request for coalescing, None if it must not be merged"""
+        if cmd not in self.coalesce or data is not None:
+            return None
+        return (self.base, self.user, self.password, cmd,
+                tuple(sorted(param.items())) if param else (),
+                raw, tuple(doBool) if doBool else (), self.typed)
+
+    def _record(self, cmd: str) -> Optional[type]:
+        """Typed record class of a command, None for ResultObj"""
+        return RECORDS.get(cmd) if self.typed else None
+
+    def _sendcommand(self, cmd: str,
+                     param: Optional[Dict[str, Any]],
+                     raw: bool,
+                     doBool: Optional[List[str]],
+                     headers: Optional[Dict[str, str]],
+                     data: Optional[Body],
+                     timeout: Optional[float] = None) -> ResultObj:
+        url, data = self._prepare_request(cmd, param, data)
+        req = url if data is None else Request(url, data=data, headers=headers or {})
+        if self.observers:
+            return self._sendcommand_observed(cmd, req, url, data, raw, doBool, timeout)
+        body = self.url_opener(req, **self._opener_args(timeout)).read()
+        return self._decode_response(body, raw, doBool, self._record(cmd))
+
+    def _sendcommand_observed(self, cmd: str, req: Any, url: str, data: Optional[Body],
+                              raw: bool, doBool: Optional[List[str]],
+                              timeout: Optional[float]) -> ResultObj:
+        """_sendcommand with timing of every phase"""
+        response = None
+        headers_at = body_at = parsed_at = 0.0
+        body = b""
+        start = time.perf_counter()
+        try:
+            response = self.url_opener(req, **self._opener_args(timeout))
+            headers_at = time.perf_counter()
+            body = response.read()
+            body_at = time.perf_counter()
+            res = self._decode_response(body, raw, doBool, self._record(cmd))
+            parsed_at = time.perf_counter()
+        except BaseException as e:
+            self._notify(cmd, start, response, headers_at, body_at, parsed_at,
+                         len(url) + len(data or b""), len(body), e)
+            raise
+        self._notify(cmd, start, response, headers_at, body_at, parsed_at,
+                     len(url) + len(data or b""), len(body))
+        return res
+
+    def _prepare_request(self, cmd: str,
+                         param: Optional[Dict[str, Any]],
+                         data: Optional[Body]) -> Tuple[str, Optional[Body]]:
+        """Build the request url (and POST body) for a command
+
+        The credential part of the query is encoded once per camera;
+        param is left untouched.
+        """
+        credentials = self._credentials
+        if credentials is None:
+            credentials = self._credentials = "&" + urlencode(
+                {"usr": self._user, "pwd": self._password})
+        if param:
+            return f"{self.base}?cmd={cmd}&{encode_params(param)}{credentials}", data
+        return f"{self.base}?cmd={cmd}{credentials}", data
 
+    @staticmethod
+    def _decode_response(data: bytes, raw: bool,
+                         doBool: Optional[List[str]],
+                         record: Optional[type] = None) -> ResultObj:
+        """Turn the response body into a ResultObj (or return it when raw)
+
+        With a record class the fields are converted by their declared
+        types instead of doBool.
+        """
         if raw:
             return data
 
-        from xml.dom.minidom import parseString
-        dom = parseString(data)
-        
-        d = {}
-        for node in dom.getElementsByTagName('*'):
-            if node.firstChild and node.firstChild.nodeType == node.TEXT_NODE:
-                d[node.tagName] = node.firstChild.data
+        d = parse_cgi_result(data)
+        if record is not None:
+            return record(d)
 
         if doBool:
             for k in doBool:
@@ -74,101 +261,155 @@ class CamBase:
                     
         return ResultObj(d)
 
-    def getMotionDetectConfig(self):
-        return self.sendcommand("getMotionDetectConfig", doBool=["isEnable"])
-
-    def setMotionDetectConfig(self, isEnable, linkage, snapInterval, 
-                             triggerInterval, sensitivity, schedules, areas):
-        param = {
-            "isEnable": isEnable,
-            "linkage": linkage,
-            "snapInterval": snapInterval,
-            "triggerInterval": triggerInterval,
-            "sensitivity": sensitivity
-        }
-        for day in range(7):
-            param[f"schedule{day}"] = schedules[day]
-        for row in range(10):
-            param[f"area{row}"] = areas[row]
-
-        return self.sendcommand("setMotionDetectConfig", param=param, doBool=["isEnable"])
-
-    def getDevInfo(self) -> ResultObj:
-        """Get device information"""
-        return self.sendcommand("getDevInfo")
-
-    def getDevState(self) -> ResultObj:
-        """Get device state"""
-        return self.sendcommand("getDevState")
-
-    def snapPicture(self) -> bytes:
-        """Take a snapshot"""
-        return self.sendcommand("snapPicture", raw=True)
-
-    def snapPicture2(self) -> bytes:
-        """Take a snapshot (alternative method)"""
-        return self.sendcommand("snapPicture2", raw=True)
-
-    def getVideoStreamParam(self) -> ResultObj:
-        """Get video stream parameters"""
-        return self.sendcommand("getVideoStreamParam")
-
-    def getMirrorAndFlipSetting(self) -> ResultObj:
-        """Get mirror and flip settings"""
-        return self.sendcommand("getMirrorAndFlipSetting")
-
-    def setPTZSpeed(self, speed: int) -> ResultObj:
-        """Set PTZ movement speed (0-4)"""
-        return self.sendcommand("setPTZSpeed", {"speed": speed})
-
-    def ptzReset(self) -> ResultObj:
-        """Reset PTZ to home position"""
-        return self.sendcommand("ptzReset")
-
-    def ptzMoveUp(self) -> ResultObj:
-        """Move camera up"""
-        return self.sendcommand("ptzMoveUp")
-
-    def ptzMoveDown(self) -> ResultObj:
-        """Move camera down"""
-        return self.sendcommand("ptzMoveDown")
-
-    def ptzMoveLeft(self) -> ResultObj:
-        """Move camera left"""
-        return self.sendcommand("ptzMoveLeft")
-
-    def ptzMoveRight(self) -> ResultObj:
-        """Move camera right"""
-        return self.sendcommand("ptzMoveRight")
-
-    def ptzStopRun(self) -> ResultObj:
-        """Stop PTZ movement"""
-        return self.sendcommand("ptzStopRun")
-
-    def getRecordList(self, recordPath: str) -> ResultObj:
-        """Get list of recordings"""
-        return self.sendcommand("getRecordList", {"recordPath": recordPath})
-
-    def getIPInfo(self) -> ResultObj:
-        """Get IP configuration"""
-        return self.sendcommand("getIPInfo")
-
-    def setIPInfo(self, isDHCP: bool, ip: str, gate: str, mask: str, dns1: str, dns2: str) -> ResultObj:
-        """Set IP configuration"""
-        param = {
-            "isDHCP": isDHCP,
-            "ip": ip,
-            "gate": gate,
-            "mask": mask,
-            "dns1": dns1,
-            "dns2": dns2
-        }
-        return self.sendcommand("setIPInfo", param=param)
+    def call(self, cmd: str, param: Optional[Dict[str, Any]] = None) -> ResultObj:
+        """Run a command with parameters already in CGI form
+
+        Unlike sendcommand, this goes through the result cache like the
+        named command methods: a cached getter is answered from it and a
+        setter drops the results (and on Cam the patch snapshots) it makes
+        stale.  Meant for generic callers such as the fleet tools.
+        """
+        return self._call(cmd, param)
+
+    def _call(self, cmd: str,
+              param: Optional[Dict[str, Any]] = None,
+              raw: bool = False,
+              doBool: Optional[List[str]] = None,
+              decode: Optional[Callable[[ResultObj], ResultObj]] = None) -> ResultObj:
+        """Run a command and apply an optional decoder to its result
 
-    def reboot(self) -> ResultObj:
-        """Reboot camera"""
-        return self.sendcommand("reboot")
+        All command methods go through here, so that AsyncCamBase can reuse
+        them unchanged by providing a coroutine version of this method.
+        """
+        cached = self._cache_lookup(cmd, param)
+        if cached is not None:
+            return cached
+        res = self.sendcommand(cmd, param, raw=raw, doBool=doBool)
+        if decode is not None:
+            res = decode(res)
+        return self._cache_update(cmd, param, res)
+
+    def _cache_lookup(self, cmd: str, param: Optional[Dict[str, Any]]) -> Optional[ResultObj]:
+        if self.cache is None or not self.cache.cacheable(cmd, param):
+            return None
+        # callers may modify their result: each gets a copy of its own
+        return copy_result(self.cache.get(self.base, cmd))
+
+    def _cache_update(self, cmd: str, param: Optional[Dict[str, Any]], res: Any) -> Any:
+        if self.cache is not None:
+            if self.cache.cacheable(cmd, param):
+                self.cache.store(self.base, cmd, copy_result(res))
+            else:
+                self.cache.command_done(self.base, cmd, res)
+        return res
+
+    def snapPictureTo(self, sink: Any, chunk_size: int = 64 * 1024) -> SnapshotInfo:
+        """Stream a snapshot (snapPicture2) into a file, socket or buffer
 
-    def restore(self) -> ResultObj:
-        """Restore factory settings"""
-        return self.sendcommand("restore")
+        The picture is passed on in chunks (or read straight into a buffer
+        sink) instead of being collected in memory first.  An error answer
+        is recognized by its first bytes and returned as ``result``.
+
+        Args:
+            sink: File-like object (write), socket (sendall) or writable buffer
+            chunk_size: Bytes per read
+
+        Returns:
+            SnapshotInfo with byte count and timing
+        """
+        writer = SinkWriter(sink)
+        url, _ = self._prepare_request("snapPicture2", None, None)
+        start = time.perf_counter()
+        response = self.url_opener(url, **self._opener_args())
+        try:
+            if writer.is_buffer:
+                view = writer.target()
+            else:
+                view = memoryview(bytearray(chunk_size))
+
+            # enough bytes to tell a JPEG from an XML answer
+            n = 0
+            while n < len(JPEG_SOI):
+                got = response.readinto(view[n:])
+                if not got:
+                    break
+                n += got
+            first_byte = time.perf_counter() - start
+
+            if n < len(JPEG_SOI) or bytes(view[:len(JPEG_SOI)]) != JPEG_SOI:
+                body = bytes(view[:n]) + response.read(MAX_ERROR_BODY)
+                res = self._decode_response(body, False, None)
+                info = SnapshotInfo(0, time.perf_counter() - start, first_byte, res)
+                if self.observers:
+                    self._notify_snapshot(url, start, response, info, len(body))
+                return info
+
+            if writer.is_buffer:
+                writer.advance(n)
+                while True:
+                    try:
+                        target = writer.target()
+                    except ValueError:
+                        if response.read(1):
+                            raise
+                        break
+                    got = response.readinto(target)
+                    if not got:
+                        break
+                    writer.advance(got)
+            else:
+                while n:
+                    writer.write(view[:n])
+                    n = response.readinto(view)
+        finally:
+            response.close()
+        info = SnapshotInfo(writer.offset, time.perf_counter() - start, first_byte)
+        if self.observers:
+            self._notify_snapshot(url, start, response, info, info.nbytes)
+        return info
+
+    def _notify_snapshot(self, url: str, start: float, response: Any,
+                         info: SnapshotInfo, nbytes: int) -> None:
+        # first_byte marks the first body bytes; the headers arrived before
+        self._notify("snapPicture2", start, response, start + info.first_byte,
+                     start + info.elapsed, 0.0, len(url), nbytes)
+
+    def iterRecordList(self, recordPath: int, startTime: Optional[int] = None,
+                       endTime: Optional[int] = None,
+                       recordType: Optional[int] = None) -> Iterator[RecordEntry]:
+        """Iterate over all recordings, fetching the next page in the background
+
+        Walks getRecordList page by page (startNo) and yields RecordEntry
+        tuples of the recordings that overlap startTime..endTime (seconds
+        since the epoch).
+
+        Args:
+            recordPath: 0: SD card, 2: FTP
+            startTime: Earliest end of a recording
+            endTime: Latest start of a recording
+            recordType: Only recordings of this type
+        """
+        return iter_records(self, RecordQuery(recordPath, startTime, endTime, recordType))
+
+    def openMJStream(self, queue_size: int = 2,
+                     max_frame_size: int = 512 * 1024) -> MJPEGStream:
+        """Open the MJPEG stream of the sub stream
+
+        The stream is served by CGIStream.cgi next to CGIProxy.fcgi and
+        requires the sub stream in MJPEG format (setSubStreamFormat(1)).
+
+        Args:
+            queue_size: Frames buffered for a slow consumer (oldest dropped)
+            max_frame_size: Largest expected frame in bytes
+
+        Returns:
+            MJPEGStream yielding frames as memoryviews
+        """
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        url, _ = self._prepare_request("GetMJStream", None, None)
+        url = url.replace("/CGIProxy.fcgi?", "/CGIStream.cgi?", 1)
+        response = self.url_opener(url, **self._opener_args())
+        # the deadline covers opening the stream, not the endless body
+        response.deadline = None
+        return MJPEGStream(response, queue_size=queue_size, max_frame_size=max_frame_size)
@@ -0,0 +1,137 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Seconds a getter result stays valid
+DEFAULT_TTLS = {
+    "getDevInfo": 3600.0,
+    "getVideoStreamParam": 300.0,
+    "getMirrorAndFlipSetting": 300.0,
+    "getIPInfo": 300.0,
+    "getWifiConfig": 300.0,
+    "getDevTimeConfig": 60.0,
+}
+
+# Getters whose cached result is outdated once the setter succeeded.
+# None stands for every cached result of the camera.
+DEFAULT_INVALIDATES = {
+    "setMirrorAndFlipSetting": ("getMirrorAndFlipSetting",),
+    "setIPInfo": ("getIPInfo",),
+    "setWifiConfig": ("getWifiConfig",),
+    "setVideoStreamParam": ("getVideoStreamParam",),
+    "setSystemTime": ("getDevTimeConfig", "getDevInfo"),
+    "setDevName": ("getDevInfo",),
+    "setMotionDetectConfig": ("getMotionDetectConfig",),
+    "setPTZSpeed": ("getPTZSpeed",),
+    "setInfraLedConfig": ("getInfraLedConfig",),
+    "reboot": None,
+    "restore": None,
+}
+
+
+class ResultCache:
+    """TTL read-through cache for idempotent getters
+
+    One cache can be shared by any number of cameras; it holds at most
+    ``maxsize`` results and evicts the least recently used one first.
+    Only getters listed in ``ttls`` are cached, and only successful
+    (result == 0) answers.  A successful setter drops the cached results
+    listed for it in ``invalidates``.  Cameras store and hand out copies,
+    so a caller changing its result does not change the cached one.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None,
+                 maxsize: int = 4096,
+                 invalidates: Optional[Dict[str, Optional[Iterable[str]]]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize cache
+
+        Args:
+            ttls: Seconds to keep each getter's result (default: DEFAULT_TTLS)
+            maxsize: Maximum number of cached results
+            invalidates: Setter -> getters it makes stale (default: DEFAULT_INVALIDATES)
+            clock: Time source
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.invalidates = dict(DEFAULT_INVALIDATES if invalidates is None else invalidates)
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def cacheable(self, cmd: str, param: Optional[Dict[str, Any]] = None) -> bool:
+        return cmd in self.ttls and not param
+
+    def get(self, camera: str, cmd: str) -> Optional[Any]:
+        """Return the cached result, or None when missing or expired"""
+        key = (camera, cmd)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if self.clock() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, camera: str, cmd: str, value: Any) -> None:
+        key = (camera, cmd)
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttls[cmd], value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, camera: str, cmd: Optional[str] = None) -> None:
+        """Drop one cached getter result, or all results of a camera"""
+        with self._lock:
+            if cmd is not None:
+                keys = [(camera, cmd)] if (camera, cmd) in self._entries else []
+            else:
+                keys = [k for k in self._entries if k[0] == camera]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def store(self, camera: str, cmd: str, res: Any) -> None:
+        """Cache a getter result if the camera reported success"""
+        if getattr(res, "result", None) == 0:
+            self.put(camera, cmd, res)
+
+    def command_done(self, camera: str, cmd: str, res: Any) -> None:
+        """Drop results made stale by a successful setter"""
+        if cmd not in self.invalidates or getattr(res, "result", None) != 0:
+            return
+        targets = self.invalidates[cmd]
+        if targets is None:
+            self.invalidate(camera)
+        else:
+            for target in targets:
+                self.invalidate(camera, target)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,459 @@
+"""Declarative table of the camera's CGI commands
+
+Each Command lists the CGI parameters in method argument order, the
+result fields that are booleans, and the conversions Cam applies on top
+of the raw interface: parameter encoders (descriptive values to CGI
+codes) and a result decoder.  ``with_commands`` turns the table into
+methods; CamBase gets the raw ones, Cam the decoded ones.  Getters may
+also declare their result fields, from which the typed records of
+``RECORDS`` are generated.  Adding a CGI command is one table entry.
+"""
+
+import inspect
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote_plus, unquote_plus
+from .result import Derivations, ResultBase, ResultObj, record_type
+from .schedule import MotionSchedule
+from ..utils.arrays import binaryarray2int
+from ..utils.dictionaries import (
+    DictBits, DictChar, DC_WifiEncryption, DC_WifiAuth, DC_motionDetectSensitivity,
+    DC_ddnsServer, DC_ptzSpeedList, DC_timeFormat, DC_timeDateFormat,
+    DC_infraLedMode, DC_FtpMode, DC_SmtpTlsMode, DC_timeSource, BD_alarmAction
+)
+
+
+class Param(NamedTuple):
+    """Method argument of a command
+
+    name: Argument name, also the CGI parameter unless ``cgi`` is given
+    cgi: CGI parameter name (prefix of the numbered parameters with count)
+    encode: Conversion applied by Cam (descriptive value to CGI value)
+    count: If set, the argument is a sequence of count values sent as
+        cgi0 .. cgi<count-1>
+    optional: Argument defaults to None, which leaves the parameter out
+    """
+    name: str
+    cgi: Optional[str] = None
+    encode: Optional[Callable[[Any], Any]] = None
+    count: int = 0
+    optional: bool = False
+
+
+class Command(NamedTuple):
+    """One CGI command"""
+    name: str
+    doc: str
+    params: Tuple[Param, ...] = ()
+    bools: Tuple[str, ...] = ()
+    decode: Optional[Callable[[ResultObj], ResultObj]] = None
+    raw: bool = False
+    fields: Tuple[Tuple[str, type], ...] = ()
+
+    @property
+    def decoded(self) -> bool:
+        """True if Cam's version differs from CamBase's"""
+        return self.decode is not None or any(p.encode is not None for p in self.params)
+
+    def build(self, values: Iterable[Any], decoded: bool) -> Optional[Dict[str, Any]]:
+        """CGI parameters from the method arguments"""
+        if not self.params:
+            return None
+        param: Dict[str, Any] = {}
+        for p, value in zip(self.params, values):
+            if value is None and p.optional:
+                continue
+            if decoded and p.encode is not None:
+                value = p.encode(value)
+            key = p.cgi or p.name
+            if p.count:
+                if len(value) != p.count:
+                    raise ValueError(f"{p.name} needs {p.count} values, got {len(value)}")
+                for i, v in enumerate(value):
+                    param[f"{key}{i}"] = v
+            else:
+                param[key] = value
+        return param
+
+    def cgi_keys(self) -> List[Tuple[Param, str]]:
+        """CGI parameter names in argument order, with their Param"""
+        keys = []
+        for p in self.params:
+            key = p.cgi or p.name
+            if p.count:
+                keys.extend((p, f"{key}{i}") for i in range(p.count))
+            else:
+                keys.append((p, key))
+        return keys
+
+    def encode_values(self, values: Dict[str, Any]) -> Dict[str, str]:
+        """CGI texts of some arguments, given by name with Cam values"""
+        params = {p.name: p for p in self.params}
+        res = {}
+        for name, value in values.items():
+            p = params.get(name)
+            if p is None:
+                raise ValueError(f"{self.name} has no argument {name}")
+            if p.encode is not None:
+                value = p.encode(value)
+            key = p.cgi or p.name
+            if p.count:
+                if len(value) != p.count:
+                    raise ValueError(f"{name} needs {p.count} values, got {len(value)}")
+                res.update((f"{key}{i}", cgi_text(v)) for i, v in enumerate(value))
+            else:
+                res[key] = cgi_text(value)
+        return res
+
+    def read_back(self, result: Any, binary: Tuple[str, ...] = (),
+                  quoted: Tuple[str, ...] = ()) -> Dict[str, Optional[str]]:
+        """CGI texts of this setter's parameters in a getter result
+
+        Args:
+            result: Getter result (ResultObj or record)
+            binary: Parameter prefixes the getter answers as binary strings
+                while the setter takes integers (schedule0 .., area0 ..)
+            quoted: Parameters the getter answers urlencoded
+        """
+        res = {}
+        for _, key in self.cgi_keys():
+            value = result.get(key)
+            if isinstance(value, str):
+                if key.startswith(binary):
+                    value = int(value, 2)
+                elif key in quoted:
+                    value = unquote_plus(value)
+            res[key] = cgi_text(value)
+        return res
+
+    def merge(self, current: Dict[str, Optional[str]], changes: Dict[str, str],
+              defaults: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """Complete CGI parameters: changes on top of the current values
+
+        A parameter missing from both is taken from defaults, left out if
+        optional and sent empty otherwise.
+        """
+        params = {}
+        for p, key in self.cgi_keys():
+            if key in changes:
+                params[key] = changes[key]
+            elif current.get(key) is not None:
+                params[key] = current[key]
+            elif defaults and key in defaults:
+                params[key] = cgi_text(defaults[key])
+            elif not p.optional:
+                # the firmware leaves empty values out of its answers
+                params[key] = ""
+        return params
+
+    def signature(self) -> inspect.Signature:
+        params = [inspect.Parameter("self", inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+        for p in self.params:
+            params.append(inspect.Parameter(
+                p.name, inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                default=None if p.optional else inspect.Parameter.empty))
+        return inspect.Signature(params, return_annotation=bytes if self.raw else ResultObj)
+
+
+def cgi_text(value: Any) -> Optional[str]:
+    """CGI text of a value, as compared and sent (booleans as 1/0)"""
+    if value is None:
+        return None
+    if value is True or value is False:
+        return "1" if value else "0"
+    return str(value)
+
+
+def encode_params(param: Dict[str, Any]) -> str:
+    """Query string of CGI parameters; booleans are sent as 1/0"""
+    parts = []
+    for key, value in param.items():
+        if value is True or value is False:
+            value = "1" if value else "0"
+        elif isinstance(value, int):
+            value = str(value)
+        else:
+            value = quote_plus(str(value))
+        parts.append(f"{key}={value}")
+    return "&".join(parts)
+
+
+def schedules(value: Any) -> List[int]:
+    """Encoder of the week schedule: MotionSchedule or 7 binary strings"""
+    if isinstance(value, MotionSchedule):
+        return value.to_cgi()
+    return binaryarray2int(value)
+
+
+def choice(converter: DictChar, what: str) -> Callable[[str], str]:
+    """Encoder of a descriptive value through a DictChar"""
+    def encode(value: str) -> str:
+        code = converter.rlookup(value)
+        if code is None:
+            raise ValueError(f"Invalid {what} value. Must be one of: {', '.join(converter.values)}")
+        return code
+    return encode
+
+
+# -- result decoders of Cam
+#
+# The derived fields (_sensitivity, _schedules, ...) are computed on first
+# access, so callers that only read the raw fields pay nothing for them.
+
+def _lookup(field: str, converter: DictChar) -> Callable[[ResultBase, str], None]:
+    """Descriptive value of field through a DictChar"""
+    return lambda res, name: res.stringLookupConv(res.get(field), converter, name)
+
+def _binary(prefix: str, length: int) -> Callable[[ResultBase, str], None]:
+    """Numbered binary strings prefix0.. collected into a list"""
+    return lambda res, name: res.collectBinaryArray(prefix, name, length)
+
+def _bits(field: str, converter: DictBits) -> Callable[[ResultBase, str], None]:
+    """Bit field as a list of names"""
+    return lambda res, name: res.DB_convert2array(field, name, converter)
+
+def _schedule(res: ResultBase, name: str) -> None:
+    try:
+        res.set(name, MotionSchedule.from_cgi(res))
+    except (TypeError, ValueError):
+        pass
+
+def _deferred(derivations: Derivations) -> Callable[[ResultObj], ResultObj]:
+    def decode(res: ResultObj) -> ResultObj:
+        res.defer(derivations)
+        return res
+    return decode
+
+_DEV_TIME_CONFIG: Derivations = {
+    "_time_format": _lookup("timeFormat", DC_timeFormat),
+    "_date_format": _lookup("dateFormat", DC_timeDateFormat),
+}
+
+_decode_motion_detect_config = _deferred({
+    "_sensitivity": _lookup("sensitivity", DC_motionDetectSensitivity),
+    "_schedules": _binary("schedule", 48),
+    "_schedule": _schedule,
+    "_areas": _binary("area", 10),
+    "_linkage": _bits("linkage", BD_alarmAction),
+})
+_decode_ptz_speed = _deferred({"_speed_desc": _lookup("speed", DC_ptzSpeedList)})
+_decode_dev_time_config = _deferred(_DEV_TIME_CONFIG)
+_decode_system_time = _deferred({
+    "_time_source": _lookup("timeSource", DC_timeSource), **_DEV_TIME_CONFIG})
+_decode_infra_led_config = _deferred({"_mode_desc": _lookup("mode", DC_infraLedMode)})
+_decode_wifi_config = _deferred({
+    "_auth_desc": _lookup("authMode", DC_WifiAuth),
+    "_encrypt_desc": _lookup("encryptType", DC_WifiEncryption),
+})
+_decode_ddns_config = _deferred({"_ddns_server": _lookup("ddnsServer", DC_ddnsServer)})
+_decode_ftp_config = _deferred({"_mode_desc": _lookup("mode", DC_FtpMode)})
+_decode_smtp_config = _deferred({"_tls_desc": _lookup("tls", DC_SmtpTlsMode)})
+
+
+def _fields(spec: str, bools: Tuple[str, ...]) -> Tuple[Tuple[str, type], ...]:
+    """Result fields from "name name:str prefix*count:str ..." (default int)"""
+    fields = []
+    for item in spec.split():
+        name, _, ftype = item.partition(":")
+        name, _, count = name.partition("*")
+        names = [f"{name}{i}" for i in range(int(count))] if count else [name]
+        for n in names:
+            fields.append((n, bool if n in bools else str if ftype == "str" else int))
+    return tuple(fields)
+
+
+def _cmd(name: str, doc: str, *params: Any, bools: Tuple[str, ...] = (),
+         decode: Optional[Callable[[ResultObj], ResultObj]] = None,
+         raw: bool = False, fields: str = "") -> Command:
+    return Command(name, doc, tuple(p if isinstance(p, Param) else Param(p) for p in params),
+                   bools, decode, raw, _fields(fields, bools))
+
+
+COMMANDS: Tuple[Command, ...] = (
+    # device
+    _cmd("getDevInfo", "Get camera information",
+         fields="productName:str serialNo:str devName:str mac:str year mon day hour min sec "
+                "timeZone firmwareVer:str hardwareVer:str"),
+    _cmd("getDevState", "Get camera state",
+         fields="IOAlarm motionDetectAlarm soundAlarm record sdState sdFreeSpace:str "
+                "sdTotalSpace:str ntpState ddnsState url:str upnpState isWifiConnected "
+                "wifiConnectedAP:str infraLedState"),
+    _cmd("getDevName", "Get camera name"),
+    _cmd("setDevName", "Set camera name", "devName"),
+    _cmd("reboot", "Reboot camera"),
+    _cmd("restore", "Restore factory settings"),
+    _cmd("getLog", "Get system log (without parameters: entries 1..10)",
+         Param("offset", optional=True), Param("count", optional=True)),
+
+    # pictures and video
+    _cmd("snapPicture", "Take a snapshot", raw=True),
+    _cmd("snapPicture2", "Take a snapshot (alternative method)", raw=True),
+    _cmd("getVideoStreamParam", "Get video stream parameters",
+         fields="resolution0 bitRate0 frameRate0 GOP0 isVBR0 "
+                "resolution1 bitRate1 frameRate1 GOP1 isVBR1"),
+    _cmd("setSubStreamFormat", "Set sub stream format (0: H.264, 1: MJPEG)", "format"),
+    _cmd("getMirrorAndFlipSetting", "Get mirror and flip settings",
+         bools=("isMirror", "isFlip"), fields="isMirror isFlip"),
+    _cmd("setMirrorAndFlipSetting", "Set mirror and flip settings", "isMirror", "isFlip"),
+    _cmd("getInfraLedConfig", "Get infrared LED configuration (Cam: decoded mode)",
+         decode=_decode_infra_led_config, fields="mode"),
+    _cmd("setInfraLedConfig", "Set infrared LED mode (Cam: descriptive value)",
+         Param("mode", encode=choice(DC_infraLedMode, "mode"))),
+    _cmd("getOSDSetting", "Get on-screen display settings",
+         bools=("isEnableTimeStamp", "isEnableDevName", "isEnableOSDMask")),
+    _cmd("setOSDSetting", "Set on-screen display settings (isEnableOSDMask has no effect)",
+         "isEnableTimeStamp", "isEnableDevName", "dispPos", "isEnableOSDMask"),
+    _cmd("getOSDMask", "Get OSD mask state (undocumented)", bools=("isEnableOSDMask",)),
+    _cmd("setOSDMask", "Enable or disable the OSD masks (undocumented)", "isEnableOSDMask"),
+
+    # motion detection and recording
+    _cmd("getMotionDetectConfig",
+         """Get motion detection configuration
+
+        Cam decodes:
+        _areas: 10x10 active areas in frame -> array of 10 strings
+        _schedules: 7 strings of 48 chars, one for each day
+        _schedule: the same as a MotionSchedule
+        _linkage: array of alarm actions
+        """,
+         bools=("isEnable",), decode=_decode_motion_detect_config,
+         fields="isEnable linkage snapInterval sensitivity triggerInterval "
+                "schedule*7:str area*10:str"),
+    _cmd("setMotionDetectConfig",
+         "Set motion detection configuration (Cam: descriptive values, binary strings)",
+         "isEnable",
+         Param("linkage", encode=BD_alarmAction.fromArray),
+         "snapInterval", "triggerInterval",
+         Param("sensitivity", encode=choice(DC_motionDetectSensitivity, "sensitivity")),
+         Param("schedules", "schedule", schedules, count=7),
+         Param("areas", "area", binaryarray2int, count=10)),
+    _cmd("getAlarmRecordConfig", "Get alarm recording configuration",
+         bools=("isEnablePreRecord",)),
+    _cmd("setAlarmRecordConfig",
+         "Set alarm recording configuration (preRecordSecs <= 5, alarmRecordSecs <= 60)",
+         "isEnablePreRecord", "preRecordSecs", "alarmRecordSecs"),
+    _cmd("getRecordList", "Get list of recordings",
+         "recordPath", Param("startTime", optional=True), Param("endTime", optional=True),
+         Param("recordType", optional=True), Param("startNo", optional=True)),
+
+    # PTZ
+    _cmd("getPTZSpeed", "Get PTZ speed (0: very fast .. 4: very slow)",
+         decode=_decode_ptz_speed, fields="speed"),
+    _cmd("setPTZSpeed", "Set PTZ speed (Cam: descriptive value)",
+         Param("speed", encode=choice(DC_ptzSpeedList, "speed"))),
+    _cmd("ptzReset", "Reset PTZ position"),
+    _cmd("ptzMoveUp", "Move camera up"),
+    _cmd("ptzMoveDown", "Move camera down"),
+    _cmd("ptzMoveLeft", "Move camera left"),
+    _cmd("ptzMoveRight", "Move camera right"),
+    _cmd("ptzStopRun", "Stop PTZ movement"),
+    _cmd("ptzGetPresetPointList", "Get PTZ preset points"),
+    _cmd("ptzAddPresetPoint", "Add PTZ preset point (addResult 2: point already exists)", "name"),
+    _cmd("ptzDeletePresetPoint",
+         "Delete PTZ preset point (deleteResult 1: does not exist, 4: used in cruise)", "name"),
+    _cmd("ptzGotoPresetPoint", "Move to PTZ preset point", "name"),
+    _cmd("ptzDelCruiseMap", "Delete PTZ cruise (delResult 1: cruise does not exist)", "name"),
+
+    # network
+    _cmd("getIPInfo", "Get IP configuration",
+         fields="isDHCP ip:str gate:str mask:str dns1:str dns2:str"),
+    _cmd("setIPInfo", "Set IP configuration", "isDHCP", "ip", "gate", "mask", "dns1", "dns2"),
+    _cmd("getPortInfo", "Get port configuration (including onvifPort)"),
+    _cmd("setPortInfo", "Set port configuration",
+         "webPort", "mediaPort", "httpsPort", Param("onvifPort", optional=True)),
+    _cmd("getWifiConfig", "Get WiFi configuration (admin only; psk is urlencoded)",
+         decode=_decode_wifi_config,
+         fields="isEnable isUseWifi isConnected connectedAP:str ssid:str netType "
+                "encryptType authMode psk:str keyFormat defaultKey key1:str key2:str "
+                "key3:str key4:str key1Len key2Len key3Len key4Len"),
+    _cmd("setWifiConfig", "Set WiFi configuration",
+         "isEnable", "ssid", "netType", Param("authMode", encode=choice(DC_WifiAuth, "auth")),
+         Param("encryptType", encode=choice(DC_WifiEncryption, "encrypt")),
+         Param("psk", optional=True), Param("key1", optional=True), Param("key2", optional=True),
+         Param("key3", optional=True), Param("key4", optional=True),
+         Param("keyIndex", optional=True)),
+    _cmd("getDDNSConfig", "Get DDNS configuration", bools=("isEnable",),
+         decode=_decode_ddns_config),
+    _cmd("setDDNSConfig", "Set DDNS configuration (Cam: descriptive ddnsServer)",
+         "isEnable", "hostName", Param("ddnsServer", encode=choice(DC_ddnsServer, "ddnsServer")),
+         "user", "password"),
+    _cmd("getFtpConfig", "Get FTP configuration", decode=_decode_ftp_config),
+    _cmd("setFtpConfig", "Set FTP configuration (Cam: descriptive mode)",
+         "ftpAddr", "ftpPort", Param("mode", encode=choice(DC_FtpMode, "mode")),
+         "userName", "password"),
+    _cmd("getSMTPConfig", "Get mail configuration (note the firmware's spelling 'reciever')",
+         bools=("isEnable", "isNeedAuth"), decode=_decode_smtp_config),
+    _cmd("setSMTPConfig", "Set mail configuration (Cam: descriptive tls)",
+         "isEnable", "server", "port", "isNeedAuth",
+         Param("tls", encode=choice(DC_SmtpTlsMode, "tls")),
+         "user", "password", "sender", "reciever"),
+    _cmd("smtpTest", "Test mail settings (result in testResult and errorMsg)",
+         "smtpServer", "port", "isNeedAuth", Param("tls", encode=choice(DC_SmtpTlsMode, "tls")),
+         "user", "password"),
+
+    # time
+    _cmd("getDevTimeConfig", "Get device time configuration (Cam: decoded formats)",
+         decode=_decode_dev_time_config,
+         fields="timeSource ntpServer:str dateFormat timeFormat timeZone isDst dst"),
+    _cmd("getSystemTime", "Get system time and its configuration",
+         bools=("isDst",), decode=_decode_system_time),
+    _cmd("setSystemTime",
+         "Set system time and its configuration (timeZone in seconds, GMT+1 = -3600)",
+         Param("timeSource", encode=choice(DC_timeSource, "timeSource")), "ntpServer",
+         Param("dateFormat", encode=choice(DC_timeDateFormat, "dateFormat")),
+         Param("timeFormat", encode=choice(DC_timeFormat, "timeFormat")),
+         "timeZone", "isDst", "dst", "year", "mon", "day", "hour", "minute", "sec"),
+)
+
+COMMAND_TABLE: Dict[str, Command] = {c.name: c for c in COMMANDS}
+
+# Typed result records by command, e.g. RECORDS["getDevState"] is DevStateRecord.
+# The classes are module attributes so that records can be pickled.
+RECORDS: Dict[str, type] = {
+    c.name: record_type(f"{c.name[3:]}Record", c.fields, __name__)
+    for c in COMMANDS if c.fields
+}
+globals().update({cls.__name__: cls for cls in RECORDS.values()})
+
+
+def _method(spec: Command, decoded: bool) -> Callable:
+    name = spec.name
+    nargs = len(spec.params)
+    signature = spec.signature()
+    bools = list(spec.bools) or None
+    decode = spec.decode if decoded else None
+    raw = spec.raw
+
+    def method(self, *args, **kwargs):
+        if kwargs or len(args) != nargs:
+            args = signature.bind(self, *args, **kwargs)
+            args.apply_defaults()
+            args = list(args.arguments.values())[1:]
+        return self._call(name, spec.build(args, decoded), raw=raw, doBool=bools, decode=decode)
+
+    method.__name__ = name
+    method.__doc__ = spec.doc
+    method.__signature__ = signature
+    method.command = spec
+    return method
+
+
+def with_commands(commands: Iterable[Command], decoded: bool = False) -> Callable[[type], type]:
+    """Class decorator adding a method per command
+
+    With decoded only commands whose Cam version differs are added.
+    Methods written out in the class body take precedence.
+    """
+    commands = list(commands)
+
+    def install(cls: type) -> type:
+        for spec in commands:
+            if decoded and not spec.decoded:
+                continue
+            if spec.name in cls.__dict__:
+                continue
+            method = _method(spec, decoded)
+            method.__qualname__ = f"{cls.__qualname__}.{spec.name}"
+            method.__module__ = cls.__module__
+            setattr(cls, spec.name, method)
+        return cls
+    return install
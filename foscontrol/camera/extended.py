@@ -1,94 +1,48 @@
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, Dict, Any
 from .base import CamBase
-from ..utils.dictionaries import (
-    DC_WifiEncryption, DC_WifiAuth, DC_motionDetectSensitivity,
-    DC_ddnsServer, DC_ptzSpeedList, DC_timeFormat, DC_timeDateFormat,
-    DC_infraLedMode, BD_alarmAction
-)
-from ..utils.arrays import binaryarray2int, array2dict
+from .commands import COMMANDS, with_commands
+from ..utils.dictionaries import DC_WifiEncryption, DC_WifiAuth
 from .result import ResultObj
+from .patch import PATCHABLE, Patcher
 
 
+@with_commands(COMMANDS, decoded=True)
 class Cam(CamBase):
-    """Extended camera interface with additional functionality"""
+    """Extended camera interface with additional functionality
 
-    def getMotionDetectConfig(self):
-        """Get motion detection configuration with decoded information
-        
-        Returns decoded information:
-        _areas: 10x10 active areas in frame -> array of 10 strings
-        _schedules: 7 strings of 48 chars, one for each day
-        _linkage: array of alarm actions
-        """
-        res = super().getMotionDetectConfig()
-        res.stringLookupConv(res.sensitivity, DC_motionDetectSensitivity, "_sensitivity")
-        res.collectBinaryArray("schedule", "_schedules", 48)
-        res.collectBinaryArray("area", "_areas", 10)
-        res.DB_convert2array("linkage", "_linkage", BD_alarmAction)
-        return res
-
-    def setMotionDetectConfig(self, isEnable, linkage, snapInterval, 
-                             triggerInterval, sensitivity, schedules, areas):
-        return super().setMotionDetectConfig(
-            isEnable,
-            BD_alarmAction.fromArray(linkage),
-            snapInterval,
-            triggerInterval,
-            DC_motionDetectSensitivity.rlookup(sensitivity),
-            binaryarray2int(schedules),
-            binaryarray2int(areas)
-        )
+    Getters decode codes and bit fields into descriptive values (fields
+    starting with an underscore), setters take descriptive values; see
+    camera.commands for the conversions.
+    """
 
-    def getPTZSpeed(self) -> ResultObj:
-        """Get PTZ speed with decoded information"""
-        res = super().sendcommand("getPTZSpeed")
-        res.stringLookupConv(res.speed, DC_ptzSpeedList, "_speed_desc")
-        return res
+    # snapshots and pending patches, shared by all camera objects of the process
+    _patcher = Patcher()
 
-    def setPTZSpeed(self, speed: str) -> ResultObj:
-        """Set PTZ speed using descriptive value"""
-        speed_val = DC_ptzSpeedList.rlookup(speed)
-        if speed_val is None:
-            raise ValueError(f"Invalid speed value. Must be one of: {', '.join(DC_ptzSpeedList.values)}")
-        return super().setPTZSpeed(int(speed_val))
+    def _cache_update(self, cmd: str, param: Optional[Dict[str, Any]], res: Any) -> Any:
+        self._patcher.command_done(self.base, cmd)
+        return super()._cache_update(cmd, param, res)
 
-    def getDevTimeConfig(self) -> ResultObj:
-        """Get device time configuration with decoded values"""
-        res = super().sendcommand("getDevTimeConfig")
-        res.stringLookupConv(res.timeFormat, DC_timeFormat, "_time_format")
-        res.stringLookupConv(res.dateFormat, DC_timeDateFormat, "_date_format")
-        return res
+    def patchMotionDetectConfig(self, **changes: Any) -> Optional[ResultObj]:
+        """Change some motion detection settings, keeping the others
 
-    def getMirrorAndFlipSetting(self) -> ResultObj:
-        """Get mirror and flip settings with boolean values"""
-        return super().sendcommand("getMirrorAndFlipSetting", doBool=["isMirror", "isFlip"])
+        Takes the arguments of setMotionDetectConfig by name, e.g.
+        ``cam.patchMotionDetectConfig(sensitivity="high")``.  The other
+        settings come from the last known configuration, read again only
+        when it is older than the patcher's ttl; concurrent patches of one
+        camera are written together.
 
-    def setMirrorAndFlipSetting(self, isMirror: bool, isFlip: bool) -> ResultObj:
-        """Set mirror and flip settings"""
-        return super().sendcommand("setMirrorAndFlipSetting", {
-            "isMirror": isMirror,
-            "isFlip": isFlip
-        }, doBool=["isMirror", "isFlip"])
-
-    def getInfraLedConfig(self) -> ResultObj:
-        """Get infrared LED configuration with decoded mode"""
-        res = super().sendcommand("getInfraLedConfig")
-        res.stringLookupConv(res.mode, DC_infraLedMode, "_mode_desc")
-        return res
+        Returns:
+            Result of the setter, or None if nothing had to be written
+        """
+        return self._patcher.patch(self, PATCHABLE["setMotionDetectConfig"], changes)
 
-    def setInfraLedConfig(self, mode: str) -> ResultObj:
-        """Set infrared LED mode using descriptive value"""
-        mode_val = DC_infraLedMode.rlookup(mode)
-        if mode_val is None:
-            raise ValueError(f"Invalid mode value. Must be one of: {', '.join(DC_infraLedMode.values)}")
-        return super().sendcommand("setInfraLedConfig", {"mode": mode_val})
+    def patchWifiConfig(self, **changes: Any) -> Optional[ResultObj]:
+        """Change some WiFi settings, keeping the others
 
-    def getWifiConfig(self) -> ResultObj:
-        """Get WiFi configuration with decoded values"""
-        res = super().sendcommand("getWifiConfig")
-        res.stringLookupConv(res.authMode, DC_WifiAuth, "_auth_desc")
-        res.stringLookupConv(res.encryptType, DC_WifiEncryption, "_encrypt_desc")
-        return res
+        Takes the CGI argument names (authMode, encryptType) with
+        descriptive values; see patchMotionDetectConfig.
+        """
+        return self._patcher.patch(self, PATCHABLE["setWifiConfig"], changes)
 
     def setWifiConfig(self, isEnable: bool, ssid: str, 
                       netType: str, auth: str, encrypt: str,
@@ -125,5 +79,5 @@ class Cam(CamBase):
                 "keyIndex": keyIndex
             })
             
-        return super().sendcommand("setWifiConfig", params)
+        return self._call("setWifiConfig", params)
 
@@ -0,0 +1,274 @@
+import re
+import asyncio
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Iterator, NamedTuple, Optional, Tuple
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+_CONTENT_LENGTH = re.compile(rb"content-length:\s*(\d+)", re.IGNORECASE)
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+
+
+class StreamStats(NamedTuple):
+    """Counters of an MJPEG stream"""
+    frames: int
+    dropped: int
+    resyncs: int
+    bytes: int
+
+
+class MJPEGStream:
+    """Reader for the camera's multipart MJPEG stream
+
+    A background thread reads the stream straight into a small set of
+    reusable buffers ("slots") and locates the frames in place: by the
+    part's Content-Length header if present, by the JPEG start/end markers
+    otherwise.  Frames are handed out as memoryviews into those buffers,
+    no frame is copied.  Up to ``queue_size`` frames wait for the
+    consumer; when it falls behind, the oldest waiting frame is dropped.
+
+    The memoryview yielded by iteration stays valid until the next frame
+    is requested; use ``bytes(frame)`` to keep a frame longer.
+    """
+
+    def __init__(self, response: Any, queue_size: int = 2,
+                 max_frame_size: int = 512 * 1024, read_size: int = 64 * 1024):
+        """Initialize stream reader
+
+        Args:
+            response: Open HTTP response of the stream
+            queue_size: Frames buffered for a slow consumer
+            max_frame_size: Largest expected frame in bytes
+            read_size: Bytes requested per socket read
+        """
+        self.response = response
+        self.queue_size = queue_size
+        self.read_size = read_size
+        ctype = response.headers.get("Content-Type", "") if response.headers is not None else ""
+        m = _BOUNDARY.search(ctype)
+        self.boundary = ("--" + m.group(1).lstrip("-")).encode("latin-1") if m else None
+
+        # a slot must hold a whole frame plus the part headers around it
+        slot_size = max_frame_size + 2 * read_size
+        self._free: Deque[bytearray] = deque(bytearray(slot_size) for _ in range(queue_size + 2))
+        self._queue: Deque[Tuple[bytearray, int, int]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._frames = 0
+        self._dropped = 0
+        self._resyncs = 0
+        self._bytes = 0
+        self._start()
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._reader, name="mjpeg-reader", daemon=True)
+        self._thread.start()
+
+    # -- reader side
+
+    def _take_slot(self) -> bytearray:
+        with self._cond:
+            if self._free:
+                return self._free.popleft()
+            # consumer is behind: reuse the oldest waiting frame's buffer
+            slot, _, _ = self._queue.popleft()
+            self._dropped += 1
+            return slot
+
+    def _publish(self, slot: bytearray, start: int, end: int) -> None:
+        with self._cond:
+            if len(self._queue) >= self.queue_size:
+                old, _, _ = self._queue.popleft()
+                self._free.append(old)
+                self._dropped += 1
+            self._queue.append((slot, start, end))
+            self._frames += 1
+            self._cond.notify_all()
+
+    def _find_frame(self, buf: bytearray, pos: int, fill: int) -> Optional[Tuple[int, int]]:
+        """Locate the next complete frame in buf[pos:fill]"""
+        soi = buf.find(JPEG_SOI, pos, fill)
+        if soi < 0:
+            return None
+        if self.boundary is not None:
+            # part headers between the boundary and the JPEG data
+            part = buf.rfind(self.boundary, pos, soi)
+            if part >= 0:
+                m = _CONTENT_LENGTH.search(buf, part, soi)
+                if m is not None:
+                    end = soi + int(m.group(1))
+                    if end <= fill:
+                        if buf[end - 2:end] == JPEG_EOI:
+                            return soi, end
+                    else:
+                        return None
+        eoi = buf.find(JPEG_EOI, soi + 2, fill)
+        if eoi < 0:
+            return None
+        return soi, eoi + 2
+
+    def _scan(self, slot: bytearray, pos: int, fill: int) -> Tuple[bytearray, int, int]:
+        """Publish the complete frames in slot[pos:fill]; returns the slot to fill next"""
+        while True:
+            found = self._find_frame(slot, pos, fill)
+            if found is None:
+                return slot, pos, fill
+            start, end = found
+            # the frame stays where it is; only the bytes after it move on
+            tail = fill - end
+            nxt = self._take_slot()
+            nxt[:tail] = slot[end:fill]
+            self._publish(slot, start, end)
+            slot, fill, pos = nxt, tail, 0
+
+    def _reader(self) -> None:
+        try:
+            slot = self._take_slot()
+            fill = 0
+            pos = 0
+            while not self._closed:
+                if fill + self.read_size > len(slot):
+                    # no frame end in a whole slot: drop what we have and resync
+                    self._resyncs += 1
+                    fill = pos = 0
+                with memoryview(slot) as view:
+                    n = self.response.readinto(view[fill:fill + self.read_size])
+                if not n:
+                    break
+                fill += n
+                self._bytes += n
+                slot, pos, fill = self._scan(slot, pos, fill)
+        except BaseException as e:
+            if not self._closed:
+                self._error = e
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self.response.close()
+
+    # -- consumer side
+
+    def __iter__(self) -> Iterator[memoryview]:
+        held: Optional[bytearray] = None
+        try:
+            while True:
+                with self._cond:
+                    if held is not None:
+                        self._free.append(held)
+                        held = None
+                    self._cond.wait_for(lambda: self._queue or self._closed)
+                    if not self._queue:
+                        break
+                    held, start, end = self._queue.popleft()
+                yield memoryview(held)[start:end]
+        finally:
+            if held is not None:
+                with self._cond:
+                    self._free.append(held)
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> None:
+        """Stop reading
+
+        The connection is shut down, so the reader thread also exits while
+        it waits for a stalled camera.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        abort = getattr(self.response, "abort", None)
+        if abort is not None:
+            abort()
+
+    def __enter__(self) -> "MJPEGStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def stats(self) -> StreamStats:
+        return StreamStats(self._frames, self._dropped, self._resyncs, self._bytes)
+
+
+class AsyncMJPEGStream(MJPEGStream):
+    """Asyncio version of MJPEGStream, iterated with ``async for``
+
+    The stream is read by a task instead of a thread; slots, dropping and
+    the lifetime of the yielded memoryviews are as in MJPEGStream.  Must be
+    created in the running loop, on an AsyncResponse.
+    """
+
+    def _start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._reader())
+
+    def _publish(self, slot: bytearray, start: int, end: int) -> None:
+        super()._publish(slot, start, end)
+        self._wakeup.set()
+
+    async def _reader(self) -> None:
+        try:
+            slot = self._take_slot()
+            fill = 0
+            pos = 0
+            while not self._closed:
+                if fill + self.read_size > len(slot):
+                    self._resyncs += 1
+                    fill = pos = 0
+                data = await self.response.read(self.read_size)
+                if not data:
+                    break
+                slot[fill:fill + len(data)] = data
+                fill += len(data)
+                self._bytes += len(data)
+                slot, pos, fill = self._scan(slot, pos, fill)
+        except BaseException as e:
+            if not self._closed:
+                self._error = e
+        finally:
+            self._closed = True
+            self._wakeup.set()
+            self.response.close()
+
+    def __iter__(self) -> Iterator[memoryview]:
+        raise TypeError("AsyncMJPEGStream is iterated with async for")
+
+    def __aiter__(self) -> AsyncIterator[memoryview]:
+        return self._consume()
+
+    async def _consume(self) -> AsyncIterator[memoryview]:
+        held: Optional[bytearray] = None
+        try:
+            while True:
+                if held is not None:
+                    self._free.append(held)
+                    held = None
+                while not self._queue and not self._closed:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                if not self._queue:
+                    break
+                held, start, end = self._queue.popleft()
+                yield memoryview(held)[start:end]
+        finally:
+            if held is not None:
+                self._free.append(held)
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> None:
+        """Stop reading and cancel the reader task"""
+        super().close()
+        self._task.cancel()
+        self._wakeup.set()
+
+    async def __aenter__(self) -> "AsyncMJPEGStream":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,248 @@
+"""Read-modify-write of setters that take a complete configuration
+
+setMotionDetectConfig and setWifiConfig write every field at once, so
+changing one of them means reading the others first.  The patchers keep
+the last known parameters of each camera (a snapshot) and only read them
+again once the snapshot is older than ``ttl``.  Patches to the same
+camera and setter that arrive while a write is in flight are merged and
+go out together in the next write; a later patch of a field wins.
+
+Snapshots are keyed by the camera's URL and shared by all camera objects
+of the process, like the in-flight requests of SingleFlight.  A setter
+or reboot issued through the normal methods drops them.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+from .commands import COMMAND_TABLE
+
+# Seconds a snapshot is used before the getter is asked again
+PATCH_TTL = 30.0
+
+
+class Patchable(NamedTuple):
+    """A setter that can be patched
+
+    getter: Command reading the current values
+    setter: Command writing them
+    binary: Parameter prefixes the getter answers as binary strings
+    quoted: Parameters the getter answers urlencoded
+    """
+    getter: str
+    setter: str
+    binary: Tuple[str, ...] = ()
+    quoted: Tuple[str, ...] = ()
+
+
+PATCHABLE: Dict[str, Patchable] = {
+    "setMotionDetectConfig": Patchable("getMotionDetectConfig", "setMotionDetectConfig",
+                                       binary=("schedule", "area")),
+    "setWifiConfig": Patchable("getWifiConfig", "setWifiConfig", quoted=("psk",)),
+}
+
+# Commands after which nothing known about the camera holds
+_RESETS = ("reboot", "restore")
+
+
+class _Batch:
+    __slots__ = ("changes", "patches", "finished", "result", "error")
+
+    def __init__(self):
+        self.changes: Dict[str, str] = {}
+        self.patches = 0
+        self.finished = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _PatcherBase:
+    """Snapshots and the merge step shared by Patcher and AsyncPatcher"""
+
+    def __init__(self, ttl: float = PATCH_TTL, clock: Callable[[], float] = time.monotonic):
+        """Initialize patcher
+
+        Args:
+            ttl: Seconds a snapshot is used before the getter is asked again
+            clock: Time source
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._snapshots: Dict[Tuple[str, str], Tuple[float, Dict[str, Optional[str]]]] = {}
+        self._snap_lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.merged = 0
+
+    def snapshot(self, base: str, setter: str) -> Optional[Dict[str, Optional[str]]]:
+        """Fresh snapshot of a camera's setter parameters, or None"""
+        with self._snap_lock:
+            entry = self._snapshots.get((base, setter))
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._snapshots[(base, setter)]
+                return None
+            return entry[1]
+
+    def _remember(self, base: str, setter: str, params: Dict[str, Optional[str]]) -> None:
+        with self._snap_lock:
+            self._snapshots[(base, setter)] = (self.clock() + self.ttl, params)
+
+    def invalidate(self, base: str, setter: Optional[str] = None) -> None:
+        """Drop the snapshot of one setter of a camera (None: all of them)"""
+        with self._snap_lock:
+            for key in list(self._snapshots):
+                if key[0] == base and setter in (None, key[1]):
+                    del self._snapshots[key]
+
+    def command_done(self, base: str, cmd: str) -> None:
+        """A command ran outside the patcher; drop what it made unknown"""
+        if cmd in PATCHABLE:
+            self.invalidate(base, cmd)
+        elif cmd in _RESETS:
+            self.invalidate(base)
+
+    def _read(self, section: Patchable, res: Any) -> Dict[str, Optional[str]]:
+        self.reads += 1
+        return COMMAND_TABLE[section.setter].read_back(res, section.binary, section.quoted)
+
+    def _merge(self, current: Dict[str, Optional[str]],
+               batch: _Batch, section: Patchable) -> Optional[Dict[str, str]]:
+        """Parameters to write, or None if the camera has them already"""
+        if all(current.get(k) == v for k, v in batch.changes.items()):
+            return None
+        self.writes += 1
+        self.merged += batch.patches - 1
+        return COMMAND_TABLE[section.setter].merge(current, batch.changes)
+
+    def _written(self, cam: Any, section: Patchable, params: Dict[str, str], res: Any) -> None:
+        # keeps the camera's result cache in step and drops the old snapshot
+        cam._cache_update(section.setter, params, res)
+        if res.result == 0:
+            self._remember(cam.base, section.setter, params)
+
+
+class Patcher(_PatcherBase):
+    """Read-modify-write of full-configuration setters for blocking cameras"""
+
+    def __init__(self, ttl: float = PATCH_TTL, clock: Callable[[], float] = time.monotonic):
+        super().__init__(ttl, clock)
+        self._cond = threading.Condition()
+        self._open: Dict[Tuple[str, str], _Batch] = {}
+        self._writing: set = set()
+
+    def patch(self, cam: Any, section: Patchable, values: Dict[str, Any]) -> Any:
+        """Change some arguments of a setter, keeping the others
+
+        Args:
+            cam: Cam to write to
+            section: Setter to patch
+            values: Setter argument -> Cam value
+
+        Returns:
+            Result of the setter, the getter's result if reading failed,
+            or None if the camera has the values already
+        """
+        changes = COMMAND_TABLE[section.setter].encode_values(values)
+        key = (cam.base, section.setter)
+        with self._cond:
+            batch = self._open.get(key)
+            if batch is None:
+                batch = self._open[key] = _Batch()
+            batch.changes.update(changes)
+            batch.patches += 1
+            # wait for the write in flight; our batch goes out after it
+            while key in self._writing and not batch.finished:
+                self._cond.wait()
+            if not batch.finished:
+                self._writing.add(key)
+                del self._open[key]
+                leader = True
+            else:
+                leader = False
+
+        if leader:
+            try:
+                batch.result = self._write(cam, section, batch)
+            except BaseException as e:
+                batch.error = e
+                self.invalidate(cam.base, section.setter)
+            finally:
+                with self._cond:
+                    batch.finished = True
+                    self._writing.discard(key)
+                    self._cond.notify_all()
+        if batch.error is not None:
+            raise batch.error
+        return batch.result
+
+    def _write(self, cam: Any, section: Patchable, batch: _Batch) -> Any:
+        current = self.snapshot(cam.base, section.setter)
+        if current is None:
+            res = cam.sendcommand(section.getter)
+            if res.result != 0:
+                return res
+            current = self._read(section, res)
+            self._remember(cam.base, section.setter, current)
+        params = self._merge(current, batch, section)
+        if params is None:
+            return None
+        res = cam.sendcommand(section.setter, params)
+        self._written(cam, section, params, res)
+        return res
+
+
+class AsyncPatcher(_PatcherBase):
+    """Asyncio version of Patcher"""
+
+    def __init__(self, ttl: float = PATCH_TTL, clock: Callable[[], float] = time.monotonic):
+        super().__init__(ttl, clock)
+        self._open: Dict[Tuple[int, str, str], _Batch] = {}
+        self._writing: Dict[Tuple[int, str, str], "asyncio.Event"] = {}
+
+    async def patch(self, cam: Any, section: Patchable, values: Dict[str, Any]) -> Any:
+        """Change some arguments of a setter, keeping the others (see Patcher.patch)"""
+        changes = COMMAND_TABLE[section.setter].encode_values(values)
+        key = (id(asyncio.get_running_loop()), cam.base, section.setter)
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = _Batch()
+        batch.changes.update(changes)
+        batch.patches += 1
+        while not batch.finished:
+            writing = self._writing.get(key)
+            if writing is None:
+                break
+            await writing.wait()
+        if not batch.finished:
+            done = self._writing[key] = asyncio.Event()
+            del self._open[key]
+            try:
+                batch.result = await self._write(cam, section, batch)
+            except BaseException as e:
+                batch.error = e
+                self.invalidate(cam.base, section.setter)
+            finally:
+                batch.finished = True
+                del self._writing[key]
+                done.set()
+        if batch.error is not None:
+            raise batch.error
+        return batch.result
+
+    async def _write(self, cam: Any, section: Patchable, batch: _Batch) -> Any:
+        current = self.snapshot(cam.base, section.setter)
+        if current is None:
+            res = await cam.sendcommand(section.getter)
+            if res.result != 0:
+                return res
+            current = self._read(section, res)
+            self._remember(cam.base, section.setter, current)
+        params = self._merge(current, batch, section)
+        if params is None:
+            return None
+        res = await cam.sendcommand(section.setter, params)
+        self._written(cam, section, params, res)
+        return res
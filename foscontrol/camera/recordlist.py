@@ -0,0 +1,139 @@
+"""Walking the recording list of a camera page by page
+
+getRecordList answers one page at a time: ``totalCnt`` recordings match,
+``curCnt`` of them are on this page as ``record0`` .. , each one
+"path,start,end,type" with start and end in seconds since the epoch.
+The next page is asked for with ``startNo``.  The iterators below fetch
+the following page while the caller works through the current one.
+"""
+
+import asyncio
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class RecordEntry(NamedTuple):
+    """One recording on the camera's SD card"""
+    path: str
+    start: int
+    end: int
+    type: int
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+
+# entries of a page, totalCnt, curCnt
+Page = Tuple[List[RecordEntry], int, int]
+
+
+def parse_record(text: str) -> Optional[RecordEntry]:
+    """RecordEntry of a "path,start,end,type" value, None if malformed"""
+    parts = text.rsplit(",", 3)
+    if len(parts) != 4:
+        return None
+    try:
+        return RecordEntry(parts[0], int(parts[1]), int(parts[2]), int(parts[3]))
+    except ValueError:
+        return None
+
+
+def parse_page(res: Any) -> Page:
+    """Entries and counters of a getRecordList answer"""
+    if res.result != 0:
+        raise RuntimeError(f"getRecordList failed: {res._result}")
+    total = int(res.get("totalCnt") or 0)
+    count = int(res.get("curCnt") or 0)
+    entries = []
+    for i in range(count):
+        value = res.get(f"record{i}")
+        entry = parse_record(value) if isinstance(value, str) else None
+        if entry is not None:
+            entries.append(entry)
+    return entries, total, count
+
+
+class RecordQuery(NamedTuple):
+    """Arguments of getRecordList, without startNo"""
+    recordPath: int
+    startTime: Optional[int] = None
+    endTime: Optional[int] = None
+    recordType: Optional[int] = None
+
+    def matches(self, entry: RecordEntry) -> bool:
+        """Whether a recording overlaps the time range (and has the type)"""
+        if self.startTime is not None and entry.end < self.startTime:
+            return False
+        if self.endTime is not None and entry.start > self.endTime:
+            return False
+        return self.recordType is None or entry.type == self.recordType
+
+
+def fetch_page(cam: Any, query: RecordQuery, start_no: int) -> Page:
+    return parse_page(cam.getRecordList(query.recordPath, query.startTime, query.endTime,
+                                        query.recordType, start_no))
+
+
+def iter_records(cam: Any, query: RecordQuery, executor: Optional[Executor] = None,
+                 first: Optional[Page] = None) -> Iterator[RecordEntry]:
+    """Recordings of a blocking camera, fetching the next page ahead
+
+    Args:
+        cam: CamBase
+        query: Recordings to list
+        executor: Runs the prefetches (default: a thread of its own)
+        first: First page, if already fetched
+    """
+    own = executor is None
+    if own:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="RecordList")
+    ahead: Optional[Future] = None
+    try:
+        page = first if first is not None else fetch_page(cam, query, 0)
+        start_no = 0
+        while True:
+            entries, total, count = page
+            start_no += count
+            ahead = None
+            if count and start_no < total:
+                ahead = executor.submit(fetch_page, cam, query, start_no)
+            for entry in entries:
+                if query.matches(entry):
+                    yield entry
+            if ahead is None:
+                return
+            page = ahead.result()
+    finally:
+        if ahead is not None:
+            ahead.cancel()
+        if own:
+            executor.shutdown(wait=False)
+
+
+async def aiter_records(cam: Any, query: RecordQuery) -> AsyncIterator[RecordEntry]:
+    """Recordings of an asyncio camera, fetching the next page ahead"""
+
+    async def fetch(start_no: int) -> Page:
+        return parse_page(await cam.getRecordList(query.recordPath, query.startTime,
+                                                  query.endTime, query.recordType, start_no))
+
+    ahead: Optional[asyncio.Task] = None
+    try:
+        page = await fetch(0)
+        start_no = 0
+        while True:
+            entries, total, count = page
+            start_no += count
+            ahead = None
+            if count and start_no < total:
+                ahead = asyncio.ensure_future(fetch(start_no))
+            for entry in entries:
+                if query.matches(entry):
+                    yield entry
+            if ahead is None:
+                return
+            page = await ahead
+    finally:
+        if ahead is not None and not ahead.done():
+            ahead.cancel()
@@ -1,61 +1,69 @@
-from typing import Dict, Any, Optional, List, Callable
+from typing import Dict, Any, Optional, List, Callable, Iterable, Tuple
 import xml.dom.minidom
 from ..utils.dictionaries import DictBits, DictChar
 
-class ResultObj:
-    """Result object from camera API calls"""
-    
-    def __init__(self, data: Dict[str, Any]):
-        """Initialize result object
-        
-        Args:
-            data: Dictionary of result data
-        """
-        self.data = data
-        self._process_result()
+# Meaning of the result codes of every CGI answer
+RESULT_MESSAGES: Dict[Optional[int], str] = {
+    0: "Success",
+    -1: "CGI request string format error",
+    -2: "Username or password error",
+    -3: "Access denied",
+    -4: "CGI execute failure",
+    -5: "Timeout",
+    -6: "Reserve",
+    -7: "Unknown error",
+    -8: "Reserve",
+    None: "Missing result parameter"
+}
 
-    def _process_result(self) -> None:
-        """Process result code and set message"""
-        result_messages = {
-            0: "Success",
-            -1: "CGI request string format error",
-            -2: "Username or password error", 
-            -3: "Access denied",
-            -4: "CGI execute failure",
-            -5: "Timeout",
-            -6: "Reserve",
-            -7: "Unknown error",
-            -8: "Reserve",
-            None: "Missing result parameter"
-        }
-        
-        msg = result_messages.get(self.result)
-        if msg is not None:
-            self.set("_result", msg)
 
-    def __getattr__(self, name: str) -> Any:
-        """Get attribute value
-        
-        Special handling for 'result' field to return as integer
-        """
-        if name == "result":
-            try:
-                return int(self.data.get(name))
-            except (ValueError, TypeError):
-                pass
-        return self.data.get(name)
+# Derived fields: name -> function(result, name) that computes the value and
+# stores it with result.set(name, ...), or stores nothing if there is none
+Derivations = Dict[str, Callable[["ResultBase", str], None]]
 
-    def __str__(self) -> str:
-        """String representation"""
-        return f"ResultObj: {self.data}"
+
+class ResultBase:
+    """Conversion helpers shared by ResultObj and the typed records
+
+    They only use get() and set(), which the subclasses provide.  Derived
+    fields registered with defer() are computed on first access and kept.
+    """
+
+    __slots__ = ()
 
     def get(self, name: str) -> Optional[Any]:
-        """Get value by name"""
-        return self.data.get(name)
+        raise NotImplementedError
 
     def set(self, name: str, value: Any) -> None:
-        """Set value by name"""
-        self.data[name] = value
+        raise NotImplementedError
+
+    def _peek(self, name: str) -> Optional[Any]:
+        """Stored value of name, without deriving it"""
+        raise NotImplementedError
+
+    def copy(self) -> "ResultBase":
+        """Shallow copy: fields set on it do not show in the original"""
+        raise NotImplementedError
+
+    def defer(self, derivations: Derivations) -> None:
+        """Compute the given derived fields when they are first read
+
+        Args:
+            derivations: Shared table, name -> function(result, name)
+        """
+        self._derived = derivations
+
+    def _derive(self, name: str) -> Optional[Any]:
+        self._derived[name](self, name)
+        return self._peek(name)
+
+    def _resolve(self) -> None:
+        """Compute all derived fields that are still pending"""
+        derived = self._derived
+        if derived:
+            for name, derive in derived.items():
+                if self._peek(name) is None:
+                    derive(self, name)
 
     def stringLookupConv(self, value: Any, 
                         converter: DictChar,
@@ -119,3 +127,250 @@ class ResultObj:
             cnt += 1
         if res:
             self.set(setparname, res)
+
+
+class ResultObj(ResultBase):
+    """Result object from camera API calls"""
+
+    _derived: Optional[Derivations] = None
+
+    def __init__(self, data: Dict[str, Any]):
+        """Initialize result object
+        
+        Args:
+            data: Dictionary of result data
+        """
+        self._data = data
+        self._process_result()
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """All values, including the derived fields"""
+        if self._derived:
+            self._resolve()
+        return self._data
+
+    @data.setter
+    def data(self, data: Dict[str, Any]) -> None:
+        self._data = data
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the derivations are functions; store their results instead
+        self._resolve()
+        state = dict(self.__dict__)
+        state.pop("_derived", None)
+        return state
+
+    def _process_result(self) -> None:
+        """Process result code and set message"""
+        msg = RESULT_MESSAGES.get(self.result)
+        if msg is not None:
+            self.set("_result", msg)
+
+    def __getattr__(self, name: str) -> Any:
+        """Get attribute value
+        
+        Special handling for 'result' field to return as integer
+        """
+        if name.startswith("__") or name == "_data":
+            raise AttributeError(name)
+        if name == "result":
+            try:
+                return int(self._data.get(name))
+            except (ValueError, TypeError):
+                pass
+        return self.get(name)
+
+    def __str__(self) -> str:
+        """String representation"""
+        return f"ResultObj: {self.data}"
+
+    def get(self, name: str) -> Optional[Any]:
+        """Get value by name"""
+        value = self._data.get(name)
+        if value is None and self._derived and name in self._derived:
+            return self._derive(name)
+        return value
+
+    def _peek(self, name: str) -> Optional[Any]:
+        return self._data.get(name)
+
+    def copy(self) -> "ResultObj":
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__)
+        new._data = dict(self._data)
+        return new
+
+    def set(self, name: str, value: Any) -> None:
+        """Set value by name"""
+        self._data[name] = value
+
+
+def copy_result(res: Any) -> Any:
+    """Copy of a result that may be handed to several callers
+
+    Raw answers (bytes) are returned as they are.
+    """
+    return res.copy() if isinstance(res, ResultBase) else res
+
+
+def _to_int(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _to_bool(value: str) -> bool:
+    return value == "1"
+
+
+# conversion applied at parse time per declared field type (str: none)
+_CONVERTERS: Dict[type, Optional[Callable[[str], Any]]] = {
+    int: _to_int, bool: _to_bool, str: None,
+}
+
+
+class ResultRecord(ResultBase):
+    """Typed result of one command, the compact alternative to ResultObj
+
+    The declared fields live in slots and are converted once when the
+    answer is parsed.  Fields the firmware sends in addition, and values
+    added with set(), go to a dict that only exists when needed.  Reading
+    an absent field gives None, as with ResultObj.
+    """
+
+    __slots__ = ("_extra", "_derived")
+    _fields: Tuple[str, ...] = ()
+    _convert: Dict[str, Optional[Callable[[str], Any]]] = {}
+    _types: Dict[str, type] = {}
+
+    def __init__(self, data: Dict[str, str]):
+        """Initialize record
+
+        Args:
+            data: Parsed CGI answer (field name to string value)
+        """
+        convert = self._convert
+        extra = None
+        for name, value in data.items():
+            if name == "CGI_Result":
+                # whitespace around the fields, not a field
+                continue
+            if name in convert:
+                conv = convert[name]
+                setattr(self, name, value if conv is None else conv(value))
+            else:
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+        self._extra = extra
+        self._derived = None
+
+    def __getattr__(self, name: str) -> Any:
+        """Value of an unset field, an extra field or _result"""
+        if name.startswith("__") or name in ("_extra", "_derived"):
+            raise AttributeError(name)
+        if name == "_result":
+            return RESULT_MESSAGES.get(self.result)
+        if name in self._convert:
+            return None
+        extra = self._extra
+        value = None if extra is None else extra.get(name)
+        if value is None and self._derived and name in self._derived:
+            return self._derive(name)
+        return value
+
+    def _peek(self, name: str) -> Optional[Any]:
+        extra = self._extra
+        return None if extra is None else extra.get(name)
+
+    def copy(self) -> "ResultRecord":
+        new = object.__new__(type(self))
+        for name, value in self._values().items():
+            object.__setattr__(new, name, value)
+        new._extra = None if self._extra is None else dict(self._extra)
+        new._derived = self._derived
+        return new
+
+    def _values(self) -> Dict[str, Any]:
+        """The fields that are set"""
+        d = {}
+        for name in self._fields:
+            try:
+                d[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        return d
+
+    def __getstate__(self) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        # the default would store None for every unset field
+        self._resolve()
+        return self._values(), self._extra
+
+    def __setstate__(self, state: Tuple[Dict[str, Any], Optional[Dict[str, Any]]]) -> None:
+        values, self._extra = state
+        self._derived = None
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """All values as a dict, like ResultObj.data"""
+        self._resolve()
+        d = self._values()
+        if self._extra:
+            d.update(self._extra)
+        msg = RESULT_MESSAGES.get(self.result)
+        if msg is not None:
+            d.setdefault("_result", msg)
+        return d
+
+    def __str__(self) -> str:
+        return f"{type(self).__name__}: {self.data}"
+
+    __repr__ = __str__
+
+    def get(self, name: str) -> Optional[Any]:
+        """Get value by name"""
+        return getattr(self, name)
+
+    def set(self, name: str, value: Any) -> None:
+        """Set value by name"""
+        if name in self._convert:
+            object.__setattr__(self, name, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[name] = value
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.data == other.data
+
+    __hash__ = None
+
+
+def record_type(name: str, fields: Iterable[Tuple[str, type]],
+                module: Optional[str] = None) -> type:
+    """Create a ResultRecord class
+
+    Args:
+        name: Class name
+        fields: (field name, int/bool/str) pairs; "result" is always added as int
+        module: Module the class is published in (needed for pickling)
+    """
+    convert = {"result": _to_int}
+    for field, ftype in fields:
+        convert[field] = _CONVERTERS[ftype]
+    namespace = {
+        "__slots__": tuple(convert),
+        "_fields": tuple(convert),
+        "_convert": convert,
+        "_types": {"result": int, **dict(fields)},
+        "__doc__": f"Typed result with the fields {', '.join(convert)}",
+    }
+    if module is not None:
+        namespace["__module__"] = module
+    return type(name, (ResultRecord,), namespace)
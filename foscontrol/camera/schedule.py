@@ -0,0 +1,243 @@
+"""Bit-packed motion detection schedules
+
+The camera's week schedule is seven 48-bit fields, ``schedule0`` (Monday)
+to ``schedule6`` (Sunday); bit k of a day is the half hour starting at
+k * 30 minutes.  setMotionDetectConfig takes them as integers, the getter
+answers with 48-character binary strings (bit 47 first).
+
+MotionSchedule packs the whole week into one integer: slot k of day d is
+bit d * 48 + k.
+"""
+
+import re
+from typing import Any, Iterable, List, Sequence, Tuple, Union
+
+DAYS = 7
+SLOTS = 48
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_DAY_MASK = (1 << SLOTS) - 1
+_WEEK_MASK = (1 << DAYS * SLOTS) - 1
+
+_TIME = re.compile(r"^(\d{1,2}):(\d{2})$")
+_ENTRY = re.compile(r"^(.*?)\s+(\d.*)$")
+
+
+def _day(name: str) -> int:
+    try:
+        return DAY_NAMES.index(name.strip().lower()[:3])
+    except ValueError:
+        raise ValueError(f"Unknown day: {name!r}") from None
+
+
+def _days(spec: str) -> List[int]:
+    """Days of "mon-fri", "sat,sun", "daily" or "*" """
+    spec = spec.strip().lower()
+    if spec in ("*", "daily", "all"):
+        return list(range(DAYS))
+    days = []
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        start = _day(first)
+        end = _day(last) if last else start
+        days.extend((start + i) % DAYS for i in range((end - start) % DAYS + 1))
+    return days
+
+
+def _slot(text: str) -> int:
+    """Half-hour slot at which a "HH:MM" time starts (24:00 gives 48)"""
+    m = _TIME.match(text.strip())
+    if m is None:
+        raise ValueError(f"Invalid time: {text!r}")
+    hour, minute = int(m.group(1)), int(m.group(2))
+    if minute not in (0, 30) or hour > 24 or (hour == 24 and minute):
+        raise ValueError(f"Schedule times are half hours from 00:00 to 24:00: {text!r}")
+    return hour * 2 + minute // 30
+
+
+def _time(slot: int) -> str:
+    return f"{slot // 2:02d}:{slot % 2 * 30:02d}"
+
+
+class MotionSchedule:
+    """Week schedule of motion detection, 7 x 48 half-hour slots in one int
+
+    >>> sched = MotionSchedule.compile("mon-fri 08:00-18:00; sat,sun 22:00-06:00")
+    >>> sched.active(0, 16)            # Monday 08:00
+    True
+    >>> cam.setMotionDetectConfig(..., sched, ...)   # Cam takes it as schedules
+    """
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        """Initialize schedule
+
+        Args:
+            bits: Packed schedule, slot k of day d is bit d * 48 + k
+        """
+        if not 0 <= bits <= _WEEK_MASK:
+            raise ValueError("Schedule has more than 7 x 48 bits")
+        self.bits = bits
+
+    @classmethod
+    def from_cgi(cls, days: Union[Sequence[Union[int, str]], Any]) -> "MotionSchedule":
+        """Schedule from the seven CGI values
+
+        Args:
+            days: Integers or binary strings for Monday..Sunday, or a result
+                with schedule0..schedule6
+        """
+        if hasattr(days, "get"):
+            days = [days.get(f"schedule{day}") for day in range(DAYS)]
+        if len(days) != DAYS:
+            raise ValueError(f"Need {DAYS} schedule days, got {len(days)}")
+        bits = 0
+        for day, value in enumerate(days):
+            if isinstance(value, str):
+                if len(value) != SLOTS:
+                    raise ValueError(f"Binary string length mismatch: {len(value)} != {SLOTS}")
+                value = int(value, 2)
+            if not 0 <= value <= _DAY_MASK:
+                raise ValueError(f"Schedule day {day} has more than {SLOTS} bits")
+            bits |= value << (day * SLOTS)
+        return cls(bits)
+
+    @classmethod
+    def compile(cls, spec: str) -> "MotionSchedule":
+        """Schedule from a description like "mon-fri 08:00-18:00, 20:00-22:00; sun 00:00-24:00"
+
+        Entries are separated by ";" or new lines: days ("mon", "mon-fri",
+        "sat, sun", "daily") followed by intervals on half hours.  An
+        interval that ends before it starts runs over midnight into the
+        next day.
+        """
+        bits = 0
+        for entry in re.split(r"[;\n]", spec):
+            entry = entry.strip()
+            if not entry:
+                continue
+            m = _ENTRY.match(entry)
+            if m is None:
+                raise ValueError(f"No time interval in {entry!r}")
+            days, intervals = m.groups()
+            for interval in intervals.split(","):
+                start, sep, end = interval.partition("-")
+                if not sep:
+                    raise ValueError(f"Invalid interval: {interval!r}")
+                first, last = _slot(start), _slot(end)
+                if first == last:
+                    continue
+                for day in _days(days):
+                    base = day * SLOTS
+                    if first < last:
+                        bits |= ((1 << (last - first)) - 1) << (base + first)
+                    else:
+                        bits |= ((1 << (SLOTS - first)) - 1) << (base + first)
+                        bits |= ((1 << last) - 1) << ((day + 1) % DAYS * SLOTS)
+        return cls(bits)
+
+    @classmethod
+    def always(cls) -> "MotionSchedule":
+        return cls(_WEEK_MASK)
+
+    def day(self, day: int) -> int:
+        """48-bit value of one day (as sent in schedule<day>)"""
+        return (self.bits >> (day * SLOTS)) & _DAY_MASK
+
+    def to_cgi(self) -> List[int]:
+        """schedule0..schedule6 for setMotionDetectConfig"""
+        return [self.day(day) for day in range(DAYS)]
+
+    def to_strings(self) -> List[str]:
+        """Binary strings as in the getter's answer and Cam's _schedules"""
+        return [format(self.day(day), f"0{SLOTS}b") for day in range(DAYS)]
+
+    def active(self, day: int, slot: int) -> bool:
+        """Whether detection is on in a half-hour slot"""
+        if not (0 <= day < DAYS and 0 <= slot < SLOTS):
+            raise IndexError(f"No slot {slot} on day {day}")
+        return bool(self.bits >> (day * SLOTS + slot) & 1)
+
+    def active_at(self, weekday: int, hour: int, minute: int = 0) -> bool:
+        """Whether detection is on at a time (weekday 0 is Monday, as datetime.weekday())"""
+        return self.active(weekday, hour * 2 + minute // 30)
+
+    def intervals(self, day: int) -> List[Tuple[int, int]]:
+        """Active (first slot, end slot) runs of a day"""
+        value = self.day(day)
+        runs = []
+        slot = 0
+        while value:
+            # skip to the next set bit, then measure the run of ones
+            zeros = (value & -value).bit_length() - 1
+            value >>= zeros
+            slot += zeros
+            ones = (~value & (value + 1)).bit_length() - 1
+            runs.append((slot, slot + ones))
+            value >>= ones
+            slot += ones
+        return runs
+
+    def describe(self) -> str:
+        """Description in the format of compile()"""
+        entries = []
+        for day in range(DAYS):
+            runs = self.intervals(day)
+            if runs:
+                entries.append(DAY_NAMES[day] + " " + ", ".join(
+                    f"{_time(a)}-{_time(b)}" for a, b in runs))
+        return "; ".join(entries)
+
+    def changed_days(self, other: "MotionSchedule") -> List[int]:
+        """Days on which two schedules differ"""
+        diff = self.bits ^ other.bits
+        return [day for day in range(DAYS) if diff >> (day * SLOTS) & _DAY_MASK]
+
+    def diff(self, other: "MotionSchedule") -> Tuple["MotionSchedule", "MotionSchedule"]:
+        """Slots switched on and off going from self to other"""
+        return MotionSchedule(other.bits & ~self.bits), MotionSchedule(self.bits & ~other.bits)
+
+    def __or__(self, other: "MotionSchedule") -> "MotionSchedule":
+        return MotionSchedule(self.bits | other.bits)
+
+    def __and__(self, other: "MotionSchedule") -> "MotionSchedule":
+        return MotionSchedule(self.bits & other.bits)
+
+    def __invert__(self) -> "MotionSchedule":
+        return MotionSchedule(~self.bits & _WEEK_MASK)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, MotionSchedule):
+            return NotImplemented
+        return self.bits == other.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __bool__(self) -> bool:
+        return bool(self.bits)
+
+    def count(self) -> int:
+        """Number of active half hours in the week"""
+        return bin(self.bits).count("1")
+
+    def __repr__(self) -> str:
+        return f"MotionSchedule.compile({self.describe()!r})"
+
+
+def schedule_changes(current: Iterable[Tuple[str, MotionSchedule]],
+                     target: MotionSchedule) -> List[Tuple[str, List[int]]]:
+    """Cameras whose schedule differs from target, with the days that differ
+
+    Args:
+        current: (camera, schedule) pairs, e.g. from getMotionDetectConfig
+        target: Wanted schedule
+
+    Returns:
+        (camera, changed days) for every camera that needs a write
+    """
+    res = []
+    for name, sched in current:
+        if sched.bits != target.bits:
+            res.append((name, sched.changed_days(target)))
+    return res
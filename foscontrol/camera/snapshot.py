@@ -0,0 +1,69 @@
+from typing import Any, NamedTuple, Optional
+from .result import ResultObj
+
+JPEG_SOI = b"\xff\xd8"
+
+# CGI error answers are a few hundred bytes; anything longer is no error answer
+MAX_ERROR_BODY = 64 * 1024
+
+
+class SnapshotInfo(NamedTuple):
+    """Outcome of a streamed snapshot"""
+    nbytes: int
+    elapsed: float
+    first_byte: float
+    result: Optional[ResultObj] = None
+
+    @property
+    def ok(self) -> bool:
+        """True if a picture was written, False if the camera sent an error"""
+        return self.result is None
+
+
+class SinkWriter:
+    """Uniform write access to files, sockets and writable buffers
+
+    Files (anything with ``write``) and sockets (``sendall``) get each chunk
+    as a memoryview.  A writable buffer (bytearray, memoryview, mmap, ...)
+    is filled from the start; ``target`` then exposes the free part, so the
+    body can be read straight into it without an intermediate chunk.
+    """
+
+    def __init__(self, sink: Any):
+        self.sink = sink
+        self.offset = 0
+        self._buffer: Optional[memoryview] = None
+        if hasattr(sink, "write"):
+            self._write = sink.write
+        elif hasattr(sink, "sendall"):
+            self._write = sink.sendall
+        else:
+            self._buffer = memoryview(sink).cast("B")
+            if self._buffer.readonly:
+                raise TypeError("snapshot sink buffer is read-only")
+            self._write = None
+
+    @property
+    def is_buffer(self) -> bool:
+        return self._buffer is not None
+
+    def target(self) -> memoryview:
+        """Free part of a buffer sink"""
+        if self.offset >= len(self._buffer):
+            raise ValueError(f"snapshot does not fit into buffer of {len(self._buffer)} bytes")
+        return self._buffer[self.offset:]
+
+    def advance(self, n: int) -> None:
+        """Account for n bytes read directly into ``target()``"""
+        self.offset += n
+
+    def write(self, chunk: memoryview) -> Any:
+        if self._buffer is not None:
+            end = self.offset + len(chunk)
+            if end > len(self._buffer):
+                raise ValueError(f"snapshot does not fit into buffer of {len(self._buffer)} bytes")
+            self._buffer[self.offset:end] = chunk
+            self.offset = end
+            return None
+        self.offset += len(chunk)
+        return self._write(chunk)
@@ -0,0 +1,5 @@
+"""Continuous snapshot capture"""
+
+from .engine import CaptureEngine, CaptureStats, Frame, FrameRing
+
+__all__ = ["CaptureEngine", "CaptureStats", "Frame", "FrameRing"]
@@ -0,0 +1,225 @@
+import time
+import threading
+from collections import deque
+from typing import (
+    Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+)
+from ..camera.base import CamBase
+
+# snapPicture2 answers are limited to 512000 bytes (see docs/cgi-notes.txt)
+MAX_SNAPSHOT = 512000
+
+
+class Frame(NamedTuple):
+    """One captured snapshot"""
+    camera: str
+    seq: int
+    timestamp: float
+    data: bytes
+    latency: float
+
+
+class CaptureStats(NamedTuple):
+    """Counters of one camera's capture loop"""
+    captured: int
+    dropped: int
+    errors: int
+    fps: float
+    last_error: Optional[BaseException]
+
+
+class FrameRing:
+    """Thread-safe ring buffer of the most recent frames"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._frames: Deque[Frame] = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._closed = False
+
+    def append(self, camera: str, timestamp: float, data: bytes, latency: float) -> Frame:
+        with self._cond:
+            self._seq += 1
+            frame = Frame(camera, self._seq, timestamp, data, latency)
+            self._frames.append(frame)
+            self._cond.notify_all()
+        return frame
+
+    def latest(self, n: Optional[int] = None, camera: Optional[str] = None) -> List[Frame]:
+        """The last n frames (all buffered ones if n is None), oldest first"""
+        with self._cond:
+            frames = [f for f in self._frames if camera is None or f.camera == camera]
+        return frames if n is None else frames[-n:]
+
+    def wait_after(self, seq: int, timeout: Optional[float] = None) -> List[Frame]:
+        """Frames newer than seq, waiting until there is at least one
+
+        Frames that already left the ring are silently skipped.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq or self._closed, timeout)
+            return [f for f in self._frames if f.seq > seq]
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+class _CameraLoop:
+    def __init__(self, name: str, cam: CamBase):
+        self.name = name
+        self.cam = cam
+        self.captured = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[BaseException] = None
+        self.started = 0.0
+        self.thread: Optional[threading.Thread] = None
+
+
+class CaptureEngine:
+    """Rate-controlled snapshot capture from one or many cameras
+
+    Every camera is polled by its own thread on a fixed grid of
+    ``start + k / fps``, so timing errors do not accumulate.  When a
+    snapshot takes longer than the frame interval, the grid points that
+    already passed are skipped and counted as dropped instead of being
+    caught up.  The last ``buffer_size`` frames of all cameras are kept in
+    a ring buffer; consumers iterate ``frames()`` or register a callback.
+    """
+
+    def __init__(self, cameras: Union[Dict[str, CamBase], Iterable[CamBase], Any],
+                 fps: float,
+                 buffer_size: int = 100,
+                 max_frame_size: int = MAX_SNAPSHOT):
+        """Initialize engine
+
+        Args:
+            cameras: {name: camera}, a list of cameras or a CamFleet
+            fps: Target frames per second per camera
+            buffer_size: Frames kept in the ring buffer
+            max_frame_size: Largest expected snapshot in bytes
+        """
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        if hasattr(cameras, "camera") and hasattr(cameras, "specs"):
+            cameras = {name: cameras.camera(name) for name in cameras}
+        elif not isinstance(cameras, dict):
+            cameras = {cam.base: cam for cam in cameras}
+        self.period = 1.0 / fps
+        self.fps = fps
+        self.max_frame_size = max_frame_size
+        self.ring = FrameRing(buffer_size)
+        self._loops = {name: _CameraLoop(name, cam) for name, cam in cameras.items()}
+        self._callbacks: List[Callable[[Frame], Any]] = []
+        self._stop = threading.Event()
+
+    def subscribe(self, callback: Callable[[Frame], Any]) -> None:
+        """Call callback(frame) for every new frame, from the capture thread
+
+        A slow callback delays that camera's next capture (which is then
+        counted as dropped), it does not block other cameras.
+        """
+        self._callbacks.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Frame], Any]) -> None:
+        self._callbacks.remove(callback)
+
+    def start(self) -> "CaptureEngine":
+        """Start capturing; an engine stopped before starts over with an empty ring and stats"""
+        if self.ring.closed:
+            self.ring = FrameRing(self.ring.capacity)
+        self._stop.clear()
+        start = time.monotonic()
+        for loop in self._loops.values():
+            loop.captured = loop.dropped = loop.errors = 0
+            loop.last_error = None
+            loop.started = start
+            loop.thread = threading.Thread(target=self._run, args=(loop, start),
+                                           name=f"capture-{loop.name}", daemon=True)
+            loop.thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        for loop in self._loops.values():
+            if loop.thread is not None:
+                loop.thread.join(timeout)
+        self.ring.close()
+
+    def __enter__(self) -> "CaptureEngine":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _run(self, loop: _CameraLoop, start: float) -> None:
+        buf = bytearray(self.max_frame_size)
+        view = memoryview(buf)
+        tick = 0
+        while not self._stop.is_set():
+            due = start + tick * self.period
+            delay = due - time.monotonic()
+            if delay > 0 and self._stop.wait(delay):
+                break
+
+            t0 = time.monotonic()
+            timestamp = time.time()
+            try:
+                info = loop.cam.snapPictureTo(buf)
+                if not info.ok:
+                    raise RuntimeError(f"{loop.name}: snapshot failed ({info.result._result})")
+                frame = self.ring.append(loop.name, timestamp, bytes(view[:info.nbytes]),
+                                         time.monotonic() - t0)
+                loop.captured += 1
+                for callback in list(self._callbacks):
+                    callback(frame)
+            except Exception as e:
+                loop.errors += 1
+                loop.last_error = e
+
+            # next grid point in the future; the ones in between are dropped
+            passed = int((time.monotonic() - start) / self.period)
+            next_tick = max(tick + 1, passed + 1)
+            loop.dropped += next_tick - tick - 1
+            tick = next_tick
+
+    def frames(self, camera: Optional[str] = None,
+               timeout: Optional[float] = None) -> Iterator[Frame]:
+        """Yield new frames as they arrive, until the engine stops
+
+        A consumer that falls behind by more than the ring buffer misses
+        the frames that were pushed out.
+
+        Args:
+            camera: Only frames of this camera
+            timeout: Stop when no frame arrives for this many seconds
+        """
+        last = self.ring.latest(1)
+        seq = last[0].seq if last else 0
+        while True:
+            frames = self.ring.wait_after(seq, timeout)
+            if not frames:
+                return
+            for frame in frames:
+                seq = frame.seq
+                if camera is None or frame.camera == camera:
+                    yield frame
+
+    def stats(self) -> Dict[str, CaptureStats]:
+        """Achieved frame rate, dropped frames and errors per camera"""
+        now = time.monotonic()
+        res = {}
+        for name, loop in self._loops.items():
+            elapsed = now - loop.started if loop.started else 0.0
+            res[name] = CaptureStats(
+                loop.captured, loop.dropped, loop.errors,
+                loop.captured / elapsed if elapsed > 0 else 0.0,
+                loop.last_error)
+        return res
@@ -0,0 +1,11 @@
+"""Operations on many cameras at once"""
+
+from .fleet import CamFleet, CameraSpec, FleetResult
+from .batch import ResultBatch
+from .areas import AreaMasks
+from .sync import FleetSync, SyncPlan, SyncSection
+from .upload import FleetUpload, TokenBucket, UploadProgress
+
+__all__ = ["CamFleet", "CameraSpec", "FleetResult", "ResultBatch", "AreaMasks",
+           "FleetSync", "SyncPlan", "SyncSection", "FleetUpload", "TokenBucket",
+           "UploadProgress"]
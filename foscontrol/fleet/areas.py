@@ -0,0 +1,143 @@
+"""Motion detection area masks of a whole fleet (optional, needs numpy)"""
+
+from typing import Any, Dict, Iterator, List, Optional
+from ..camera.areas import AREA_COLS, AREA_ROWS, masks_from_values, values_from_masks
+from ..utils.arrays import require_numpy
+from .batch import ResultBatch
+from .fleet import CamFleet, FleetResult
+
+# setMotionDetectConfig parameters besides the areas, as read back by the getter
+_MOTION_FIELDS = ("isEnable", "linkage", "snapInterval", "triggerInterval", "sensitivity")
+
+
+def _cgi_int(value: Any) -> int:
+    """Bit field as sent by setMotionDetectConfig (the getter answers binary strings)"""
+    return int(value, 2) if isinstance(value, str) else int(value)
+
+
+def _np() -> Any:
+    return require_numpy("AreaMasks")
+
+
+class AreaMasks:
+    """The area masks of many cameras as one (N, 10, 10) bool array
+
+    Built from getMotionDetectConfig results; cameras that failed or sent
+    no areas are left out.  ``masks[i]`` belongs to ``cameras[i]``.
+
+    >>> masks = AreaMasks.collect(fleet)
+    >>> masks.cell_coverage()          # share of cameras watching each block
+    >>> masks.apply(fleet, new_mask)   # writes only the cameras that differ
+    """
+
+    def __init__(self, cameras: List[str], masks: Any,
+                 configs: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Initialize from masks
+
+        Args:
+            cameras: Camera names
+            masks: bool array-like of shape (len(cameras), 10, 10)
+            configs: Current motion detection settings per camera (raw CGI
+                values), needed by apply()
+        """
+        np = _np()
+        self.cameras = list(cameras)
+        self.masks = np.array(masks, dtype=bool).reshape(len(self.cameras), AREA_ROWS, AREA_COLS)
+        self.configs = configs or {}
+
+    @classmethod
+    def from_batch(cls, batch: ResultBatch) -> "AreaMasks":
+        """Masks from a ResultBatch of getMotionDetectConfig"""
+        rows = [row for row in batch.rows()
+                if row["error"] is None and row.get("result") == 0
+                and all(row.get(f"area{r}") is not None for r in range(AREA_ROWS))]
+        values = [[_cgi_int(row[f"area{r}"]) for r in range(AREA_ROWS)] for row in rows]
+        configs = {row["camera"]: {k: v for k, v in row.items() if k not in ("camera", "error")}
+                   for row in rows}
+        np = _np()
+        masks = masks_from_values(np.array(values, dtype=np.int64).reshape(len(rows), AREA_ROWS))
+        return cls([row["camera"] for row in rows], masks, configs)
+
+    @classmethod
+    def collect(cls, fleet: CamFleet, **kwargs) -> "AreaMasks":
+        """Read the masks of every camera (kwargs as for CamFleet.run)"""
+        return cls.from_batch(fleet.collect("getMotionDetectConfig", **kwargs))
+
+    def __len__(self) -> int:
+        return len(self.cameras)
+
+    def __getitem__(self, camera: str) -> Any:
+        return self.masks[self.cameras.index(camera)]
+
+    def union(self) -> Any:
+        """Blocks watched by any camera"""
+        return self.masks.any(axis=0)
+
+    def intersection(self) -> Any:
+        """Blocks watched by every camera"""
+        return self.masks.all(axis=0)
+
+    def coverage(self) -> Any:
+        """Share of the picture watched, per camera"""
+        return self.masks.mean(axis=(1, 2))
+
+    def cell_coverage(self) -> Any:
+        """Share of the cameras watching each block, (10, 10)"""
+        return self.masks.mean(axis=0)
+
+    def differs(self, target: Any) -> Any:
+        """Per camera, whether its mask differs from target
+
+        Args:
+            target: One (10, 10) mask for all cameras or an (N, 10, 10) stack
+        """
+        np = _np()
+        target = np.broadcast_to(np.asarray(target, dtype=bool), self.masks.shape)
+        return (self.masks != target).any(axis=(1, 2))
+
+    def apply(self, fleet: CamFleet, target: Any, **kwargs) -> Iterator[FleetResult]:
+        """Write target masks to the cameras whose mask differs
+
+        The other motion detection settings are written back as read.
+        Cameras already showing the target are skipped; the masks are
+        updated for every camera that succeeded.
+
+        Args:
+            fleet: Fleet containing the cameras
+            target: One (10, 10) mask for all cameras or an (N, 10, 10) stack
+            **kwargs: Passed to CamFleet.run (timeout, ...)
+
+        Returns:
+            Iterator of FleetResult of the cameras written
+        """
+        np = _np()
+        target = np.broadcast_to(np.asarray(target, dtype=bool), self.masks.shape)
+        changed = np.flatnonzero(self.differs(target))
+        if not len(changed):
+            return
+        values = values_from_masks(target)
+        names = [self.cameras[i] for i in changed]
+        params = {fleet.camera(name): self._params(name, values[i])
+                  for name, i in zip(names, changed)}
+
+        def write(cam):
+            # through call(), so that cached reads and patch snapshots are dropped
+            return cam.call("setMotionDetectConfig", params[cam])
+
+        index = {name: i for i, name in enumerate(self.cameras)}
+        for res in fleet.run(write, cameras=names, **kwargs):
+            if res.ok and res.value.result == 0:
+                i = index[res.name]
+                self.masks[i] = target[i]
+            yield res
+
+    def _params(self, camera: str, values: Any) -> Dict[str, Any]:
+        if camera not in self.configs:
+            raise KeyError(f"No motion detection settings read for {camera}")
+        config = self.configs[camera]
+        param = {k: config[k] for k in _MOTION_FIELDS}
+        for day in range(7):
+            param[f"schedule{day}"] = _cgi_int(config[f"schedule{day}"])
+        for row in range(AREA_ROWS):
+            param[f"area{row}"] = int(values[row])
+        return param
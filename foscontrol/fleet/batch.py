@@ -0,0 +1,259 @@
+"""Column-wise storage of one command's results across a fleet"""
+
+import csv
+import json
+import sys
+from array import array
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Sequence, Union
+from ..camera.commands import COMMAND_TABLE
+from ..camera.result import ResultObj, ResultRecord
+from ..utils.arrays import require_numpy
+
+# array typecodes of the typed columns
+_TYPECODES = {int: "q", bool: "b"}
+
+
+class Column:
+    """Values of one field, in row order
+
+    int and bool fields are kept in an array (bools as 0/1) with a lazily
+    created mask of missing rows; anything else is a list.  A typed column
+    falls back to a list when a value does not convert.
+    """
+
+    __slots__ = ("name", "type", "values", "missing")
+
+    def __init__(self, name: str, type_: type = str, rows: int = 0):
+        """Initialize column
+
+        Args:
+            name: Field name
+            type_: int, bool or str
+            rows: Number of rows before the first value (recorded as missing)
+        """
+        self.name = name
+        self.type = type_ if type_ in _TYPECODES else str
+        self.missing: Optional[array] = None
+        if self.type is str:
+            self.values: Union[array, List[Any]] = [None] * rows
+        else:
+            self.values = array(_TYPECODES[self.type], bytes(rows * 8 if self.type is int else rows))
+            if rows:
+                self.missing = array("b", b"\x01" * rows)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value: Any) -> None:
+        if self.type is str:
+            self.values.append(value)
+            return
+        if value is None:
+            if self.missing is None:
+                self.missing = array("b", bytes(len(self.values)))
+            self.missing.append(1)
+            self.values.append(0)
+            return
+        try:
+            value = int(value) if self.type is int else 1 if value in (1, "1") else 0
+        except (TypeError, ValueError):
+            self._untype()
+            self.values.append(value)
+            return
+        self.values.append(value)
+        if self.missing is not None:
+            self.missing.append(0)
+
+    def _untype(self) -> None:
+        self.values = [self[i] for i in range(len(self.values))]
+        self.type = str
+        self.missing = None
+
+    def __getitem__(self, row: int) -> Any:
+        if self.missing is not None and self.missing[row]:
+            return None
+        value = self.values[row]
+        return bool(value) if self.type is bool else value
+
+    def take(self, rows: Sequence[int]) -> "Column":
+        col = Column(self.name, self.type)
+        if self.type is str:
+            col.values = [self.values[i] for i in rows]
+        else:
+            col.values = array(self.values.typecode, [self.values[i] for i in rows])
+            if self.missing is not None:
+                col.missing = array("b", [self.missing[i] for i in rows])
+        return col
+
+
+def _fields_of(result: Any) -> Dict[str, Any]:
+    """Raw fields of a result, without the derived _xxx ones"""
+    if isinstance(result, ResultRecord):
+        values = result._values()
+        if result._extra:
+            values.update(result._extra)
+    elif isinstance(result, ResultObj):
+        values = result._data
+    elif result is None:
+        return {}
+    else:
+        values = dict(result)
+    return {k: v for k, v in values.items() if not k.startswith("_") and k != "CGI_Result"}
+
+
+class ResultBatch:
+    """Results of one command from many cameras, stored column-wise
+
+    Each field becomes a Column; numeric and boolean fields are typed
+    arrays, so a thousand getDevState results take a few kilobytes per
+    field and export to NumPy without copying.  Rows are cameras: the
+    ``cameras`` and ``errors`` lists run parallel to the columns.
+
+    >>> batch = fleet.collect("getDevState")
+    >>> failing = batch.where("result", lambda r: r != 0)
+    >>> by_firmware = info_batch.group_by("firmwareVer")
+    """
+
+    def __init__(self, command: Optional[str] = None,
+                 types: Optional[Dict[str, type]] = None):
+        """Initialize empty batch
+
+        Args:
+            command: Command of the results; its declared result fields
+                (see camera.commands) give the column types
+            types: Column types (int, bool or str) in addition to the declared ones
+        """
+        self.command = command
+        self.types: Dict[str, type] = {"result": int}
+        spec = COMMAND_TABLE.get(command) if command else None
+        if spec is not None:
+            self.types.update(spec.fields)
+        if types:
+            self.types.update(types)
+        self.cameras: List[str] = []
+        self.errors: List[Optional[BaseException]] = []
+        self.columns: Dict[str, Column] = {}
+
+    def __len__(self) -> int:
+        return len(self.cameras)
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.columns)
+
+    def append(self, camera: str, result: Any, error: Optional[BaseException] = None) -> None:
+        """Add one camera's result
+
+        Args:
+            camera: Camera name
+            result: ResultObj, typed record or dict of fields (None if failed)
+            error: Exception of a failed command
+        """
+        rows = len(self.cameras)
+        values = _fields_of(result)
+        for name, value in values.items():
+            col = self.columns.get(name)
+            if col is None:
+                name = sys.intern(name)
+                col = self.columns[name] = Column(name, self.types.get(name, str), rows)
+            col.append(value)
+        if len(values) != len(self.columns):
+            for name, col in self.columns.items():
+                if name not in values:
+                    col.append(None)
+        self.cameras.append(camera)
+        self.errors.append(error)
+
+    def extend(self, results: Iterable[Any]) -> "ResultBatch":
+        """Add FleetResults (as yielded by CamFleet.run)"""
+        for res in results:
+            self.append(res.name, res.value if res.error is None else None, res.error)
+        return self
+
+    def column(self, name: str) -> Union[array, List[Any]]:
+        """Stored values of a field (bools as 0/1, missing as 0 in typed columns)"""
+        return self.columns[name].values
+
+    def values(self, name: str) -> List[Any]:
+        """Values of a field as Python objects, None where missing"""
+        col = self.columns.get(name)
+        if col is None:
+            return [None] * len(self)
+        return [col[i] for i in range(len(col))]
+
+    def where(self, name: str, predicate: Callable[[Any], bool]) -> "ResultBatch":
+        """Rows whose field satisfies predicate
+
+        Rows without the field (failed cameras) are passed None.
+        """
+        return self.take([i for i, v in enumerate(self.values(name)) if predicate(v)])
+
+    def failed(self) -> "ResultBatch":
+        """Rows of cameras that did not answer or answered with result != 0"""
+        results = self.values("result")
+        return self.take([i for i, e in enumerate(self.errors) if e is not None or results[i] != 0])
+
+    def take(self, rows: Sequence[int]) -> "ResultBatch":
+        """New batch with the given rows"""
+        batch = ResultBatch(self.command, self.types)
+        batch.cameras = [self.cameras[i] for i in rows]
+        batch.errors = [self.errors[i] for i in rows]
+        batch.columns = {name: col.take(rows) for name, col in self.columns.items()}
+        return batch
+
+    def group_by(self, name: str) -> Dict[Any, "ResultBatch"]:
+        """Batches by the value of a field"""
+        groups: Dict[Any, List[int]] = {}
+        for i, value in enumerate(self.values(name)):
+            groups.setdefault(value, []).append(i)
+        return {value: self.take(rows) for value, rows in groups.items()}
+
+    def row(self, index: int) -> Dict[str, Any]:
+        error = self.errors[index]
+        d = {"camera": self.cameras[index], "error": None if error is None else str(error)}
+        for name, col in self.columns.items():
+            d[name] = col[index]
+        return d
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_numpy(self, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Columns as NumPy arrays
+
+        Typed columns are views on the stored arrays (no copy), so the batch
+        cannot grow while they exist; columns with missing values come as
+        masked arrays, strings as object arrays.
+
+        Args:
+            names: Fields to export (default: all)
+        """
+        np = require_numpy("ResultBatch.to_numpy")
+        res = {}
+        for name in (self.columns if names is None else names):
+            col = self.columns[name]
+            if col.type is str:
+                arr = np.array(col.values, dtype=object)
+            else:
+                arr = np.frombuffer(col.values, dtype=np.int64 if col.type is int else np.bool_)
+                if col.missing is not None:
+                    arr = np.ma.MaskedArray(arr, mask=np.frombuffer(col.missing, dtype=np.bool_))
+            res[name] = arr
+        return res
+
+    def write_csv(self, f: IO[str], names: Optional[Sequence[str]] = None) -> None:
+        """Write one line per camera (missing values are empty)"""
+        header = ["camera", "error"] + list(self.columns if names is None else names)
+        writer = csv.DictWriter(f, header, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(self.rows())
+
+    def write_jsonl(self, f: IO[str], names: Optional[Sequence[str]] = None) -> None:
+        """Write one JSON object per camera (missing values are null)"""
+        keep = None if names is None else {"camera", "error", *names}
+        for row in self.rows():
+            if keep is not None:
+                row = {k: v for k, v in row.items() if k in keep}
+            f.write(json.dumps(row))
+            f.write("\n")
@@ -0,0 +1,366 @@
+import ssl
+import time
+import heapq
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from configparser import ConfigParser
+from typing import (
+    TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional,
+    Tuple, Union
+)
+from ..camera.extended import Cam
+from ..camera.cache import ResultCache
+from ..camera.recordlist import Page, RecordEntry, RecordQuery, fetch_page, iter_records
+from ..utils.network import ConnectionPool
+from ..utils.deadline import Deadline
+from ..utils.metrics import RequestTiming
+
+if TYPE_CHECKING:
+    from .batch import ResultBatch
+
+
+class CameraSpec(NamedTuple):
+    """Inventory record of one camera"""
+    host: str
+    port: int
+    user: str
+    password: str
+    prot: str = "http"
+    name: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Name used to identify the camera in fleet results"""
+        return self.name or f"{self.host}:{self.port}"
+
+
+class FleetResult(NamedTuple):
+    """Outcome of one command on one camera"""
+    name: str
+    value: Any
+    error: Optional[BaseException]
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def timed_out(self) -> bool:
+        return isinstance(self.error, TimeoutError)
+
+
+def _as_spec(record: Union[CameraSpec, Dict[str, Any]]) -> CameraSpec:
+    if isinstance(record, CameraSpec):
+        return record
+    record = dict(record)
+    if "protocol" in record:
+        record["prot"] = record.pop("protocol")
+    record["port"] = int(record["port"])
+    return CameraSpec(**record)
+
+
+class CamFleet:
+    """Run Cam commands across many cameras with bounded concurrency
+
+    At most ``max_concurrency`` commands are in flight for the whole fleet
+    and at most ``per_camera`` for any single camera (the embedded web
+    servers handle requests one at a time anyway).  Results are yielded as
+    they complete; a camera that fails or exceeds ``timeout`` is reported
+    in its FleetResult and never holds up the others.
+    """
+
+    def __init__(self, inventory: Iterable[Union[CameraSpec, Dict[str, Any]]],
+                 max_concurrency: int = 32,
+                 per_camera: int = 1,
+                 timeout: Optional[float] = None,
+                 context: Optional[ssl.SSLContext] = None,
+                 pool: Optional[ConnectionPool] = None,
+                 cache: Optional[ResultCache] = None,
+                 cam_class: Callable[..., Cam] = Cam):
+        """Initialize fleet
+
+        Args:
+            inventory: Camera records (CameraSpec or dicts with the same keys)
+            max_concurrency: Commands in flight across the fleet
+            per_camera: Commands in flight per camera
+            timeout: Default seconds before a camera is reported as timed out
+            context: SSL context for HTTPS cameras
+            pool: Connection pool shared by the cameras
+            cache: Result cache shared by the cameras
+            cam_class: Camera class to instantiate
+        """
+        self.specs: Dict[str, CameraSpec] = {}
+        for record in inventory:
+            spec = _as_spec(record)
+            if spec.key in self.specs:
+                raise ValueError(f"Duplicate camera in inventory: {spec.key}")
+            self.specs[spec.key] = spec
+        self.max_concurrency = max_concurrency
+        self.per_camera = per_camera
+        self.timeout = timeout
+        self.context = context
+        self.pool = pool
+        self.cache = cache
+        self.cam_class = cam_class
+        self._cams: Dict[str, Cam] = {}
+        self._busy: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._observers: List[Callable[[RequestTiming], Any]] = []
+
+    @classmethod
+    def from_config(cls, filenames: Union[str, List[str]], **kwargs) -> "CamFleet":
+        """Build fleet from cam.cfg style files, one section per camera"""
+        config = ConfigParser()
+        config.read(filenames)
+        inventory = []
+        for section in config.sections():
+            cfg = config[section]
+            inventory.append(CameraSpec(
+                host=cfg.get("host"),
+                port=cfg.getint("port"),
+                user=cfg.get("user"),
+                password=cfg.get("password"),
+                prot=cfg.get("protocol", "http"),
+                name=section,
+            ))
+        return cls(inventory, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.specs)
+
+    def camera(self, name: str) -> Cam:
+        """Return (and create on first use) the camera object for name"""
+        with self._lock:
+            cam = self._cams.get(name)
+            if cam is None:
+                spec = self.specs[name]
+                cam = self.cam_class(spec.prot, spec.host, spec.port, spec.user,
+                                     spec.password, context=self.context, pool=self.pool,
+                                     cache=self.cache)
+                cam.observers.extend(self._observers)
+                self._cams[name] = cam
+            return cam
+
+    def add_observer(self, observer: Callable[[RequestTiming], Any]) -> None:
+        """Attach a request observer (see CamBase.add_observer) to every camera"""
+        with self._lock:
+            self._observers.append(observer)
+            for cam in self._cams.values():
+                cam.add_observer(observer)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                    thread_name_prefix="CamFleet")
+            return self._executor
+
+    def _try_acquire(self, name: str) -> bool:
+        with self._lock:
+            busy = self._busy.get(name, 0)
+            if busy >= self.per_camera:
+                return False
+            self._busy[name] = busy + 1
+            return True
+
+    def _release(self, name: str) -> None:
+        with self._lock:
+            self._busy[name] -= 1
+
+    @staticmethod
+    def _try_slots(slots: List[threading.Semaphore]) -> bool:
+        """Take all slots without blocking, or none of them"""
+        for i, slot in enumerate(slots):
+            if not slot.acquire(blocking=False):
+                for taken in slots[:i]:
+                    taken.release()
+                return False
+        return True
+
+    def _finish(self, name: str, slots: List[threading.Semaphore]) -> None:
+        for slot in slots:
+            slot.release()
+        self._release(name)
+
+    def _invoke(self, name: str, method: Union[str, Callable[..., Any]],
+                args: tuple, kwargs: Dict[str, Any], timeout: Optional[float] = None,
+                started: Optional[List[float]] = None) -> Any:
+        if started is not None:
+            # the camera's time runs from here, not from the submission
+            started.append(time.monotonic())
+        cam = self.camera(name)
+        if isinstance(method, str):
+            call = getattr(cam, method)
+        else:
+            call = lambda *a, **kw: method(cam, *a, **kw)
+        if timeout is None:
+            return call(*args, **kwargs)
+        # the budget makes the camera's requests give up, freeing the worker
+        with Deadline(timeout):
+            return call(*args, **kwargs)
+
+    def run(self, method: Union[str, Callable[..., Any]], *args,
+            cameras: Optional[Iterable[str]] = None,
+            timeout: Optional[float] = None,
+            slots: Optional[Callable[[str], Iterable[threading.Semaphore]]] = None,
+            **kwargs) -> Iterator[FleetResult]:
+        """Run a command on every camera, yielding results as they complete
+
+        Args:
+            method: Cam method name, or callable taking the camera as first argument
+            *args: Positional arguments for the method
+            cameras: Names of the cameras to use (default: all)
+            timeout: Seconds per camera, overrides the fleet default
+            slots: Semaphores a camera's call must hold, e.g. a limit per
+                site; the camera is only handed to a worker once all of
+                them are free, and they are released when the call ends
+            **kwargs: Keyword arguments for the method
+
+        Returns:
+            Iterator of FleetResult, in completion order
+        """
+        if timeout is None:
+            timeout = self.timeout
+        pending: Deque[str] = deque(self.specs if cameras is None else cameras)
+        for name in pending:
+            if name not in self.specs:
+                raise KeyError(f"Unknown camera: {name}")
+        executor = self._get_executor()
+        inflight: Dict[Future, tuple] = {}
+
+        try:
+            while pending or inflight:
+                # dispatch while below the global limit and the camera is free
+                blocked = 0
+                while pending and len(inflight) < self.max_concurrency and blocked < len(pending):
+                    name = pending.popleft()
+                    held = list(slots(name)) if slots is not None else []
+                    if not self._try_acquire(name):
+                        pending.append(name)
+                        blocked += 1
+                        continue
+                    if not self._try_slots(held):
+                        self._release(name)
+                        pending.append(name)
+                        blocked += 1
+                        continue
+                    started: List[float] = []
+                    fut = executor.submit(self._invoke, name, method, args, kwargs, timeout,
+                                          started)
+                    fut.add_done_callback(lambda f, n=name, h=held: self._finish(n, h))
+                    inflight[fut] = (name, started)
+
+                wait_for = None
+                if timeout is not None and inflight:
+                    starts = [s[0] for _, s in inflight.values() if s]
+                    if starts:
+                        wait_for = max(0.0, min(starts) + timeout - time.monotonic())
+                    if len(starts) < len(inflight):
+                        # queued behind busy workers: watch for them to start
+                        wait_for = 0.05 if wait_for is None else min(wait_for, 0.05)
+                if pending and blocked:
+                    # camera busy with another run or slots taken: poll for them
+                    wait_for = 0.05 if wait_for is None else min(wait_for, 0.05)
+                if inflight:
+                    done, _ = wait(list(inflight), timeout=wait_for, return_when=FIRST_COMPLETED)
+                else:
+                    done = set()
+                    time.sleep(wait_for or 0)
+
+                now = time.monotonic()
+                for fut in done:
+                    name, started = inflight.pop(fut)
+                    error = fut.exception()
+                    value = None if error is not None else fut.result()
+                    yield FleetResult(name, value, error, now - started[0] if started else 0.0)
+                if timeout is None:
+                    continue
+                for fut, (name, started) in list(inflight.items()):
+                    if started and now >= started[0] + timeout:
+                        del inflight[fut]
+                        fut.cancel()
+                        yield FleetResult(name, None,
+                                          TimeoutError(f"{name}: no result after {timeout}s"),
+                                          now - started[0])
+        finally:
+            for fut in inflight:
+                fut.cancel()
+
+    def call(self, method: Union[str, Callable[..., Any]], *args, **kwargs) -> Dict[str, FleetResult]:
+        """Run a command on every camera and wait for all results"""
+        return {res.name: res for res in self.run(method, *args, **kwargs)}
+
+    def collect(self, method: str, *args, **kwargs) -> "ResultBatch":
+        """Run a getter on every camera and return the results column-wise
+
+        Takes the arguments of run(); see ResultBatch.
+        """
+        from .batch import ResultBatch
+        return ResultBatch(method).extend(self.run(method, *args, **kwargs))
+
+    def records(self, recordPath: int, startTime: Optional[int] = None,
+                endTime: Optional[int] = None, recordType: Optional[int] = None,
+                cameras: Optional[Iterable[str]] = None,
+                timeout: Optional[float] = None,
+                errors: Optional[Dict[str, BaseException]] = None
+                ) -> Iterator[Tuple[str, RecordEntry]]:
+        """Recordings of many cameras as one stream ordered by start time
+
+        The first pages are fetched through run(), later pages of every
+        camera in the fleet's worker threads while the stream is consumed
+        (see Cam.iterRecordList).  Each camera is expected to list its
+        recordings oldest first, as the firmware does.
+
+        Args:
+            recordPath, startTime, endTime, recordType: As for getRecordList
+            cameras: Names of the cameras to use (default: all)
+            timeout: Seconds per camera for the first page
+            errors: If given, receives the cameras that failed and the
+                stream goes on without them; otherwise the first failure
+                is raised
+
+        Returns:
+            Iterator of (camera name, RecordEntry)
+        """
+        query = RecordQuery(recordPath, startTime, endTime, recordType)
+        streams = []
+        for res in self.run(lambda cam: fetch_page(cam, query, 0),
+                            cameras=cameras, timeout=timeout):
+            if not res.ok:
+                if errors is None:
+                    raise res.error
+                errors[res.name] = res.error
+                continue
+            streams.append(self._record_stream(res.name, query, res.value, errors))
+        for _, name, entry in heapq.merge(*streams):
+            yield name, entry
+
+    def _record_stream(self, name: str, query: RecordQuery, first: Page,
+                       errors: Optional[Dict[str, BaseException]]
+                       ) -> Iterator[Tuple[int, str, RecordEntry]]:
+        try:
+            for entry in iter_records(self.camera(name), query, self._get_executor(), first):
+                yield entry.start, name, entry
+        except Exception as e:
+            if errors is None:
+                raise
+            errors[name] = e
+
+    def close(self) -> None:
+        """Stop the worker threads"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def __enter__(self) -> "CamFleet":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,216 @@
+"""Desired-state configuration for a fleet: read, diff, write only what differs"""
+
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from ..camera.commands import COMMAND_TABLE, cgi_text
+from .fleet import CamFleet, FleetResult
+
+
+def _clock(params: Dict[str, str]) -> Dict[str, int]:
+    """Date and time fields of setSystemTime: now, in the camera's time zone
+
+    timeZone is in seconds west of GMT (GMT+1 = -3600).  The camera
+    ignores the fields when it takes its time from NTP.
+    """
+    t = time.gmtime(time.time() - int(params.get("timeZone") or 0))
+    return {"year": t.tm_year, "mon": t.tm_mon, "day": t.tm_mday,
+            "hour": t.tm_hour, "minute": t.tm_min, "sec": t.tm_sec}
+
+
+class SyncSection(NamedTuple):
+    """A group of settings written by one setter
+
+    getter: Command reading the current values
+    setter: Command writing them; it takes the complete set, so fields
+        that are not changed are written back as read
+    binary: CGI parameter prefixes the getter answers as binary strings
+        while the setter takes integers (schedule0 .. , area0 ..)
+    defaults: Values for setter parameters the getter does not report;
+        called when the setter is issued, with the parameters to be written
+    """
+    getter: str
+    setter: str
+    binary: Tuple[str, ...] = ()
+    defaults: Optional[Callable[[Dict[str, str]], Dict[str, Any]]] = None
+
+
+SECTIONS: Dict[str, SyncSection] = {
+    "motion": SyncSection("getMotionDetectConfig", "setMotionDetectConfig",
+                          binary=("schedule", "area")),
+    "mirrorFlip": SyncSection("getMirrorAndFlipSetting", "setMirrorAndFlipSetting"),
+    "infraLed": SyncSection("getInfraLedConfig", "setInfraLedConfig"),
+    "ptzSpeed": SyncSection("getPTZSpeed", "setPTZSpeed"),
+    "time": SyncSection("getDevTimeConfig", "setSystemTime", defaults=_clock),
+}
+
+
+class Change(NamedTuple):
+    """One setter call of a plan"""
+    camera: str
+    section: str
+    setter: str
+    fields: Dict[str, Tuple[Optional[str], str]]
+    params: Dict[str, str]
+
+
+class SyncPlan:
+    """Setter calls needed to bring the fleet to the desired state
+
+    ``changes`` lists one Change per camera and section that differs,
+    with the differing CGI fields as (current, desired); ``unchanged``
+    names the cameras that already match and ``errors`` the cameras whose
+    state could not be read.
+    """
+
+    def __init__(self):
+        self.changes: List[Change] = []
+        self.unchanged: List[str] = []
+        self.errors: Dict[str, BaseException] = {}
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def by_camera(self) -> Dict[str, List[Change]]:
+        res: Dict[str, List[Change]] = {}
+        for change in self.changes:
+            res.setdefault(change.camera, []).append(change)
+        return res
+
+    def describe(self) -> str:
+        """Human readable plan, one line per setter call"""
+        lines = []
+        for c in self.changes:
+            fields = ", ".join(f"{k}: {old} -> {new}" for k, (old, new) in c.fields.items())
+            lines.append(f"{c.camera}: {c.setter} ({fields})")
+        for name, error in self.errors.items():
+            lines.append(f"{name}: not read ({error})")
+        lines.append(f"{len(self.changes)} writes on {len(self.by_camera())} cameras, "
+                     f"{len(self.unchanged)} cameras unchanged, {len(self.errors)} unreadable")
+        return "\n".join(lines)
+
+
+class FleetSync:
+    """Bring settings of a fleet to a desired state with the fewest writes
+
+    The desired state is given per section (see SECTIONS) with the
+    argument names and values of the Cam setter:
+
+    >>> sync = FleetSync(fleet, {
+    ...     "motion": {"isEnable": True, "sensitivity": "high"},
+    ...     "infraLed": {"mode": "auto"},
+    ...     "time": {"timeFormat": "24 hours"},
+    ... })
+    >>> plan = sync.plan()              # reads every camera, writes nothing
+    >>> print(plan.describe())
+    >>> results = list(sync.apply(plan))
+
+    Reads and writes run through CamFleet.run, so they share its
+    concurrency limits and timeouts.
+    """
+
+    def __init__(self, fleet: CamFleet, desired: Dict[str, Dict[str, Any]],
+                 sections: Optional[Dict[str, SyncSection]] = None):
+        """Initialize engine
+
+        Args:
+            fleet: Cameras to configure
+            desired: Section name -> {setter argument: Cam value}
+            sections: Section definitions (default: SECTIONS)
+        """
+        self.fleet = fleet
+        self.sections = SECTIONS if sections is None else sections
+        self.desired: Dict[str, Dict[str, str]] = {}
+        for section, values in desired.items():
+            if section not in self.sections:
+                raise KeyError(f"Unknown section: {section}")
+            setter = COMMAND_TABLE[self.sections[section].setter]
+            # desired values as CGI texts, once for the whole fleet
+            self.desired[section] = setter.encode_values(values)
+
+    def _read(self, cam: Any) -> Dict[str, Any]:
+        states = {}
+        for name in self.desired:
+            getter = self.sections[name].getter
+            res = cam.sendcommand(getter)
+            if res.result != 0:
+                raise RuntimeError(f"{getter} failed: {res._result}")
+            states[name] = res
+        return states
+
+    def diff(self, camera: str, states: Dict[str, Any]) -> List[Change]:
+        """Setter calls one camera needs, given its getter results per section"""
+        changes = []
+        for name, desired in self.desired.items():
+            section = self.sections[name]
+            setter = COMMAND_TABLE[section.setter]
+            current = setter.read_back(states[name], section.binary)
+            fields = {k: (current.get(k), v) for k, v in desired.items() if current.get(k) != v}
+            if not fields:
+                continue
+            # parameters left to the section's defaults stay empty until apply()
+            params = setter.merge(current, desired)
+            changes.append(Change(camera, name, section.setter, fields, params))
+        return changes
+
+    def _complete(self, change: Change) -> Dict[str, str]:
+        """Parameters of a change with the section's defaults filled in now"""
+        defaults = self.sections[change.section].defaults
+        if defaults is None:
+            return change.params
+        params = dict(change.params)
+        for key, value in defaults(params).items():
+            if not params.get(key):
+                params[key] = cgi_text(value)
+        return params
+
+    def plan(self, **kwargs) -> SyncPlan:
+        """Read the current state of every camera and compute the writes
+
+        Args:
+            **kwargs: Passed to CamFleet.run (cameras, timeout)
+        """
+        plan = SyncPlan()
+        for res in self.fleet.run(self._read, **kwargs):
+            if not res.ok:
+                plan.errors[res.name] = res.error
+                continue
+            changes = self.diff(res.name, res.value)
+            if changes:
+                plan.changes.extend(changes)
+            else:
+                plan.unchanged.append(res.name)
+        return plan
+
+    def apply(self, plan: SyncPlan, **kwargs) -> Iterator[FleetResult]:
+        """Issue the setter calls of a plan, one camera after another per camera
+
+        A camera's value in the results is the list of its setter results;
+        it fails at the first setter that does not answer with result 0.
+
+        Args:
+            plan: Plan from plan()
+            **kwargs: Passed to CamFleet.run (timeout)
+        """
+        todo = {self.fleet.camera(name): changes for name, changes in plan.by_camera().items()}
+        if not todo:
+            return iter(())
+
+        def write(cam: Any) -> List[Any]:
+            results = []
+            for change in todo[cam]:
+                # through call(), so that result cache and patch snapshots follow
+                res = cam.call(change.setter, self._complete(change))
+                if res.result != 0:
+                    raise RuntimeError(f"{change.setter} failed: {res._result}")
+                results.append(res)
+            return results
+
+        return self.fleet.run(write, cameras=list(plan.by_camera()), **kwargs)
+
+    def sync(self, dry_run: bool = False, **kwargs) -> Tuple[SyncPlan, List[FleetResult]]:
+        """plan() and, unless dry_run, apply() it"""
+        plan = self.plan(**kwargs)
+        if dry_run:
+            return plan, []
+        kwargs.pop("cameras", None)
+        return plan, list(self.apply(plan, **kwargs))
@@ -0,0 +1,347 @@
+"""Bandwidth-shaped uploads of firmware images and configuration backups
+
+Uploads are throttled by token buckets, one for the whole rollout and
+one per site (the cameras behind one uplink), so a rollout uses the
+links up to the configured caps and leaves the rest to live video.
+Progress is kept per camera in a JSON file; a rollout that is started
+again with the same file skips the cameras that are done.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from ..utils.deadline import current_deadline
+from ..utils.network import MultipartEncoder
+from .fleet import CamFleet, FleetResult
+
+_CHUNK = 64 * 1024
+
+# Progress states of a camera
+PENDING = "pending"
+UPLOADING = "uploading"
+UPLOADED = "uploaded"
+VERIFIED = "verified"
+FAILED = "failed"
+
+
+class TokenBucket:
+    """Rate limit in bytes per second, shared by threads
+
+    The bucket holds up to ``burst`` bytes of credit.  Senders reserve
+    credit before each chunk and sleep until it is covered; reservations
+    are served in arrival order, so no sender starves.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize bucket
+
+        Args:
+            rate: Bytes per second
+            burst: Credit that can build up while idle (default: one second)
+            clock: Time source
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive: {rate}")
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, nbytes: int) -> float:
+        """Take credit for nbytes and return the seconds to wait before sending"""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= nbytes
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, nbytes: int) -> None:
+        """Give back credit reserved for bytes that were not sent after all"""
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + nbytes)
+
+
+class _ThrottledBody:
+    """Request body passing its chunks through token buckets
+
+    ``sent`` is called with the bytes sent so far.  The pool sends the body
+    again when a kept-alive connection turned out to be closed; each pass
+    starts the count over and gives back the credit of the previous one.
+    """
+
+    __slots__ = ("body", "buckets", "sent", "charged")
+
+    def __init__(self, body: MultipartEncoder, buckets: List[TokenBucket],
+                 sent: Callable[[int], None]):
+        self.body = body
+        self.buckets = buckets
+        self.sent = sent
+        self.charged = 0
+
+    def __len__(self) -> int:
+        return len(self.body)
+
+    def __iter__(self) -> Iterator[memoryview]:
+        if self.charged:
+            for bucket in self.buckets:
+                bucket.refund(self.charged)
+            self.charged = 0
+            self.sent(0)
+        offset = 0
+        for chunk in self.body:
+            if self.buckets:
+                wait = max(bucket.reserve(len(chunk)) for bucket in self.buckets)
+                self.charged += len(chunk)
+                if wait > 0:
+                    time.sleep(wait)
+            yield chunk
+            offset += len(chunk)
+            self.sent(offset)
+
+
+def file_fingerprint(cmd: str, path: str) -> str:
+    """Identity of an upload: command, file name, size and SHA-1 of the content"""
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            sha.update(chunk)
+    return f"{cmd}:{os.path.basename(path)}:{os.path.getsize(path)}:{sha.hexdigest()}"
+
+
+class UploadProgress:
+    """Per-camera state of a rollout, saved as JSON on every state change
+
+    A camera is pending, uploading, uploaded (answer received, not yet
+    verified), verified or failed.  Loading a file written for a
+    different upload (see file_fingerprint) starts over.
+    """
+
+    def __init__(self, path: Optional[str], fingerprint: str):
+        """Initialize progress
+
+        Args:
+            path: JSON file (None: keep the progress in memory only)
+            fingerprint: Identity of the upload
+        """
+        self.path = path
+        self.fingerprint = fingerprint
+        self.cameras: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("upload") == fingerprint:
+                self.cameras = saved.get("cameras", {})
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            return self.cameras.get(name, {}).get("state", PENDING)
+
+    def update(self, name: str, save: bool = True, **fields: Any) -> None:
+        with self._lock:
+            self.cameras.setdefault(name, {}).update(fields)
+            if save:
+                self._save()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"upload": self.fingerprint, "cameras": self.cameras}, f,
+                      indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def summary(self) -> Dict[str, int]:
+        """Number of cameras per state"""
+        with self._lock:
+            res: Dict[str, int] = {}
+            for info in self.cameras.values():
+                state = info.get("state", PENDING)
+                res[state] = res.get(state, 0) + 1
+            return res
+
+
+class FleetUpload:
+    """Upload one file to many cameras within bandwidth caps
+
+    >>> upload = FleetUpload(fleet, "importConfig", "backup.bin",
+    ...                      rate=4e6, site_rate=1e6, sites={"cam1": "depot"},
+    ...                      progress="rollout.json")
+    >>> for res in upload.run():
+    ...     print(res.name, res.ok, res.value.firmwareVer if res.ok else res.error)
+
+    Each camera gets the file as multipart POST body, streamed from disk
+    through the global bucket and the bucket of its site.  At most
+    ``parallel`` uploads run at once (``per_site`` per site), within the
+    fleet's own concurrency limit.  A camera that answers with result 0 is
+    then polled with getDevInfo until it answers (it may reboot) and
+    ``verify`` accepts the answer.
+    """
+
+    def __init__(self, fleet: CamFleet, cmd: str, path: str,
+                 field: str = "file",
+                 fields: Optional[Dict[str, Any]] = None,
+                 rate: Optional[float] = None,
+                 site_rate: Optional[float] = None,
+                 sites: Optional[Dict[str, str]] = None,
+                 site_rates: Optional[Dict[str, float]] = None,
+                 parallel: int = 4,
+                 per_site: Optional[int] = None,
+                 progress: Optional[str] = None,
+                 upload_timeout: Optional[float] = None,
+                 verify: Optional[Callable[[Any], bool]] = None,
+                 verify_timeout: float = 300.0,
+                 verify_interval: float = 5.0,
+                 chunk_size: int = _CHUNK):
+        """Initialize upload
+
+        Args:
+            fleet: Cameras to upload to
+            cmd: CGI command taking the file, e.g. importConfig
+            path: File to upload
+            field: Form field of the file
+            fields: Additional form fields
+            rate: Bytes per second for the whole rollout (None: no cap)
+            site_rate: Bytes per second per site (None: no cap)
+            sites: Camera name -> site; cameras not listed have no site cap
+            site_rates: Caps of single sites, overriding site_rate
+            parallel: Uploads in flight across the fleet
+            per_site: Uploads in flight per site (None: no limit)
+            progress: JSON file for resumable progress (None: in memory)
+            upload_timeout: Seconds for one upload (default: twice the time
+                at the tightest cap, or at 100 kB/s without caps, plus a minute)
+            verify: Check of the getDevInfo answer after the upload, e.g. the
+                expected firmwareVer (default: any successful answer)
+            verify_timeout: Seconds to wait for a successful verification
+            verify_interval: Seconds between getDevInfo attempts
+            chunk_size: Bytes read from the file and throttled at a time
+        """
+        self.fleet = fleet
+        self.cmd = cmd
+        self.path = path
+        self.field = field
+        self.fields = fields or {}
+        self.sites = sites or {}
+        self.verify = verify
+        self.verify_timeout = verify_timeout
+        self.verify_interval = verify_interval
+        self.chunk_size = chunk_size
+        self.upload_timeout = upload_timeout
+        self.progress = UploadProgress(progress, file_fingerprint(cmd, path))
+
+        self._global = [TokenBucket(rate, max(rate, chunk_size))] if rate else []
+        self._site_buckets: Dict[str, TokenBucket] = {}
+        for site in set(self.sites.values()):
+            site_cap = (site_rates or {}).get(site, site_rate)
+            if site_cap:
+                self._site_buckets[site] = TokenBucket(site_cap, max(site_cap, chunk_size))
+        self._slots = threading.BoundedSemaphore(parallel)
+        self._site_slots: Dict[str, threading.BoundedSemaphore] = {}
+        if per_site is not None:
+            for site in set(self.sites.values()):
+                self._site_slots[site] = threading.BoundedSemaphore(per_site)
+        self._names: Dict[int, str] = {}
+
+    def _buckets(self, name: str) -> List[TokenBucket]:
+        bucket = self._site_buckets.get(self.sites.get(name))
+        return self._global if bucket is None else [bucket] + self._global
+
+    def _timeout(self, name: str, size: int) -> float:
+        if self.upload_timeout is not None:
+            return self.upload_timeout
+        rates = [bucket.rate for bucket in self._buckets(name)]
+        return 60.0 + 2 * size / (min(rates) if rates else 1e5)
+
+    def _send(self, cam: Any, name: str) -> None:
+        encoder = MultipartEncoder(self.fields, {self.field: {
+            "filename": os.path.basename(self.path), "content": pathlib.Path(self.path)}},
+            chunk_size=self.chunk_size)
+        sent = [0]
+
+        def count(offset: int) -> None:
+            sent[0] = offset
+            self.progress.update(name, save=False, sent=offset)
+
+        self.progress.update(name, state=UPLOADING, sent=0, size=len(encoder), error=None)
+        body = _ThrottledBody(encoder, self._buckets(name), count)
+        res = cam.sendcommand(self.cmd, data=body, headers=encoder.headers,
+                              timeout=self._timeout(name, len(encoder)))
+        if res.result != 0:
+            raise RuntimeError(f"{self.cmd} failed: {res._result}")
+        self.progress.update(name, state=UPLOADED, sent=sent[0])
+
+    def _check(self, cam: Any) -> Any:
+        """getDevInfo once the camera answers and verify accepts it"""
+        deadline = time.monotonic() + self.verify_timeout
+        last: Any = None
+        while True:
+            try:
+                res = cam.sendcommand("getDevInfo")
+                if res.result == 0 and (self.verify is None or self.verify(res)):
+                    return res
+                last = f"getDevInfo answered {res._result}" if res.result != 0 else \
+                    "verification rejected the device info"
+            except (OSError, ValueError) as e:
+                # rebooting: refused connections, resets, timeouts; but not
+                # the end of the run's own time
+                budget = current_deadline()
+                if budget is not None and budget.expired:
+                    raise
+                last = e
+            if time.monotonic() + self.verify_interval > deadline:
+                raise RuntimeError(f"Not verified after {self.verify_timeout}s: {last}")
+            time.sleep(self.verify_interval)
+
+    def _slots_of(self, name: str) -> List[threading.Semaphore]:
+        """Upload slots a camera needs; verification alone needs none"""
+        if self.progress.state(name) == UPLOADED:
+            return []
+        site_slot = self._site_slots.get(self.sites.get(name))
+        return [self._slots] if site_slot is None else [site_slot, self._slots]
+
+    def _upload(self, cam: Any) -> Any:
+        name = self._names[id(cam)]
+        try:
+            if self.progress.state(name) != UPLOADED:
+                self._send(cam, name)
+            info = self._check(cam)
+        except BaseException as e:
+            self.progress.update(name, state=FAILED, error=str(e) or type(e).__name__)
+            raise
+        self.progress.update(name, state=VERIFIED, firmwareVer=info.get("firmwareVer"),
+                             hardwareVer=info.get("hardwareVer"))
+        return info
+
+    def pending(self, cameras: Optional[Iterable[str]] = None) -> List[str]:
+        """Cameras that are not verified yet"""
+        names = self.fleet.specs if cameras is None else cameras
+        return [name for name in names if self.progress.state(name) != VERIFIED]
+
+    def run(self, cameras: Optional[Iterable[str]] = None,
+            timeout: Optional[float] = None) -> Iterator[FleetResult]:
+        """Upload to every camera that is not verified yet
+
+        A camera's value in the results is its getDevInfo answer.  Cameras
+        whose upload was answered but not verified are only verified again.
+
+        Args:
+            cameras: Names of the cameras to use (default: all)
+            timeout: Seconds per camera for upload and verification
+        """
+        todo = self.pending(cameras)
+        for name in todo:
+            self._names[id(self.fleet.camera(name))] = name
+        if not todo:
+            return iter(())
+        # the fleet dispatches a camera only once its slots are free, so
+        # cameras waiting for a busy site never occupy a worker
+        return self.fleet.run(self._upload, cameras=todo, timeout=timeout, slots=self._slots_of)
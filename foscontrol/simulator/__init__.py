@@ -0,0 +1,6 @@
+"""Local Foscam CGI simulator for tests and benchmarks"""
+
+from .camera import CameraProfile, CommandProfile, VirtualCamera, synthetic_jpeg
+from .server import Simulator
+
+__all__ = ["CameraProfile", "CommandProfile", "Simulator", "VirtualCamera", "synthetic_jpeg"]
@@ -0,0 +1,55 @@
+"""Run simulated cameras: python -m foscontrol.simulator --cameras 100"""
+
+import argparse
+import asyncio
+from .camera import CameraProfile, CommandProfile, ERROR_KINDS
+from .server import Simulator
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate Foscam HD cameras")
+    parser.add_argument("--cameras", type=int, default=1, help="number of cameras")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=0,
+                        help="first port (one per camera), or the shared port with --vhosts")
+    parser.add_argument("--vhosts", action="store_true",
+                        help="serve all cameras on one port, selected by Host header")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per command")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="failure probability")
+    parser.add_argument("--error", choices=ERROR_KINDS, default="result", help="failure kind")
+    parser.add_argument("--snapshot-size", type=int, default=60 * 1024, help="bytes per picture")
+    parser.add_argument("--records", type=int, default=0, help="recordings per camera")
+    parser.add_argument("--parallel", action="store_true",
+                        help="process requests concurrently instead of one at a time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    profile = CameraProfile(
+        CommandProfile(args.latency, args.jitter, args.error_rate, args.error),
+        serialize=not args.parallel,
+        snapshot_size=args.snapshot_size,
+        record_count=args.records)
+    sim = Simulator(args.host, seed=args.seed)
+    sim.add_cameras(args.cameras, port=args.port, vhosts=args.vhosts,
+                    user=args.user, password=args.password, profile=profile)
+
+    async def serve():
+        await sim.start_async()
+        for spec in sim.inventory():
+            print(f"{spec.name}\t{spec.host}\t{spec.port}", flush=True)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await sim.stop_async()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+import copy
+import random
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from xml.sax.saxutils import escape
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+# JFIF APP0 segment, so the synthetic pictures look like JPEGs to file sniffers
+_APP0 = b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+
+# CGI result codes used for injected errors
+RESULT_CGI_FAILURE = -4
+RESULT_AUTH_ERROR = -2
+RESULT_FORMAT_ERROR = -1
+
+# records per getRecordList page
+RECORDS_PER_PAGE = 10
+# start of the first synthetic recording, 2026-01-01 00:00 UTC
+RECORDS_BASE = 1767225600
+
+
+def synthetic_jpeg(size: int, seed: int = 0) -> bytes:
+    """JPEG-framed picture of exactly size bytes
+
+    The filler never contains 0xff, so the only markers are SOI, APP0 and
+    EOI and stream parsers can rely on them.
+    """
+    overhead = len(JPEG_SOI) + len(_APP0) + len(JPEG_EOI)
+    if size < overhead:
+        raise ValueError(f"JPEG size must be at least {overhead} bytes")
+    pattern = bytes((seed + i) % 255 for i in range(255))
+    n = size - overhead
+    filler = pattern * (n // len(pattern)) + pattern[:n % len(pattern)]
+    return JPEG_SOI + _APP0 + filler + JPEG_EOI
+
+
+class CommandProfile(NamedTuple):
+    """Timing and failure behaviour of a CGI command
+
+    latency: Fixed processing time in seconds
+    jitter: Additional random delay, uniformly distributed in [0, jitter)
+    error_rate: Probability (0..1) that the command fails
+    error: How it fails: "result" (CGI result -4), "http" (HTTP 500),
+        "reset" (connection closed without answer) or "hang" (no answer
+        until the client gives up)
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error: str = "result"
+
+
+ERROR_KINDS = ("result", "http", "reset", "hang")
+
+
+class CameraProfile:
+    """Behaviour of a simulated camera
+
+    ``default`` applies to every command without an entry in ``commands``.
+    With ``serialize`` the camera processes one CGI request at a time, as
+    the embedded web server of real firmware does; concurrent requests
+    queue up behind each other.
+    """
+
+    def __init__(self, default: CommandProfile = CommandProfile(),
+                 commands: Optional[Dict[str, CommandProfile]] = None,
+                 serialize: bool = True,
+                 snapshot_size: int = 60 * 1024,
+                 mjpeg_fps: float = 10.0,
+                 record_count: int = 0):
+        """Initialize profile
+
+        Args:
+            default: Behaviour of commands not listed in commands
+            commands: {command: CommandProfile} overrides
+            serialize: Process one CGI request at a time
+            snapshot_size: Bytes per snapPicture2 / MJPEG frame
+            mjpeg_fps: Frame rate of the MJPEG stream
+            record_count: Recordings reported by getRecordList
+        """
+        for profile in [default] + list((commands or {}).values()):
+            if profile.error not in ERROR_KINDS:
+                raise ValueError(f"Unknown error kind: {profile.error}")
+        self.default = default
+        self.commands = dict(commands or {})
+        self.serialize = serialize
+        self.snapshot_size = snapshot_size
+        self.mjpeg_fps = mjpeg_fps
+        self.record_count = record_count
+
+    def command(self, cmd: str) -> CommandProfile:
+        return self.commands.get(cmd, self.default)
+
+
+_DEFAULT_STATE: Dict[str, Dict[str, Any]] = {
+    "devInfo": {
+        "productName": "FI9821W V2", "serialNo": "0000000000000000", "devName": "sim",
+        "mac": "000000000000", "year": 2026, "mon": 1, "day": 1, "hour": 0, "min": 0,
+        "sec": 0, "timeZone": 0, "firmwareVer": "1.11.1.18", "hardwareVer": "1.4.1.8",
+    },
+    "devState": {
+        "IOAlarm": 0, "motionDetectAlarm": 1, "soundAlarm": 0, "record": 0,
+        "sdState": 1, "sdFreeSpace": "7340032k", "sdTotalSpace": "7634944k",
+        "ntpState": 1, "ddnsState": 0, "url": "", "upnpState": 0,
+        "isWifiConnected": 0, "wifiConnectedAP": "", "infraLedState": 0,
+    },
+    "motionDetectConfig": {
+        "isEnable": 0, "linkage": 0, "snapInterval": 1, "sensitivity": 1,
+        "triggerInterval": 0,
+        **{f"schedule{day}": 0 for day in range(7)},
+        **{f"area{row}": 0 for row in range(10)},
+    },
+    "ptzSpeed": {"speed": 2},
+    "mirrorAndFlipSetting": {"isMirror": 0, "isFlip": 0},
+    "infraLedConfig": {"mode": 0},
+    "wifiConfig": {
+        "isEnable": 0, "isUseWifi": 0, "isConnected": 0, "connectedAP": "",
+        "ssid": "", "netType": 0, "encryptType": 0, "authMode": 0, "psk": "",
+        "keyFormat": 0, "defaultKey": 1, "key1": "", "key2": "", "key3": "", "key4": "",
+        "key1Len": 64, "key2Len": 64, "key3Len": 64, "key4Len": 64,
+    },
+    "ipInfo": {
+        "isDHCP": 1, "ip": "192.168.1.20", "gate": "192.168.1.1",
+        "mask": "255.255.255.0", "dns1": "192.168.1.1", "dns2": "0.0.0.0",
+    },
+    "devTimeConfig": {
+        "timeSource": 0, "ntpServer": "time.nist.gov", "dateFormat": 0,
+        "timeFormat": 1, "timeZone": 0, "isDst": 0, "dst": 0,
+    },
+    "videoStreamParam": {
+        "resolution0": 0, "bitRate0": 2097152, "frameRate0": 30, "GOP0": 30, "isVBR0": 1,
+        "resolution1": 2, "bitRate1": 524288, "frameRate1": 15, "GOP1": 15, "isVBR1": 1,
+    },
+    "subStreamFormat": {"format": 0},
+}
+
+# bit widths of the motion detection bit fields (sent as binary strings)
+_BINARY_FIELDS = {**{f"schedule{day}": 48 for day in range(7)},
+                  **{f"area{row}": 10 for row in range(10)}}
+
+_GETTERS = {
+    "getDevInfo": "devInfo",
+    "getDevState": "devState",
+    "getMotionDetectConfig": "motionDetectConfig",
+    "getPTZSpeed": "ptzSpeed",
+    "getMirrorAndFlipSetting": "mirrorAndFlipSetting",
+    "getInfraLedConfig": "infraLedConfig",
+    "getWifiConfig": "wifiConfig",
+    "getIPInfo": "ipInfo",
+    "getDevTimeConfig": "devTimeConfig",
+    "getVideoStreamParam": "videoStreamParam",
+}
+
+_SETTERS = {
+    "setMotionDetectConfig": "motionDetectConfig",
+    "setPTZSpeed": "ptzSpeed",
+    "setMirrorAndFlipSetting": "mirrorAndFlipSetting",
+    "setInfraLedConfig": "infraLedConfig",
+    "setWifiConfig": "wifiConfig",
+    "setIPInfo": "ipInfo",
+    "setSubStreamFormat": "subStreamFormat",
+    "setSystemTime": "devTimeConfig",
+}
+
+# commands taking a file as multipart POST body
+_UPLOADS = {"importConfig"}
+
+_PTZ = {"ptzMoveUp", "ptzMoveDown", "ptzMoveLeft", "ptzMoveRight",
+        "ptzStopRun", "ptzReset"}
+
+
+def cgi_result(fields: Dict[str, Any], result: int = 0) -> bytes:
+    """CGI answer document in the firmware's layout"""
+    lines = ["<CGI_Result>", f"    <result>{result}</result>"]
+    for key, value in fields.items():
+        lines.append(f"    <{key}>{escape(str(value))}</{key}>")
+    lines.append("</CGI_Result>\n")
+    return "\n".join(lines).encode("utf-8")
+
+
+class VirtualCamera:
+    """State and CGI command logic of one simulated camera
+
+    Transport-independent: ``handle`` maps a command and its parameters
+    to (status, content type, body).  Setters change the state that the
+    getters report; restore returns to the factory state.
+    """
+
+    def __init__(self, name: str, user: str = "admin", password: str = "",
+                 profile: Optional[CameraProfile] = None, seed: int = 0):
+        self.name = name
+        self.user = user
+        self.password = password
+        self.profile = profile if profile is not None else CameraProfile()
+        self.rng = random.Random(seed)
+        self.state = copy.deepcopy(_DEFAULT_STATE)
+        self.state["devInfo"]["devName"] = name
+        self.ptz = "stopped"
+        # (command, body size) of every upload received
+        self.uploads: List[Tuple[str, int]] = []
+        self.requests = 0
+        self.errors = 0
+        self._snapshot = synthetic_jpeg(self.profile.snapshot_size, seed)
+        # (host, port) the camera is reachable at, set by the Simulator
+        self.address: Optional[Tuple[str, int]] = None
+        self.vhost: Optional[str] = None
+
+    @property
+    def snapshot(self) -> bytes:
+        return self._snapshot
+
+    def delay(self, cmd: str) -> float:
+        """Processing time of one request"""
+        profile = self.profile.command(cmd)
+        return profile.latency + (self.rng.random() * profile.jitter if profile.jitter else 0.0)
+
+    def failure(self, cmd: str) -> Optional[str]:
+        """Kind of error to inject for this request, or None"""
+        profile = self.profile.command(cmd)
+        if profile.error_rate and self.rng.random() < profile.error_rate:
+            self.errors += 1
+            return profile.error
+        return None
+
+    def authorized(self, params: Dict[str, str]) -> bool:
+        return params.get("usr") == self.user and params.get("pwd", "") == self.password
+
+    def handle(self, cmd: Optional[str], params: Dict[str, str],
+               body: bytes = b"") -> Tuple[int, str, bytes]:
+        """Execute a CGIProxy.fcgi command (body: POST body of uploads)"""
+        self.requests += 1
+        if not cmd:
+            return 200, "text/plain", cgi_result({}, RESULT_FORMAT_ERROR)
+        if not self.authorized(params):
+            return 200, "text/plain", cgi_result({}, RESULT_AUTH_ERROR)
+
+        if cmd == "snapPicture2":
+            return 200, "image/jpeg", self._snapshot
+        if cmd == "snapPicture":
+            html = f'<html><body><img src="../snapPic/Snap_{self.name}.jpg"/></body></html>'
+            return 200, "text/html", html.encode("utf-8")
+        if cmd in _GETTERS:
+            return 200, "text/plain", cgi_result(self._get(_GETTERS[cmd]))
+        if cmd in _SETTERS:
+            return 200, "text/plain", cgi_result(self._set(_SETTERS[cmd], params))
+        if cmd in _PTZ:
+            self.ptz = "stopped" if cmd in ("ptzStopRun", "ptzReset") else cmd[7:].lower()
+            return 200, "text/plain", cgi_result({})
+        if cmd in _UPLOADS:
+            if not body.startswith(b"--"):
+                return 200, "text/plain", cgi_result({}, RESULT_FORMAT_ERROR)
+            self.uploads.append((cmd, len(body)))
+            return 200, "text/plain", cgi_result({})
+        if cmd == "getRecordList":
+            return 200, "text/plain", cgi_result(self._records(params))
+        if cmd == "reboot":
+            return 200, "text/plain", cgi_result({})
+        if cmd == "restore":
+            self.state = copy.deepcopy(_DEFAULT_STATE)
+            self.state["devInfo"]["devName"] = self.name
+            return 200, "text/plain", cgi_result({})
+        return 200, "text/plain", cgi_result({}, RESULT_FORMAT_ERROR)
+
+    def _get(self, section: str) -> Dict[str, Any]:
+        values = dict(self.state[section])
+        for key, width in _BINARY_FIELDS.items():
+            if key in values:
+                values[key] = format(int(values[key]), f"0{width}b")
+        return values
+
+    def _set(self, section: str, params: Dict[str, str]) -> Dict[str, Any]:
+        values = self.state[section]
+        for key, value in params.items():
+            if key in values:
+                values[key] = _coerce(value)
+        return {}
+
+    def _records(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """One page of the (synthetic) recording list
+
+        Recording n starts at RECORDS_BASE + n * 600 and lasts a minute;
+        startTime and endTime select the recordings that overlap them.
+        """
+        first, last = 0, self.profile.record_count
+        if params.get("startTime"):
+            # -(-a // b): integer ceiling
+            first = max(first, -(-(int(params["startTime"]) - RECORDS_BASE - 60) // 600))
+        if params.get("endTime"):
+            last = min(last, (int(params["endTime"]) - RECORDS_BASE) // 600 + 1)
+        count = max(0, last - first)
+        start_no = int(params.get("startNo", 0) or 0)
+        page = range(first + start_no, first + min(count, start_no + RECORDS_PER_PAGE))
+        fields: Dict[str, Any] = {"totalCnt": count, "curCnt": len(page)}
+        for i, n in enumerate(page):
+            start = RECORDS_BASE + n * 600
+            fields[f"record{i}"] = (f"/mnt/sd/record/alarm_{n:06d}.avi,"
+                                    f"{start},{start + 60},1")
+        return fields
+
+    def mjpeg_frame(self) -> bytes:
+        return self._snapshot
+
+
+def _coerce(value: str) -> Any:
+    """Store numeric parameters as numbers, like the firmware's config"""
+    if value.lower() in ("true", "false"):
+        return int(value.lower() == "true")
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def default_names(count: int, prefix: str = "cam") -> List[str]:
+    width = max(4, len(str(count - 1)))
+    return [f"{prefix}{i:0{width}d}" for i in range(count)]
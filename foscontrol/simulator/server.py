@@ -0,0 +1,364 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, parse_qsl
+from .camera import CameraProfile, VirtualCamera, cgi_result, default_names, RESULT_CGI_FAILURE
+from ..fleet.fleet import CameraSpec
+
+_MAX_HEADER_BYTES = 64 * 1024
+_BOUNDARY = "ipcamera"
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+class _Request:
+    __slots__ = ("method", "path", "params", "headers", "keep_alive", "body")
+
+    def __init__(self, method: str, path: str, params: Dict[str, str],
+                 headers: Dict[str, str], keep_alive: bool, body: bytes = b""):
+        self.method = method
+        self.path = path
+        self.params = params
+        self.headers = headers
+        self.keep_alive = keep_alive
+        self.body = body
+
+
+class _Listener:
+    """One listening socket; routes requests to cameras by Host header"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.cameras: Dict[str, VirtualCamera] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    def route(self, host_header: Optional[str]) -> Optional[VirtualCamera]:
+        if host_header:
+            name, _, port = host_header.rpartition(":")
+            if not name or not port.isdigit():
+                name = host_header
+            cam = self.cameras.get(name.lower())
+            if cam is not None:
+                return cam
+        if len(self.cameras) == 1:
+            return next(iter(self.cameras.values()))
+        return None
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[_Request]:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("request header too long")
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+    parts = urlsplit(target)
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+    length = int(headers.get("content-length", 0) or 0)
+    body = b""
+    if length:
+        body = await reader.readexactly(length)
+        if headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
+            params.update(parse_qsl(body.decode("latin-1"), keep_blank_values=True))
+
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        keep_alive = connection == "keep-alive"
+    else:
+        keep_alive = connection != "close"
+    return _Request(method, parts.path, params, headers, keep_alive, body)
+
+
+def _response_head(status: int, content_type: str, length: Optional[int],
+                   keep_alive: bool) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}",
+             f"Content-Type: {content_type}"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class Simulator:
+    """Local stand-in for many Foscam cameras
+
+    Serves ``/cgi-bin/CGIProxy.fcgi`` (and the MJPEG stream of
+    ``/cgi-bin/CGIStream.cgi``) for any number of VirtualCameras from one
+    asyncio event loop.  Each camera either gets a port of its own or
+    shares a port with others and is selected by the Host header
+    ("virtual host").  Latency, jitter, error injection and serialized
+    request processing are configured per camera with a CameraProfile.
+
+    The simulator runs in a background thread (``start``/``stop`` or a
+    with block) or inside a running event loop (``start_async``/
+    ``stop_async``).  Cameras must be added before it is started.
+
+        sim = Simulator()
+        cams = sim.add_cameras(100, profile=CameraProfile(CommandProfile(latency=0.02)))
+        with sim:
+            fleet = CamFleet(sim.inventory())
+    """
+
+    def __init__(self, host: str = "127.0.0.1", seed: int = 0):
+        """Initialize simulator
+
+        Args:
+            host: Default address to listen on
+            seed: Seed for jitter and error injection
+        """
+        self.host = host
+        self.seed = seed
+        self.cameras: Dict[str, VirtualCamera] = {}
+        self._listeners: Dict[Tuple, _Listener] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._connections: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def add_camera(self, name: Optional[str] = None,
+                   port: int = 0,
+                   host: Optional[str] = None,
+                   vhost: Optional[str] = None,
+                   user: str = "admin",
+                   password: str = "",
+                   profile: Optional[CameraProfile] = None) -> VirtualCamera:
+        """Add a simulated camera
+
+        Args:
+            name: Camera name (default: cam<number>)
+            port: Port to listen on; 0 picks a free port (for this camera
+                alone unless vhost is given)
+            host: Address to listen on (default: the simulator's)
+            vhost: Host name selecting this camera on a shared port (default: name)
+            user: Accepted user name
+            password: Accepted password
+            profile: Timing and error behaviour
+        """
+        if self._running:
+            raise RuntimeError("cameras must be added before the simulator is started")
+        if name is None:
+            name = f"cam{len(self.cameras):04d}"
+        if name in self.cameras:
+            raise ValueError(f"Duplicate camera name: {name}")
+        host = host or self.host
+        cam = VirtualCamera(name, user, password, profile, seed=self.seed + len(self.cameras))
+        cam.vhost = (vhost or name).lower()
+        if port:
+            key = (host, port)
+        else:
+            # free port: own listener, or the shared one of the vhost cameras
+            key = (host, 0, name if vhost is None else None)
+        listener = self._listeners.get(key)
+        if listener is None:
+            listener = self._listeners[key] = _Listener(host, port)
+        listener.cameras[cam.vhost] = cam
+        self.cameras[name] = cam
+        return cam
+
+    def add_cameras(self, count: int, port: int = 0, vhosts: bool = False,
+                    prefix: str = "cam", **kwargs) -> List[VirtualCamera]:
+        """Add count cameras
+
+        Args:
+            count: Number of cameras
+            port: 0 for a free port per camera; otherwise the first of
+                consecutive ports, or the shared port with vhosts
+            vhosts: All cameras on one port, selected by Host header (their name)
+            prefix: Name prefix
+            **kwargs: Further arguments of add_camera
+        """
+        cams = []
+        for i, name in enumerate(default_names(count, prefix)):
+            if vhosts:
+                cams.append(self.add_camera(name, port=port, vhost=name, **kwargs))
+            else:
+                cams.append(self.add_camera(name, port=port + i if port else 0, **kwargs))
+        return cams
+
+    def inventory(self, prot: str = "http") -> List[CameraSpec]:
+        """CameraSpecs of all cameras, e.g. for CamFleet"""
+        if not self._running:
+            raise RuntimeError("simulator is not running")
+        return [CameraSpec(cam.address[0], cam.address[1], cam.user, cam.password, prot, name)
+                for name, cam in self.cameras.items()]
+
+    # -- lifecycle
+
+    async def start_async(self) -> "Simulator":
+        """Open all listening sockets in the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        try:
+            for listener in self._listeners.values():
+                listener.server = await asyncio.start_server(
+                    lambda r, w, l=listener: self._connection(l, r, w),
+                    listener.host, listener.port, limit=_MAX_HEADER_BYTES)
+                port = listener.server.sockets[0].getsockname()[1]
+                for cam in listener.cameras.values():
+                    cam.address = (listener.host, port)
+        except BaseException:
+            await self.stop_async()
+            raise
+        self._running = True
+        return self
+
+    async def stop_async(self) -> None:
+        for listener in self._listeners.values():
+            if listener.server is not None:
+                listener.server.close()
+        for task in list(self._connections):
+            task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        for listener in self._listeners.values():
+            if listener.server is not None:
+                await listener.server.wait_closed()
+                listener.server = None
+        self._running = False
+
+    def start(self) -> "Simulator":
+        """Run the simulator in a background thread"""
+        ready = threading.Event()
+        failure: List[BaseException] = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start_async())
+            except BaseException as e:
+                failure.append(e)
+                ready.set()
+                loop.close()
+                return
+            ready.set()
+            try:
+                loop.run_forever()
+            finally:
+                loop.run_until_complete(self.stop_async())
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="foscam-simulator", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "Simulator":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # -- request handling
+
+    def _lock(self, cam: VirtualCamera) -> asyncio.Lock:
+        lock = self._locks.get(cam.name)
+        if lock is None:
+            lock = self._locks[cam.name] = asyncio.Lock()
+        return lock
+
+    async def _connection(self, listener: _Listener, reader: asyncio.StreamReader,
+                          writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                cam = listener.route(request.headers.get("host"))
+                if not await self._respond(cam, request, reader, writer):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, content_type: str,
+                    body: bytes, keep_alive: bool) -> bool:
+        # one write per answer: headers and body in the same segment
+        writer.write(_response_head(status, content_type, len(body), keep_alive) + body)
+        await writer.drain()
+        return keep_alive
+
+    async def _respond(self, cam: Optional[VirtualCamera], request: _Request,
+                       reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Answer one request; False closes the connection"""
+        if cam is None:
+            return await self._send(writer, 404, "text/plain", b"unknown camera\n",
+                                    request.keep_alive)
+        if request.path == "/cgi-bin/CGIStream.cgi":
+            await self._stream(cam, request, writer)
+            return False
+        if request.path != "/cgi-bin/CGIProxy.fcgi":
+            return await self._send(writer, 404, "text/plain", b"not found\n", request.keep_alive)
+
+        cmd = request.params.get("cmd")
+        failure = cam.failure(cmd)
+        delay = cam.delay(cmd)
+        if cam.profile.serialize:
+            async with self._lock(cam):
+                if delay:
+                    await asyncio.sleep(delay)
+                # a failed command has no effect on the camera's state
+                answer = cam.handle(cmd, request.params, request.body) if failure is None else None
+        else:
+            if delay:
+                await asyncio.sleep(delay)
+            answer = cam.handle(cmd, request.params, request.body) if failure is None else None
+
+        if failure == "reset":
+            writer.transport.abort()
+            return False
+        if failure == "hang":
+            # never answer; wait for the client to give up
+            await reader.read()
+            return False
+        if failure == "http":
+            return await self._send(writer, 500, "text/plain", b"internal error\n",
+                                    request.keep_alive)
+        if failure == "result":
+            answer = (200, "text/plain", cgi_result({}, RESULT_CGI_FAILURE))
+        status, content_type, body = answer
+        return await self._send(writer, status, content_type, body, request.keep_alive)
+
+    async def _stream(self, cam: VirtualCamera, request: _Request,
+                      writer: asyncio.StreamWriter) -> None:
+        """Endless multipart MJPEG stream (cmd=GetMJStream)"""
+        if request.params.get("cmd") != "GetMJStream" or not cam.authorized(request.params):
+            await self._send(writer, 200, "text/plain",
+                             cgi_result({}, -2 if request.params.get("cmd") else -1), False)
+            return
+        cam.requests += 1
+        writer.write(_response_head(200, f"multipart/x-mixed-replace;boundary={_BOUNDARY}",
+                                    None, False))
+        period = 1.0 / cam.profile.mjpeg_fps
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+        while True:
+            frame = cam.mjpeg_frame()
+            writer.write(f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                         f"Content-Length: {len(frame)}\r\n\r\n".encode("latin-1")
+                         + frame + b"\r\n")
+            await writer.drain()
+            due += period
+            await asyncio.sleep(max(0.0, due - loop.time()))
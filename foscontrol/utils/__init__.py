@@ -2,7 +2,13 @@
 
 from .arrays import array2dict, arrayTransform, binaryarray2int
 from .dictionaries import DictBits, DictChar
-from .network import create_url_opener, my_urlopen, encode_multipart, ip2long, long2ip
+from .network import (
+    create_url_opener, my_urlopen, encode_multipart, ip2long, long2ip,
+    ConnectionPool, PooledResponse, default_pool, MultipartEncoder
+)
+from .xmlparse import parse_cgi_result
+from .deadline import CamTimeoutError, Deadline, current_deadline
+from .metrics import Histogram, MetricsCollector, RequestTiming
 
 __all__ = [
     "array2dict",
@@ -11,8 +17,19 @@ __all__ = [
     "DictBits",
     "DictChar",
     "create_url_opener",
+    "ConnectionPool",
+    "PooledResponse",
+    "default_pool",
+    "parse_cgi_result",
+    "CamTimeoutError",
+    "Deadline",
+    "current_deadline",
+    "Histogram",
+    "MetricsCollector",
+    "RequestTiming",
     "my_urlopen",
     "encode_multipart",
+    "MultipartEncoder",
     "ip2long",
     "long2ip"
 ]
\ No newline at end of file
@@ -0,0 +1,369 @@
+import ssl
+import time
+import asyncio
+import weakref
+import http.client
+from email.parser import BytesParser
+from typing import Optional, Dict, Tuple, List
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from .deadline import Deadline, CamTimeoutError
+from .network import Body
+
+_MAX_HEADER_BYTES = 64 * 1024
+
+
+class AsyncResponse:
+    """Response of an AsyncConnectionPool request
+
+    The body must be consumed with ``read`` (or the response closed) before
+    the connection goes back to the pool.
+    """
+
+    def __init__(self, pool: "AsyncConnectionPool", key: Tuple,
+                 reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 status: int, reason: str, headers: http.client.HTTPMessage,
+                 url: str, will_close: bool, deadline: Optional[Deadline] = None):
+        self._pool = pool
+        self._key = key
+        self._reader = reader
+        self._writer = writer
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.url = url
+        self.will_close = will_close
+        self.deadline = deadline
+        self.connect_time = 0.0
+        self._released = False
+
+        te = (headers.get("Transfer-Encoding") or "").lower()
+        self._chunked = "chunked" in te
+        length = headers.get("Content-Length")
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        self._chunk_left = 0
+        self._eof = self._remaining == 0
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.headers.get(name, default)
+
+    async def read(self, amt: int = -1) -> bytes:
+        """Read up to amt bytes of the body (all of it if amt < 0)"""
+        if amt is None or amt < 0:
+            parts = []
+            while True:
+                part = await self.read(64 * 1024)
+                if not part:
+                    return b"".join(parts)
+                parts.append(part)
+        try:
+            if self.deadline is None:
+                data = await self._read_some(amt)
+            else:
+                data = await asyncio.wait_for(self._read_some(amt),
+                                              self.deadline.timeout("read", url=self.url))
+        except asyncio.TimeoutError as e:
+            self._discard()
+            raise CamTimeoutError("timed out reading answer", "read", self.url) from e
+        except BaseException:
+            self._discard()
+            raise
+        if self._eof:
+            self._release()
+        return data
+
+    async def _read_some(self, amt: int) -> bytes:
+        if self._eof:
+            return b""
+        if self._chunked:
+            if self._chunk_left == 0:
+                line = await self._reader.readline()
+                size = int(line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # skip trailers
+                    while (await self._reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    self._eof = True
+                    return b""
+                self._chunk_left = size
+            data = await self._reader.read(min(amt, self._chunk_left))
+            if not data:
+                raise asyncio.IncompleteReadError(data, self._chunk_left)
+            self._chunk_left -= len(data)
+            if self._chunk_left == 0:
+                await self._reader.readexactly(2)
+            return data
+        if self._remaining is None:
+            data = await self._reader.read(amt)
+            if not data:
+                self._eof = True
+            return data
+        data = await self._reader.read(min(amt, self._remaining))
+        if not data:
+            raise asyncio.IncompleteReadError(data, self._remaining)
+        self._remaining -= len(data)
+        if self._remaining == 0:
+            self._eof = True
+        return data
+
+    def close(self) -> None:
+        """Close the response; an unread body costs the connection"""
+        if self._eof:
+            self._release()
+        else:
+            self._discard()
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            if self.will_close:
+                self._writer.close()
+            else:
+                self._pool._checkin(self._key, self._reader, self._writer)
+            self._pool._release_slot(self._key)
+
+    def _discard(self) -> None:
+        if not self._released:
+            self._released = True
+            self._writer.close()
+            self._pool._release_slot(self._key)
+
+    async def __aenter__(self) -> "AsyncResponse":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+
+class AsyncConnectionPool:
+    """Keep-alive HTTP/1.1 client pool for asyncio
+
+    Asyncio counterpart of ``network.ConnectionPool``, including the
+    per-phase deadline handling.  A pool is bound to the event loop it is
+    first used in.
+    """
+
+    def __init__(self, maxsize: int = 4,
+                 idle_timeout: float = 30.0,
+                 max_connections: Optional[int] = None):
+        """Initialize pool
+
+        Args:
+            maxsize: Idle connections kept per host (0 disables keep-alive)
+            idle_timeout: Seconds after which an idle connection is dropped
+            max_connections: Optional limit of concurrent connections per host
+        """
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self._idle: Dict[Tuple, List[Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]]] = {}
+        self._slots: Dict[Tuple, asyncio.Semaphore] = {}
+
+    def _slot(self, key: Tuple) -> Optional[asyncio.Semaphore]:
+        if self.max_connections is None:
+            return None
+        sem = self._slots.get(key)
+        if sem is None:
+            sem = self._slots[key] = asyncio.Semaphore(self.max_connections)
+        return sem
+
+    def _release_slot(self, key: Tuple) -> None:
+        sem = self._slot(key)
+        if sem is not None:
+            sem.release()
+
+    def _checkout(self, key: Tuple) -> Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        now = time.monotonic()
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if now - last_used <= self.idle_timeout and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def _checkin(self, key: Tuple, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.maxsize:
+            idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+
+    async def request(self, url: str, data: Optional[Body] = None,
+                      headers: Optional[Dict[str, str]] = None,
+                      context: Optional[ssl.SSLContext] = None,
+                      method: Optional[str] = None,
+                      deadline: Optional[Deadline] = None,
+                      connect_timeout: Optional[float] = None) -> AsyncResponse:
+        """Send a request over a pooled connection
+
+        Raises ``urllib.error.HTTPError`` for error status codes and
+        CamTimeoutError when the deadline passes, like the synchronous pool.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = parts.hostname
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port, context)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        if method is None:
+            method = "POST" if data is not None else "GET"
+
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}",
+                 "Accept-Encoding: identity"]
+        for name, value in (headers or {}).items():
+            if name.lower() not in ("host", "content-length"):
+                lines.append(f"{name}: {value}")
+        if data is not None:
+            lines.append(f"Content-Length: {len(data)}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        sem = self._slot(key)
+        if sem is not None:
+            await self._bounded(sem.acquire(), deadline, "pool", url)
+        try:
+            response = await self._send(key, context, head, data, url, deadline, connect_timeout)
+        except BaseException:
+            if sem is not None:
+                sem.release()
+            raise
+
+        if response.status >= 400:
+            await response.read()
+            raise HTTPError(url, response.status, response.reason, response.headers, None)
+        return response
+
+    @staticmethod
+    async def _bounded(aw, deadline: Optional[Deadline], phase: str, url: str,
+                       cap: Optional[float] = None):
+        """Await aw within the deadline (and cap), raising CamTimeoutError"""
+        timeout = cap if deadline is None else deadline.timeout(phase, cap, url)
+        if timeout is None:
+            return await aw
+        try:
+            return await asyncio.wait_for(aw, timeout)
+        except asyncio.TimeoutError as e:
+            raise CamTimeoutError(f"timed out during {phase}", phase, url) from e
+
+    async def _open(self, key: Tuple, context: Optional[ssl.SSLContext],
+                    deadline: Optional[Deadline], connect_timeout: Optional[float],
+                    url: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        scheme, host, port = key[:3]
+        if scheme != "https":
+            return await self._bounded(asyncio.open_connection(host, port),
+                                       deadline, "connect", url, connect_timeout)
+        ssl_ctx = context if context is not None else ssl.create_default_context()
+        handshake = None if deadline is None else deadline.timeout("tls", url=url)
+        try:
+            return await self._bounded(
+                asyncio.open_connection(host, port, ssl=ssl_ctx,
+                                        ssl_handshake_timeout=handshake),
+                deadline, "connect", url, connect_timeout)
+        except (ssl.SSLError, ConnectionError) as e:
+            if handshake is not None and "timed out" in str(e):
+                raise CamTimeoutError("timed out during tls", "tls", url) from e
+            raise
+
+    async def _send(self, key: Tuple, context: Optional[ssl.SSLContext],
+                    head: bytes, data: Optional[Body], url: str,
+                    deadline: Optional[Deadline] = None,
+                    connect_timeout: Optional[float] = None) -> AsyncResponse:
+        conn = self._checkout(key)
+        connect_time = 0.0
+        while True:
+            reused = conn is not None
+            if conn is None:
+                started = time.perf_counter()
+                conn = await self._open(key, context, deadline, connect_timeout, url)
+                connect_time = time.perf_counter() - started
+            reader, writer = conn
+            try:
+                status_line, header_block = await self._bounded(
+                    self._exchange(reader, writer, head, data), deadline, "response", url)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # the camera closed an idle connection: retry once on a fresh one
+                conn = None
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            response = self._make_response(key, reader, writer, status_line, header_block, url)
+            response.deadline = deadline
+            response.connect_time = connect_time
+            return response
+
+    async def _exchange(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                        head: bytes, data: Optional[Body]) -> Tuple[bytes, bytes]:
+        """Send the request, receive status line and headers"""
+        writer.write(head)
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            writer.write(data)
+        elif data is not None:
+            # streamed body: wait for the socket after each chunk
+            for chunk in data:
+                writer.write(chunk)
+                await writer.drain()
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by camera")
+        return status_line, await self._read_headers(reader)
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> bytes:
+        lines = []
+        size = 0
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            size += len(line)
+            if size > _MAX_HEADER_BYTES:
+                raise http.client.LineTooLong("header block")
+            lines.append(line)
+        return b"".join(lines) + b"\r\n"
+
+    def _make_response(self, key: Tuple, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter, status_line: bytes,
+                       header_block: bytes, url: str) -> AsyncResponse:
+        try:
+            version, rest = status_line.decode("latin-1").rstrip("\r\n").split(" ", 1)
+            code, _, reason = rest.partition(" ")
+            status = int(code)
+        except ValueError:
+            writer.close()
+            raise http.client.BadStatusLine(status_line.decode("latin-1", "replace"))
+        headers = BytesParser(_class=http.client.HTTPMessage).parsebytes(header_block)
+
+        conn_hdr = (headers.get("Connection") or "").lower()
+        will_close = "close" in conn_hdr or (version == "HTTP/1.0" and "keep-alive" not in conn_hdr)
+        te = (headers.get("Transfer-Encoding") or "").lower()
+        if headers.get("Content-Length") is None and "chunked" not in te:
+            # body is delimited by the end of the connection
+            will_close = True
+        return AsyncResponse(self, key, reader, writer, status, reason, headers, url, will_close)
+
+    def clear(self) -> None:
+        """Close all idle connections"""
+        idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for _, writer, _ in conns:
+                writer.close()
+
+
+_default_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncConnectionPool]" = \
+    weakref.WeakKeyDictionary()
+
+def default_async_pool() -> AsyncConnectionPool:
+    """Return the connection pool shared by all async cameras of the running loop"""
+    loop = asyncio.get_running_loop()
+    pool = _default_pools.get(loop)
+    if pool is None:
+        pool = _default_pools[loop] = AsyncConnectionPool()
+    return pool
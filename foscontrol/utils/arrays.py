@@ -43,4 +43,20 @@ def binaryarray2int(source: List[str]) -> List[int]:
     Returns:
         Array of integers
     """
-    return arrayTransform(source, lambda x: int(x, 2))
\ No newline at end of file
+    return arrayTransform(source, lambda x: int(x, 2))
+
+
+def require_numpy(feature: str) -> Any:
+    """Import numpy for an optional feature
+
+    Args:
+        feature: What needs numpy, for the error message
+
+    Returns:
+        The numpy module
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(f"{feature} requires numpy (pip install foscontrol[arrays])") from None
+    return numpy
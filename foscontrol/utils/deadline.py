@@ -0,0 +1,103 @@
+import time
+import contextvars
+from typing import Optional
+
+
+class CamTimeoutError(TimeoutError):
+    """A camera request ran out of time
+
+    ``phase`` names the step that timed out: "pool" (waiting for a free
+    connection), "connect", "tls", "response" (waiting for the camera's
+    answer) or "read" (receiving the body).
+    """
+
+    def __init__(self, message: str, phase: Optional[str] = None, url: Optional[str] = None):
+        super().__init__(message)
+        self.phase = phase
+        self.url = url
+
+
+_active: "contextvars.ContextVar[Optional[Deadline]]" = contextvars.ContextVar(
+    "foscontrol_deadline", default=None)
+
+
+class Deadline:
+    """Point in time by which a (composite) operation must be finished
+
+    Used as a context manager it becomes the time budget of every camera
+    command issued in the block (by the current thread or asyncio task),
+    so several commands can share it:
+
+        with cam.budget(5.0):
+            cfg = cam.getMotionDetectConfig()
+            cam.setMotionDetectConfig(...)
+
+    Nested budgets never extend an enclosing one.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, expires: Optional[float] = None):
+        """Initialize deadline
+
+        Args:
+            seconds: Time budget from now
+            expires: Absolute time.monotonic() value (alternative to seconds)
+        """
+        if expires is None:
+            if seconds is None:
+                raise ValueError("Deadline needs seconds or expires")
+            expires = time.monotonic() + seconds
+        self.expires = expires
+        self._token = None
+
+    @classmethod
+    def after(cls, seconds: Optional[float]) -> Optional["Deadline"]:
+        """Deadline in seconds from now, or None for no limit"""
+        return None if seconds is None else cls(seconds)
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, phase: str, cap: Optional[float] = None, url: Optional[str] = None) -> float:
+        """Seconds left for a phase (at most cap); raises if none are left"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise CamTimeoutError(f"deadline exceeded before {phase}", phase, url)
+        return remaining if cap is None else min(remaining, cap)
+
+    def earliest(self, other: Optional["Deadline"]) -> "Deadline":
+        if other is None or self.expires <= other.expires:
+            return self
+        return other
+
+    def __enter__(self) -> "Deadline":
+        self._token = _active.set(self.earliest(_active.get()))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _active.reset(self._token)
+        self._token = None
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f})"
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The budget active in this thread or task, if any"""
+    return _active.get()
+
+
+def resolve_deadline(timeout: Optional[float], default: Optional[float]) -> Optional[Deadline]:
+    """Deadline of a single request
+
+    The per-call timeout (or else the default one) applies, capped by the
+    active budget.
+    """
+    deadline = Deadline.after(timeout if timeout is not None else default)
+    budget = current_deadline()
+    if deadline is None:
+        return budget
+    return deadline.earliest(budget)
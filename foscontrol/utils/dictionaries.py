@@ -1,28 +1,61 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+
+# DictBits with at most this many bits get a table of every bit combination
+_TABLE_BITS = 12
+
 
 class DictBits:
-    """Helper class for bit mappings"""
+    """Helper class for bit mappings
+
+    Conversions are table driven: the names of every bit combination are
+    precomputed as shared tuples, and names map to their bit directly.
+    """
     def __init__(self, mapping: Dict[int, str]):
         self.dict = mapping
         self.values = list(mapping.values())
         self.items = list(mapping.items())
+        self._bits = {}
+        for k, v in self.items:
+            self._bits[v] = self._bits.get(v, 0) | (1 << k)
+        width = max(mapping, default=-1) + 1
+        self._table: Optional[Tuple[Tuple[str, ...], ...]] = None
+        self._mask = (1 << width) - 1
+        if width <= _TABLE_BITS:
+            self._table = tuple(self._names(i) for i in range(1 << width))
+
+    def _names(self, value: int) -> Tuple[str, ...]:
+        return tuple(v for k, v in self.items if value & (1 << k))
+
+    def toTuple(self, value: int) -> Tuple[str, ...]:
+        """Convert integer to the (shared, immutable) tuple of matching values"""
+        if self._table is not None:
+            return self._table[value & self._mask]
+        return self._names(value)
 
     def toArray(self, value: int) -> List[str]:
         """Convert integer to array of matching values"""
-        res = []
-        for k, v in self.items:
-            if value & (1 << k):
-                res.append(v)
-        return res
+        return list(self.toTuple(value))
 
-    def fromArray(self, arr: List[str]) -> int:
-        """Convert array of strings to bitmask integer"""
+    def fromArray(self, arr: Iterable[str]) -> int:
+        """Convert array of strings to bitmask integer (unknown strings are ignored)"""
+        bits = self._bits
         res = 0
-        for k, v in self.items:
-            if v in arr:
-                res |= (1 << k)
+        for v in arr:
+            res |= bits.get(v, 0)
         return res
 
+    def toTuples(self, values: Iterable[int]) -> List[Tuple[str, ...]]:
+        """toTuple of a whole column, e.g. the linkage of every camera of a ResultBatch"""
+        table = self._table
+        if table is None:
+            return [self._names(v) for v in values]
+        mask = self._mask
+        return [table[v & mask] for v in values]
+
+    def fromArrays(self, arrays: Iterable[Iterable[str]]) -> List[int]:
+        """fromArray of many arrays"""
+        return [self.fromArray(arr) for arr in arrays]
+
 class DictChar:
     """Helper class for character mappings"""
     def __init__(self, mapping: Dict[str, str]):
@@ -30,6 +63,12 @@ class DictChar:
         self.keys = list(mapping.keys())
         self.values = list(mapping.values())
         self.items = list(mapping.items())
+        self._reverse: Dict[str, str] = {}
+        for k, v in self.items:
+            # the first key wins, as in a scan of the items
+            self._reverse.setdefault(v, k)
+        # codes as strings and, if numeric, as integers (columns of converted values)
+        self._codes = {**{int(k): v for k, v in self.items if k.isdigit()}, **mapping}
 
     def lookup(self, key: str) -> Optional[str]:
         """Look up value by key"""
@@ -37,10 +76,17 @@ class DictChar:
 
     def rlookup(self, value: str) -> Optional[str]:
         """Reverse lookup key by value"""
-        for k, v in self.items:
-            if v == value:
-                return k
-        return None
+        return self._reverse.get(value)
+
+    def lookupMany(self, keys: Iterable[Any]) -> List[Optional[str]]:
+        """lookup of a whole column; keys may be strings or integers"""
+        get = self._codes.get
+        return [get(k) for k in keys]
+
+    def rlookupMany(self, values: Iterable[str]) -> List[Optional[str]]:
+        """rlookup of a whole column"""
+        get = self._reverse.get
+        return [get(v) for v in values]
 
 # Constant definitions
 BD_alarmAction = DictBits({0: "ring", 1: "mail", 2: "picture", 3: "video"})
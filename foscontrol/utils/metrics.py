@@ -0,0 +1,168 @@
+import math
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class RequestTiming(NamedTuple):
+    """Timing of one camera request, in seconds
+
+    ``connect`` is 0.0 when a pooled connection was reused; ``ttfb`` runs
+    from sending the request (after connecting) to the answer's headers.
+    ``bytes_out`` counts request URL and body, ``bytes_in`` the answer body.
+    """
+    camera: str
+    command: str
+    connect: float
+    ttfb: float
+    body: float
+    parse: float
+    bytes_out: int
+    bytes_in: int
+    error: Optional[BaseException] = None
+
+    @property
+    def total(self) -> float:
+        return self.connect + self.ttfb + self.body + self.parse
+
+
+def _bucket_bounds(low: float, high: float, per_decade: int) -> List[float]:
+    steps = int(round(math.log10(high / low) * per_decade))
+    return [low * 10 ** (i / per_decade) for i in range(steps + 1)]
+
+
+class Histogram:
+    """Log-bucketed histogram of durations
+
+    Buckets grow by a constant factor (``per_decade`` buckets per power of
+    ten) between ``low`` and ``high`` seconds, so percentiles are accurate
+    to a few percent over the whole range while recording stays a single
+    bisect.  Values outside the range land in the first/last bucket.
+    Not thread-safe by itself; MetricsCollector serializes access.
+    """
+
+    def __init__(self, low: float = 1e-5, high: float = 100.0, per_decade: int = 20):
+        self.bounds = _bucket_bounds(low, high, per_decade)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile (0-100)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                bound = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def buckets(self) -> Iterator[Tuple[float, int]]:
+        """(upper bound, count) of all non-empty buckets"""
+        for i, n in enumerate(self.counts):
+            if n:
+                yield (self.bounds[i] if i < len(self.bounds) else math.inf), n
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the values of a histogram with the same buckets"""
+        if other.bounds != self.bounds:
+            raise ValueError("histograms have different buckets")
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+
+PHASES = ("connect", "ttfb", "body", "parse", "total")
+
+
+class CommandStats:
+    """Aggregated timings of one command on one camera"""
+
+    def __init__(self):
+        self.phases: Dict[str, Histogram] = {phase: Histogram() for phase in PHASES}
+        self.errors = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    @property
+    def count(self) -> int:
+        return self.phases["total"].count
+
+    def add(self, timing: RequestTiming) -> None:
+        phases = self.phases
+        phases["connect"].record(timing.connect)
+        phases["ttfb"].record(timing.ttfb)
+        phases["body"].record(timing.body)
+        phases["parse"].record(timing.parse)
+        phases["total"].record(timing.total)
+        self.bytes_out += timing.bytes_out
+        self.bytes_in += timing.bytes_in
+        if timing.error is not None:
+            self.errors += 1
+
+
+class MetricsCollector:
+    """Observer aggregating RequestTimings into per-command histograms
+
+    Attach it to one or many cameras (``cam.add_observer(collector)``);
+    it is thread-safe and can be read at any time:
+
+        collector.stats()[(cam.base, "getDevState")].phases["ttfb"].percentile(99)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], CommandStats] = {}
+
+    def __call__(self, timing: RequestTiming) -> None:
+        key = (timing.camera, timing.command)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = CommandStats()
+            stats.add(timing)
+
+    def stats(self) -> Dict[Tuple[str, str], CommandStats]:
+        """{(camera, command): CommandStats}"""
+        with self._lock:
+            return dict(self._stats)
+
+    def by_command(self) -> Dict[str, CommandStats]:
+        """Statistics per command, summed over all cameras"""
+        res: Dict[str, CommandStats] = {}
+        with self._lock:
+            for (_, command), stats in self._stats.items():
+                total = res.get(command)
+                if total is None:
+                    total = res[command] = CommandStats()
+                for phase, hist in stats.phases.items():
+                    total.phases[phase].merge(hist)
+                total.errors += stats.errors
+                total.bytes_out += stats.bytes_out
+                total.bytes_in += stats.bytes_in
+        return res
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
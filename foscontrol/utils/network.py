@@ -1,10 +1,18 @@
+import io
+import os
 import ssl
 import sys
+import time
 import string
 import random
-from typing import Callable, Optional, Union, Dict, Any, Tuple
+import socket
+import threading
+import http.client
+from typing import Callable, Optional, Union, Dict, Any, Iterator, Tuple, List
+from urllib.error import HTTPError
 from urllib.parse import urlsplit, urljoin, urlencode, unquote
 from urllib.request import urlopen, Request
+from .deadline import Deadline, CamTimeoutError
 
 def create_url_opener(context: Optional[ssl.SSLContext] = None) -> Callable:
     """Create URL opener with optional SSL context.
@@ -36,10 +44,496 @@ def my_urlopen(url: str, data: Optional[bytes] = None, context: Optional[ssl.SSL
         return urlopen(url, data=data)
     return urlopen(url, data=data, context=context)
 
+class PooledResponse:
+    """HTTP response that hands its connection back to the pool when done
+
+    Behaves like the object returned by ``urlopen`` for the calls made in
+    this package (``read``, ``status``, ``getheader``, ``close``).  Once the
+    body has been read completely the keep-alive connection is returned to
+    its pool; closing the response early discards the connection instead.
+    Reads are bounded by ``deadline`` (set it to None for endless streams).
+    ``connect_time`` is the time spent opening the connection, 0.0 if a
+    pooled one was reused.
+    """
+
+    def __init__(self, pool: "ConnectionPool", key: Tuple,
+                 conn: http.client.HTTPConnection,
+                 response: http.client.HTTPResponse, url: str,
+                 deadline: Optional[Deadline] = None, connect_time: float = 0.0,
+                 sock: Optional[socket.socket] = None):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        # the connection drops its socket when the response closes it
+        self._sock = sock if sock is not None else conn.sock
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+        self.deadline = deadline
+        self.connect_time = connect_time
+        self._released = False
+        self._aborted = False
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._response.getheader(name, default)
+
+    def getcode(self) -> int:
+        return self.status
+
+    def geturl(self) -> str:
+        return self.url
+
+    def _arm(self) -> None:
+        """Bound the next socket read by the remaining time"""
+        sock = self._sock
+        if sock is not None:
+            sock.settimeout(None if self.deadline is None
+                            else self.deadline.timeout("read", url=self.url))
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        """Read (part of) the body, releasing the connection at the end"""
+        try:
+            self._arm()
+            data = self._response.read(amt)
+        except socket.timeout as e:
+            self._discard()
+            raise CamTimeoutError("timed out reading answer", "read", self.url) from e
+        except BaseException:
+            self._discard()
+            raise
+        if self._response.isclosed():
+            self._release()
+        return data
+
+    def readinto(self, b) -> int:
+        """Read body bytes into a writable buffer"""
+        try:
+            self._arm()
+            n = self._response.readinto(b)
+        except socket.timeout as e:
+            self._discard()
+            raise CamTimeoutError("timed out reading answer", "read", self.url) from e
+        except BaseException:
+            self._discard()
+            raise
+        if self._response.isclosed():
+            self._release()
+        return n
+
+    def close(self) -> None:
+        """Close the response; an unread body costs the connection"""
+        if not self._released:
+            if self._response.isclosed():
+                self._release()
+            else:
+                self._discard()
+
+    def abort(self) -> None:
+        """Shut the connection down; safe to call from another thread
+
+        A read blocked in another thread returns, and the connection is
+        discarded instead of going back to the pool.
+        """
+        self._aborted = True
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            if self._response.will_close or self._aborted:
+                self._conn.close()
+            else:
+                self._pool._checkin(self._key, self._conn)
+            self._pool._release_slot(self._key)
+
+    def _discard(self) -> None:
+        if not self._released:
+            self._released = True
+            self._response.close()
+            self._conn.close()
+            self._pool._release_slot(self._key)
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections
+
+    Connections are kept per (scheme, host, port, SSL context).  At most
+    ``maxsize`` idle connections are kept for each host; connections idle
+    for longer than ``idle_timeout`` seconds are closed instead of reused,
+    as the camera has most likely dropped them already.  If
+    ``max_connections`` is set, checkout blocks until a connection to that
+    host is free.
+
+    Each request can carry a Deadline that bounds every phase: waiting
+    for a free connection, TCP connect (additionally capped by
+    ``connect_timeout``), TLS handshake, waiting for the answer and
+    reading the body.  Running out of time raises CamTimeoutError.
+    """
+
+    def __init__(self, maxsize: int = 4,
+                 idle_timeout: float = 30.0,
+                 max_connections: Optional[int] = None):
+        """Initialize pool
+
+        Args:
+            maxsize: Idle connections kept per host (0 disables keep-alive)
+            idle_timeout: Seconds after which an idle connection is dropped
+            max_connections: Optional limit of concurrent connections per host
+        """
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple, List[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._slots: Dict[Tuple, threading.BoundedSemaphore] = {}
+
+    def _slot(self, key: Tuple) -> Optional[threading.BoundedSemaphore]:
+        if self.max_connections is None:
+            return None
+        with self._lock:
+            sem = self._slots.get(key)
+            if sem is None:
+                sem = self._slots[key] = threading.BoundedSemaphore(self.max_connections)
+            return sem
+
+    def _release_slot(self, key: Tuple) -> None:
+        sem = self._slot(key)
+        if sem is not None:
+            sem.release()
+
+    def _checkout(self, key: Tuple) -> Optional[http.client.HTTPConnection]:
+        """Return a recently used idle connection for key, or None"""
+        now = time.monotonic()
+        stale = []
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                candidate, last_used = idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    conn = candidate
+                    break
+                stale.append(candidate)
+        for c in stale:
+            c.close()
+        return conn
+
+    def _checkin(self, key: Tuple, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    @staticmethod
+    def _connect(key: Tuple, context: Optional[ssl.SSLContext],
+                 deadline: Optional[Deadline],
+                 connect_timeout: Optional[float], url: str) -> http.client.HTTPConnection:
+        """Open a new connection, bounding connect and TLS handshake separately"""
+        scheme, host, port = key[:3]
+        if scheme == "https":
+            if context is None:
+                context = ssl.create_default_context()
+            conn = http.client.HTTPSConnection(host, port, context=context)
+        else:
+            conn = http.client.HTTPConnection(host, port)
+
+        phase = "connect"
+        timeout = connect_timeout
+        if deadline is not None:
+            timeout = deadline.timeout(phase, connect_timeout, url)
+        try:
+            sock = socket.create_connection((host, port), timeout)
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if scheme == "https":
+                    phase = "tls"
+                    sock.settimeout(None if deadline is None else deadline.timeout(phase, url=url))
+                    sock = context.wrap_socket(sock, server_hostname=host)
+            except BaseException:
+                sock.close()
+                raise
+        except socket.timeout as e:
+            raise CamTimeoutError(f"timed out during {phase}", phase, url) from e
+        conn.sock = sock
+        return conn
+
+    def urlopen(self, url: Union[str, Request], data: Optional["Body"] = None,
+                context: Optional[ssl.SSLContext] = None,
+                headers: Optional[Dict[str, str]] = None,
+                deadline: Optional[Deadline] = None,
+                connect_timeout: Optional[float] = None) -> PooledResponse:
+        """Send a request over a pooled connection
+
+        Accepts the same url/Request arguments as ``urllib.request.urlopen``
+        and raises ``urllib.error.HTTPError`` for error status codes.
+
+        Args:
+            url: URL or Request
+            data: POST body (bytes or MultipartEncoder)
+            context: SSL context for HTTPS
+            headers: Additional request headers
+            deadline: Time by which the whole exchange must be done
+            connect_timeout: Cap for establishing a new TCP connection
+        """
+        if isinstance(url, Request):
+            req = url
+            full_url = req.full_url
+            if data is None:
+                data = req.data
+            hdrs = dict(req.header_items())
+            method = req.get_method()
+        else:
+            full_url = url
+            hdrs = {}
+            method = "POST" if data is not None else "GET"
+        if headers:
+            hdrs.update(headers)
+
+        parts = urlsplit(full_url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port, context)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        sem = self._slot(key)
+        if sem is not None:
+            timeout = None if deadline is None else deadline.timeout("pool", url=full_url)
+            if not sem.acquire(timeout=timeout):
+                raise CamTimeoutError("timed out waiting for a free connection", "pool", full_url)
+        try:
+            response, conn, sock, connect_time = self._send(
+                key, context, method, path, data, hdrs, deadline, connect_timeout, full_url)
+        except BaseException:
+            if sem is not None:
+                sem.release()
+            raise
+
+        pooled = PooledResponse(self, key, conn, response, full_url, deadline, connect_time,
+                                sock)
+        if pooled.status >= 400:
+            # consume the body so that the connection and its slot are released
+            body = pooled.read()
+            raise HTTPError(full_url, pooled.status, pooled.reason, pooled.headers,
+                            io.BytesIO(body))
+        return pooled
+
+    def _send(self, key: Tuple, context: Optional[ssl.SSLContext], method: str,
+              path: str, data: Optional["Body"], hdrs: Dict[str, str],
+              deadline: Optional[Deadline], connect_timeout: Optional[float],
+              url: str) -> Tuple[http.client.HTTPResponse, http.client.HTTPConnection,
+                                 socket.socket, float]:
+        conn = self._checkout(key)
+        connect_time = 0.0
+        while True:
+            reused = conn is not None
+            if conn is None:
+                started = time.perf_counter()
+                conn = self._connect(key, context, deadline, connect_timeout, url)
+                connect_time = time.perf_counter() - started
+            try:
+                conn.sock.settimeout(None if deadline is None
+                                     else deadline.timeout("response", url=url))
+                conn.request(method, path, body=data, headers=hdrs)
+                sock = conn.sock
+                return conn.getresponse(), conn, sock, connect_time
+            except (http.client.RemoteDisconnected, ConnectionResetError,
+                    BrokenPipeError, http.client.CannotSendRequest):
+                conn.close()
+                if not reused:
+                    raise
+                # the camera closed an idle connection: retry once on a fresh one
+                conn = None
+            except socket.timeout as e:
+                conn.close()
+                raise CamTimeoutError("timed out waiting for answer", "response", url) from e
+            except BaseException:
+                conn.close()
+                raise
+
+    def opener(self, context: Optional[ssl.SSLContext] = None) -> Callable:
+        """Return a url opener (see ``create_url_opener``) using this pool"""
+        default_context = context
+
+        def opener(url: Union[str, Request], data: Optional["Body"] = None,
+                   context: Optional[ssl.SSLContext] = None,
+                   deadline: Optional[Deadline] = None,
+                   connect_timeout: Optional[float] = None, **kwargs) -> PooledResponse:
+            return self.urlopen(url, data=data,
+                                context=context if context is not None else default_context,
+                                deadline=deadline, connect_timeout=connect_timeout)
+        return opener
+
+    def clear(self) -> None:
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+
+_default_pool: Optional[ConnectionPool] = None
+_default_pool_lock = threading.Lock()
+
+def default_pool() -> ConnectionPool:
+    """Return the process-wide connection pool shared by all cameras"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
+
+_BOUNDARY_CHARS = string.digits + string.ascii_letters
+_CHUNK = 64 * 1024
+
+
+def _quote_header(s: str) -> str:
+    return s.replace('"', '\\"')
+
+
+class _FilePart:
+    """File content read on demand: a path or a binary file object"""
+
+    __slots__ = ("source", "start", "size")
+
+    def __init__(self, source: Any):
+        self.source = source
+        if isinstance(source, (str, os.PathLike)):
+            self.start = 0
+            self.size = os.path.getsize(source)
+        else:
+            self.start = source.tell()
+            try:
+                self.size = os.fstat(source.fileno()).st_size - self.start
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                self.size = source.seek(0, io.SEEK_END) - self.start
+                source.seek(self.start)
+
+    def chunks(self, chunk_size: int) -> Iterator[memoryview]:
+        if isinstance(self.source, (str, os.PathLike)):
+            with open(self.source, "rb") as f:
+                yield from self._read(f, chunk_size)
+        else:
+            # from the start on every pass, so that a request can be resent
+            self.source.seek(self.start)
+            yield from self._read(self.source, chunk_size)
+
+    def _read(self, f: Any, chunk_size: int) -> Iterator[memoryview]:
+        left = self.size
+        while left:
+            # a fresh buffer per chunk: transports may keep it queued
+            chunk = f.read(min(chunk_size, left))
+            if not chunk:
+                raise ValueError(f"File shrank while uploading: {left} bytes missing")
+            left -= len(chunk)
+            yield memoryview(chunk)
+
+
+class MultipartEncoder:
+    """Streaming multipart/form-data body
+
+    Iterating yields the body as memoryview chunks; files are read chunk
+    by chunk, so a firmware image is never held in memory as a whole.
+    The length is known up front (``len()``, ``headers``) and every
+    iteration starts over, so a request can be sent again.  The encoder
+    can be passed as ``data`` to sendcommand and the connection pools.
+    """
+
+    def __init__(self, fields: Dict[str, Any], files: Dict[str, Dict[str, Any]],
+                 boundary: Optional[str] = None, chunk_size: int = _CHUNK):
+        """Initialize encoder
+
+        Args:
+            fields: Form fields
+            files: Files to upload {name: {filename:, content:, content_type:}};
+                content is bytes, str (sent UTF-8 encoded), a binary file
+                object (sent from its current position) or a path given as
+                os.PathLike
+            boundary: Optional boundary string
+            chunk_size: Bytes read from a file at a time
+        """
+        if boundary is None:
+            boundary = "".join(random.choice(_BOUNDARY_CHARS) for i in range(30))
+        self.boundary = boundary
+        self.chunk_size = chunk_size
+        self._parts: List[Union[bytes, _FilePart]] = []
+        sep = f"--{boundary}\r\n".encode()
+
+        for name, value in fields.items():
+            self._parts.append(sep + (
+                f'Content-Disposition: form-data; name="{_quote_header(name)}"\r\n\r\n'
+                f'{value}\r\n').encode())
+
+        for name, fileinfo in files.items():
+            content = fileinfo["content"]
+            content_type = fileinfo.get("content_type", "application/octet-stream")
+            self._parts.append(sep + (
+                f'Content-Disposition: form-data; name="{_quote_header(name)}"; '
+                f'filename="{_quote_header(fileinfo["filename"])}"\r\n'
+                f'Content-Type: {content_type}\r\n\r\n').encode())
+            if isinstance(content, str):
+                self._parts.append(content.encode("utf-8"))
+            elif isinstance(content, (bytes, bytearray, memoryview)):
+                self._parts.append(bytes(content))
+            elif isinstance(content, os.PathLike) or hasattr(content, "read"):
+                self._parts.append(_FilePart(content))
+            else:
+                raise TypeError(f"Unsupported content for {name}: {type(content).__name__}")
+            self._parts.append(b"\r\n")
+
+        self._parts.append(f"--{boundary}--\r\n".encode())
+        self._length = sum(p.size if isinstance(p, _FilePart) else len(p) for p in self._parts)
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": f"multipart/form-data; boundary={self.boundary}",
+            "Content-Length": str(self._length),
+        }
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for part in self._parts:
+            if isinstance(part, _FilePart):
+                yield from part.chunks(self.chunk_size)
+            else:
+                yield memoryview(part)
+
+    def to_bytes(self) -> bytes:
+        """The whole body at once (small forms only)"""
+        return b"".join(self)
+
+
+# Request body: bytes or a streamed multipart form
+Body = Union[bytes, MultipartEncoder]
+
+
 def encode_multipart(fields: Dict[str, Any], files: Dict[str, Dict[str, Any]], 
                      boundary: Optional[str] = None) -> Tuple[bytes, Dict[str, str]]:
     """
     Encode form fields and files for multipart/form-data submission
+
+    Binary content is sent as is.  For large files pass a MultipartEncoder
+    as the request body instead, which streams them.
     
     Args:
         fields: Dictionary of form fields
@@ -49,53 +543,8 @@ def encode_multipart(fields: Dict[str, Any], files: Dict[str, Dict[str, Any]],
     Returns:
         Tuple of (encoded_data, headers)
     """
-    _BOUNDARY_CHARS = string.digits + string.ascii_letters
-
-    def escape_quote(s: str) -> str:
-        return s.replace('"', '\\"')
-
-    if boundary is None:
-        boundary = ''.join(random.choice(_BOUNDARY_CHARS) for i in range(30))
-
-    lines = []
-
-    for name, value in fields.items():
-        lines.extend((
-            f'--{boundary}',
-            f'Content-Disposition: form-data; name="{escape_quote(name)}"',
-            '',
-            str(value),
-        ))
-
-    for name, fileinfo in files.items():
-        filename = fileinfo['filename']
-        content = fileinfo['content']
-        lines.extend((
-            f'--{boundary}',
-            f'Content-Disposition: form-data; name="{escape_quote(name)}"; '
-            f'filename="{escape_quote(filename)}"',
-            'Content-Type: application/octet-stream',
-            '',
-            '',
-        ))
-        if isinstance(content, str):
-            lines[-1] = content
-        else:
-            lines[-1] = content.decode('utf-8')
-
-    lines.extend((
-        f'--{boundary}--',
-        '',
-    ))
-
-    body = '\r\n'.join(lines)
-    
-    headers = {
-        'Content-Type': f'multipart/form-data; boundary={boundary}',
-        'Content-Length': str(len(body)),
-    }
-
-    return body.encode('utf-8'), headers
+    encoder = MultipartEncoder(fields, files, boundary)
+    return encoder.to_bytes(), encoder.headers
 
 def ip2long(ip: str) -> int:
     """Convert an IP string to long"""
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from .deadline import CamTimeoutError, Deadline
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "shared")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.shared = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one
+
+    The first caller for a key runs the function; callers arriving while
+    it is in flight wait for it and get the same result (or exception),
+    or CamTimeoutError once their own deadline has passed.  With ``share``
+    every caller gets share(result) instead, e.g. a copy of its own.
+    """
+
+    def __init__(self, share: Optional[Callable[[Any], Any]] = None):
+        self.share = share
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args,
+           deadline: Optional[Deadline] = None, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.executed += 1
+            else:
+                call.shared += 1
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            timeout = None if deadline is None else deadline.timeout("response")
+            if not call.done.wait(timeout):
+                raise CamTimeoutError("timed out waiting for a shared request", "response")
+            if call.error is not None:
+                raise call.error
+            return call.result if self.share is None else self.share(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result if self.share is None else self.share(call.result)
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Asyncio version of SingleFlight
+
+    The request runs in a task of its own, so a cancelled caller (leader
+    or not) leaves it to the others; it is cancelled only when no caller
+    is left waiting for it.  Every caller waits until its own deadline.
+    """
+
+    def __init__(self, share: Optional[Callable[[Any], Any]] = None):
+        self.share = share
+        self._calls: Dict[Hashable, _AsyncCall] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args,
+                 deadline: Optional[Deadline] = None, **kwargs) -> Any:
+        key = (id(asyncio.get_running_loop()), key)
+        call = self._calls.get(key)
+        if call is None:
+            self.executed += 1
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn(*args, **kwargs)))
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            timeout = None if deadline is None else deadline.timeout("response")
+            await asyncio.wait((call.task,), timeout=timeout)
+            if not call.task.done():
+                raise CamTimeoutError("timed out waiting for a shared request", "response")
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+        result = call.task.result()
+        return result if self.share is None else self.share(result)
+
+    def _finished(self, key: Hashable, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # retrieved by every caller; avoids the "never retrieved" warning
+            call.task.exception()
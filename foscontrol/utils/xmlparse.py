@@ -0,0 +1,111 @@
+import re
+from typing import Dict, Optional
+
+# <CGI_Result> containing only leaf elements: the format of every CGI answer.
+# Text runs exclude the control characters XML does not allow.
+_TEXT = rb'[^<\x00-\x08\x0b\x0c\x0e-\x1f]*'
+_DOCUMENT = re.compile(
+    rb'\s*(?:<\?xml[^>]*\?>\s*)?'
+    rb'<CGI_Result>(' + _TEXT + rb')'
+    rb'((?:<([A-Za-z_][\w.-]*)>' + _TEXT + rb'</\3>' + _TEXT + rb')*)'
+    rb'</CGI_Result>\s*')
+_ENCODING = re.compile(rb'encoding\s*=\s*["\']([A-Za-z0-9._-]+)["\']')
+_REFERENCE = re.compile(r'&(?:(amp|lt|gt|quot|apos)|#([0-9]+)|#x([0-9A-Fa-f]+));')
+_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+
+
+def _replace_reference(m: "re.Match") -> str:
+    if m.group(1):
+        return _ENTITIES[m.group(1)]
+    if m.group(2):
+        return chr(int(m.group(2)))
+    return chr(int(m.group(3), 16))
+
+
+def _valid_char(code: int) -> bool:
+    """Whether a character reference is allowed in XML 1.0"""
+    return (code in (0x9, 0xA, 0xD) or 0x20 <= code <= 0xD7FF
+            or 0xE000 <= code <= 0xFFFD or 0x10000 <= code <= 0x10FFFF)
+
+
+def _text(text: str) -> Optional[str]:
+    """Decode element text like an XML parser would, None if unsure"""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if "&" in text:
+        refs = _REFERENCE.findall(text)
+        if len(refs) != text.count("&"):
+            return None
+        for name, dec, hexa in refs:
+            if not name and not _valid_char(int(dec) if dec else int(hexa, 16)):
+                return None
+        text = _REFERENCE.sub(_replace_reference, text)
+    return text
+
+
+def parse_generic(data: bytes) -> Dict[str, str]:
+    """Flatten any XML document into {tag: text} using a full DOM
+
+    Every element whose first child is a text node contributes an entry;
+    later elements with the same tag overwrite earlier ones.
+    """
+    from xml.dom.minidom import parseString
+    dom = parseString(data)
+
+    d = {}
+    for node in dom.getElementsByTagName('*'):
+        if node.firstChild and node.firstChild.nodeType == node.TEXT_NODE:
+            d[node.tagName] = node.firstChild.data
+    return d
+
+
+def parse_flat(data: bytes) -> Optional[Dict[str, str]]:
+    """Scan a flat <CGI_Result> document without building a DOM
+
+    Returns the same dict as parse_generic, or None if the document has
+    anything the scanner does not handle (nested elements, attributes,
+    CDATA, comments, unusual encodings or entities, ...).
+    """
+    m = _DOCUMENT.fullmatch(data)
+    if m is None:
+        return None
+    head = data[:m.start(1)]
+    if b"<?xml" in head:
+        enc = _ENCODING.search(head)
+        if enc is not None and enc.group(1).lower() not in (b"utf-8", b"utf8", b"us-ascii", b"ascii"):
+            return None
+    try:
+        first = m.group(1).decode("utf-8")
+        # the match guarantees "<tag>text</tag>ws" runs: every other
+        # piece between '<' is an opening tag followed by its text
+        parts = m.group(2).decode("utf-8").split("<")[1::2]
+    except UnicodeDecodeError:
+        return None
+
+    d = {}
+    if first:
+        d["CGI_Result"] = first
+    for part in parts:
+        tag, _, text = part.partition(">")
+        if text:
+            d[tag] = text
+
+    if b"&" in data or b"\r" in data:
+        for tag, text in d.items():
+            text = _text(text)
+            if text is None:
+                return None
+            d[tag] = text
+    return d
+
+
+def parse_cgi_result(data: bytes) -> Dict[str, str]:
+    """Flatten a CGI answer into {tag: text}
+
+    Uses the fast scanner for the usual flat <CGI_Result> answer and falls
+    back to the DOM parser for anything else.
+    """
+    d = parse_flat(data)
+    if d is None:
+        d = parse_generic(data)
+    return d
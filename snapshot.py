@@ -1,7 +1,9 @@
 #!/usr/bin/python3
 # -*- coding: utf-8 -*-
 
+import os
 import sys
+import tempfile
 from configparser import ConfigParser
 
 from foscontrol import Cam
@@ -37,17 +39,24 @@ if __name__ == "__main__":
     # connection to the camera
     do = Cam(prot, host, port, user, passwd, context=ctx)
 
-    (img, fnm) = do.snapPicture()
+    # the picture is streamed into a temporary file, which only replaces
+    # /tmp/test.jpg once the camera has sent a picture
+    fd, tmp = tempfile.mkstemp(suffix='.jpg', dir='/tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            info = do.snapPictureTo(f)
+        if info.ok:
+            os.replace(tmp, '/tmp/test.jpg')
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
     # Possible errors/exceptions:
     #
     # urllib.error.URLError (e.g. no route to host)
     # ssl.CertificateError (e.g. wrong or no ssl certificate)
-    # img == None (e.g. wrong password)
+    # info.ok == False (e.g. wrong password, see info.result)
 
-    if img is not None:
-        print('Writing picture')
-        open('/tmp/test.jpg', 'wb').write(img)
+    if info.ok:
+        print(f'Wrote picture: {info.nbytes} bytes in {info.elapsed:.3f}s')
     else:
-        print('No picture')
-
-
+        print('No picture:', info.result._result)
@@ -0,0 +1,75 @@
+# coding=utf-8
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+OK = "<CGI_Result><result>0</result></CGI_Result>"
+
+
+class _CGIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+    camera = None
+
+    def do_GET(self):
+        self._answer(None)
+
+    def do_POST(self):
+        self._answer(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def _answer(self, data):
+        self.query = parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+        self.cmd = self.query.get("cmd", [None])[0]
+        self.data = data
+        self.camera.calls.append(self.cmd)
+        res = self.camera.reply(self)
+        status, body = res if isinstance(res, tuple) else (200, res)
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubCamera(object):
+    """CGI stand-in on a local port
+
+    ``reply(request)`` gets the request handler with ``cmd``, ``query``
+    (parse_qs of the URL) and ``data`` (POST body or None) filled in and
+    returns the body as bytes or str, or (status, body).  ``calls`` lists
+    the commands in the order they arrived.
+    """
+
+    def __init__(self, reply=None):
+        self.reply = reply or (lambda request: OK)
+        self.calls = []
+        handler = type("Handler", (_CGIHandler,), {"camera": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.address = self.server.server_address
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_camera():
+    """Factory starting StubCamera(reply) servers, stopped after the test"""
+    started = []
+
+    def start(reply=None):
+        camera = StubCamera(reply)
+        started.append(camera)
+        return camera
+
+    yield start
+    for camera in started:
+        camera.close()
@@ -0,0 +1,55 @@
+# coding=utf-8
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+class TestAreaMasks(object):
+    def test_conversions(self):
+        from foscontrol.camera.areas import area_mask, mask_areas, values_from_masks
+
+        rows = ["0000000001", "1000000000"] + ["0000000000"] * 8
+        mask = area_mask(rows)
+        assert mask.shape == (10, 10) and mask.sum() == 2
+        # bit c is column c
+        assert mask[0, 0] and mask[1, 9]
+        assert mask_areas(mask) == rows
+        assert values_from_masks(mask)[:2].tolist() == [1, 512]
+        assert area_mask({f"area{r}": 1023 for r in range(10)}).all()
+
+    def test_fleet_statistics_and_apply(self):
+        from foscontrol import CamBase
+        from foscontrol.camera import ResultCache
+        from foscontrol.fleet import AreaMasks, CamFleet
+        from foscontrol.simulator import Simulator
+
+        sim = Simulator()
+        sim.add_cameras(3)
+        with sim:
+            fleet = CamFleet(sim.inventory(), cam_class=CamBase,
+                             cache=ResultCache(ttls={"getMotionDetectConfig": 60.0}))
+            try:
+                first = fleet.camera("cam0000")
+                first.sendcommand("setMotionDetectConfig", dict(
+                    isEnable=1, linkage=3, snapInterval=2, triggerInterval=0, sensitivity=1,
+                    **{f"schedule{d}": 7 for d in range(7)},
+                    **{f"area{r}": 1023 for r in range(10)}))
+                masks = AreaMasks.collect(fleet)
+                assert len(masks) == 3
+                assert masks.union().all() and not masks.intersection().any()
+                assert sorted(masks.coverage().tolist()) == [0.0, 0.0, 1.0]
+
+                target = np.zeros((10, 10), dtype=bool)
+                target[:5] = True
+                written = list(masks.apply(fleet, target))
+                assert len(written) == 3 and all(r.ok for r in written)
+                assert list(masks.apply(fleet, target)) == []
+
+                # the writes dropped the cached reads
+                again = AreaMasks.collect(fleet)
+                assert not again.differs(target).any()
+                cfg = first.getMotionDetectConfig()
+                assert cfg.linkage == "3" and cfg.schedule0 == format(7, "048b")
+            finally:
+                fleet.close()
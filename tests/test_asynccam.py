@@ -0,0 +1,65 @@
+# coding=utf-8
+
+import asyncio
+
+import pytest
+
+RESPONSES = {
+    "getMotionDetectConfig": (
+        "<CGI_Result><result>0</result><isEnable>1</isEnable><linkage>5</linkage>"
+        "<snapInterval>1</snapInterval><sensitivity>2</sensitivity>"
+        "<triggerInterval>0</triggerInterval>"
+        + "".join(f"<schedule{d}>{'1' * 48}</schedule{d}>" for d in range(7))
+        + "".join(f"<area{r}>{'0' * 10}</area{r}>" for r in range(10))
+        + "</CGI_Result>"),
+    "getDevState": "<CGI_Result><result>0</result><motionDetectAlarm>1</motionDetectAlarm></CGI_Result>",
+    "ptzMoveUp": "<CGI_Result><result>0</result></CGI_Result>",
+}
+
+
+def _reply(request):
+    if request.cmd == "snapPicture2":
+        return b"\xff\xd8" + b"\x00" * 1000 + b"\xff\xd9"
+    return RESPONSES.get(request.cmd, "<CGI_Result><result>-1</result></CGI_Result>")
+
+
+@pytest.fixture
+def server(stub_camera):
+    return stub_camera(_reply).address
+
+
+class TestAsyncCam(object):
+    def test_matches_sync(self, server):
+        from foscontrol import Cam, AsyncCam
+
+        host, port = server
+        sync_res = Cam("http", host, port, "admin", "").getMotionDetectConfig()
+
+        async def run():
+            cam = AsyncCam("http", host, port, "admin", "")
+            return await asyncio.gather(cam.getMotionDetectConfig(),
+                                        cam.snapPicture2(),
+                                        cam.ptzMoveUp())
+
+        res, img, ptz = asyncio.run(run())
+        assert res.data == sync_res.data
+        assert res._sensitivity == "high"
+        assert res._linkage == ["ring", "picture"]
+        assert res.isEnable is True
+        assert img[:2] == b"\xff\xd8" and len(img) == 1004
+        assert ptz.result == 0
+
+    def test_keepalive(self, server):
+        from foscontrol import AsyncCamBase
+        from foscontrol.utils.aionetwork import AsyncConnectionPool
+
+        host, port = server
+
+        async def run():
+            pool = AsyncConnectionPool()
+            cam = AsyncCamBase("http", host, port, "admin", "", pool=pool)
+            for _ in range(5):
+                assert (await cam.getDevState()).motionDetectAlarm == "1"
+            return sum(len(c) for c in pool._idle.values())
+
+        assert asyncio.run(run()) == 1
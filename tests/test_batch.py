@@ -0,0 +1,74 @@
+# coding=utf-8
+
+import io
+import json
+
+import pytest
+
+
+def _batch():
+    from foscontrol.fleet import ResultBatch
+    from foscontrol.camera.result import ResultObj
+
+    batch = ResultBatch("getDevState")
+    batch.append("a", ResultObj({"result": "0", "motionDetectAlarm": "1", "url": "x"}))
+    batch.append("b", None, TimeoutError("no answer"))
+    batch.append("c", {"result": "-3"})
+    batch.append("d", ResultObj({"result": "0", "motionDetectAlarm": "2", "newField": "n"}))
+    return batch
+
+
+class TestResultBatch(object):
+    def test_columns(self):
+        batch = _batch()
+        assert len(batch) == 4 and batch.fields == ["result", "motionDetectAlarm", "url",
+                                                    "newField"]
+        assert batch.column("result").typecode == "q"
+        assert batch.values("motionDetectAlarm") == [1, None, None, 2]
+        assert batch.values("newField") == [None, None, None, "n"]
+        assert batch.row(1) == {"camera": "b", "error": "no answer", "result": None,
+                                "motionDetectAlarm": None, "url": None, "newField": None}
+
+    def test_filter_and_group(self):
+        batch = _batch()
+        assert batch.where("result", lambda r: r == 0).cameras == ["a", "d"]
+        assert batch.failed().cameras == ["b", "c"]
+        groups = batch.group_by("result")
+        assert sorted(groups, key=str) == [-3, 0, None]
+        assert groups[0].values("motionDetectAlarm") == [1, 2]
+
+    def test_export(self):
+        batch = _batch()
+        out = io.StringIO()
+        batch.write_jsonl(out, ["result"])
+        assert [json.loads(line) for line in out.getvalue().splitlines()][2] == {
+            "camera": "c", "error": None, "result": -3}
+        out = io.StringIO()
+        batch.write_csv(out, ["result"])
+        assert out.getvalue().splitlines() == [
+            "camera,error,result", "a,,0", "b,no answer,", "c,,-3", "d,,0"]
+
+    def test_numpy(self):
+        pytest.importorskip("numpy")
+
+        arrays = _batch().to_numpy(["result", "url"])
+        assert arrays["result"].mask.tolist() == [False, True, False, False]
+        assert arrays["result"].sum() == -3
+        assert arrays["url"].dtype == object
+
+    def test_fleet_collect(self):
+        from foscontrol import CamBase
+        from foscontrol.fleet import CamFleet
+        from foscontrol.simulator import Simulator
+
+        sim = Simulator()
+        sim.add_cameras(3)
+        with sim:
+            fleet = CamFleet(sim.inventory(), cam_class=CamBase)
+            try:
+                batch = fleet.collect("getMirrorAndFlipSetting")
+            finally:
+                fleet.close()
+        assert sorted(batch.cameras) == ["cam0000", "cam0001", "cam0002"]
+        assert batch.column("isMirror").typecode == "b"
+        assert batch.values("isFlip") == [False] * 3
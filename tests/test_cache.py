@@ -0,0 +1,66 @@
+# coding=utf-8
+
+import pytest
+
+
+def _reply(request):
+    return "<CGI_Result><result>0</result><isMirror>1</isMirror><isFlip>0</isFlip></CGI_Result>"
+
+
+@pytest.fixture
+def stub(stub_camera):
+    return stub_camera(_reply)
+
+
+@pytest.fixture
+def server(stub):
+    return stub.address
+
+
+class TestResultCache(object):
+    def test_read_through_and_invalidation(self, server, stub):
+        from foscontrol import Cam
+        from foscontrol.camera import ResultCache
+
+        host, port = server
+        cache = ResultCache()
+        cam = Cam("http", host, port, "admin", "", cache=cache)
+
+        first = cam.getMirrorAndFlipSetting()
+        assert first.isMirror is True
+        first.set("isMirror", False)
+        assert cam.getMirrorAndFlipSetting().isMirror is True
+        assert stub.calls == ["getMirrorAndFlipSetting"]
+        assert cache.stats()["hits"] == 1
+
+        cam.setMirrorAndFlipSetting(True, False)
+        cam.getMirrorAndFlipSetting()
+        assert stub.calls == ["getMirrorAndFlipSetting", "setMirrorAndFlipSetting",
+                                  "getMirrorAndFlipSetting"]
+        # the generic entry point is cached and invalidates alike
+        cam.call("getMirrorAndFlipSetting")
+        cam.call("setMirrorAndFlipSetting", {"isMirror": 1, "isFlip": 0})
+        cam.call("getMirrorAndFlipSetting")
+        assert stub.calls[3:] == ["setMirrorAndFlipSetting", "getMirrorAndFlipSetting"]
+        # not a cached getter
+        cam.getDevState()
+        cam.getDevState()
+        assert stub.calls.count("getDevState") == 2
+
+    def test_ttl_and_lru(self):
+        from foscontrol.camera import ResultCache
+
+        now = [0.0]
+        cache = ResultCache(ttls={"getDevInfo": 10.0}, maxsize=2, clock=lambda: now[0])
+
+        class Res(object):
+            result = 0
+
+        for cam in ("a", "b", "c"):
+            cache.store(cam, "getDevInfo", Res())
+        assert cache.get("a", "getDevInfo") is None
+        assert cache.get("c", "getDevInfo") is not None
+        now[0] = 11.0
+        assert cache.get("c", "getDevInfo") is None
+        assert cache.stats() == {"size": 1, "hits": 1, "misses": 2,
+                                 "evictions": 1, "invalidations": 0}
@@ -0,0 +1,82 @@
+# coding=utf-8
+
+import time
+import threading
+
+
+class _FakeCam(object):
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.base = f"fake{id(self)}"
+
+    def snapPictureTo(self, buf):
+        from foscontrol.camera.snapshot import SnapshotInfo
+        self.calls += 1
+        time.sleep(self.delay)
+        data = b"\xff\xd8" + bytes([self.calls % 256]) + b"\xff\xd9"
+        buf[:len(data)] = data
+        return SnapshotInfo(len(data), self.delay, self.delay)
+
+
+class TestCaptureEngine(object):
+    def test_rate_drops_and_ring(self):
+        from foscontrol.capture import CaptureEngine
+
+        fast, slow = _FakeCam(0.001), _FakeCam(0.07)
+        seen = []
+        engine = CaptureEngine({"fast": fast, "slow": slow}, fps=20, buffer_size=5)
+        engine.subscribe(seen.append)
+        with engine:
+            time.sleep(0.5)
+        stats = engine.stats()
+
+        # 20 fps for 0.5 s: ~10 frames, no drift, no catching up
+        assert 9 <= stats["fast"].captured <= 12
+        assert stats["fast"].dropped == 0
+        # 70 ms per snapshot at a 50 ms interval: every other slot skipped
+        assert stats["slow"].dropped >= 3
+        assert stats["slow"].captured + stats["slow"].dropped >= 9
+        assert len(engine.ring.latest()) == 5
+        assert len(seen) == stats["fast"].captured + stats["slow"].captured
+        assert seen[0].data.startswith(b"\xff\xd8")
+
+    def test_generator(self):
+        from foscontrol.capture import CaptureEngine
+
+        engine = CaptureEngine([_FakeCam(0.0)], fps=50, buffer_size=10)
+        got = []
+
+        def consume():
+            for frame in engine.frames(timeout=1.0):
+                got.append(frame.seq)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        time.sleep(0.05)
+        with engine:
+            time.sleep(0.2)
+        consumer.join(2)
+        assert not consumer.is_alive()
+        assert len(got) >= 5
+        assert got == sorted(got)
+
+    def test_restart(self):
+        from foscontrol.capture import CaptureEngine
+
+        engine = CaptureEngine([_FakeCam(0.0)], fps=50, buffer_size=10)
+        with engine:
+            time.sleep(0.1)
+        first = engine.ring
+        assert first.closed and first.latest()
+
+        got = []
+        consumer = threading.Thread(
+            target=lambda: got.extend(engine.frames(timeout=0.5)))
+        with engine:
+            consumer.start()
+            time.sleep(0.2)
+        consumer.join(2)
+        assert engine.ring is not first and engine.ring.closed
+        assert len(got) >= 3
+        assert 5 <= next(iter(engine.stats().values())).captured <= 12
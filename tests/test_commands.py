@@ -0,0 +1,82 @@
+# coding=utf-8
+
+import inspect
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+
+class _Recorder(object):
+    """url_opener stand-in recording the requested urls"""
+
+    def __init__(self):
+        self.urls = []
+
+    def __call__(self, url, **kwargs):
+        import io
+        self.urls.append(url)
+        return io.BytesIO(b"<CGI_Result><result>0</result><speed>4</speed></CGI_Result>")
+
+    def query(self):
+        return {k: v[0] for k, v in parse_qs(urlsplit(self.urls[-1]).query,
+                                             keep_blank_values=True).items()}
+
+
+def _cam(cls):
+    cam = cls("http", "127.0.0.1", 88, "admin", "p&w d")
+    cam.url_opener = _Recorder()
+    return cam
+
+
+class TestCommandTable(object):
+    def test_url_and_param_untouched(self):
+        from foscontrol import CamBase
+
+        cam = _cam(CamBase)
+        param = {"recordPath": 0}
+        cam.sendcommand("getRecordList", param)
+        assert param == {"recordPath": 0}
+        assert cam.url_opener.query() == {"cmd": "getRecordList", "recordPath": "0",
+                                          "usr": "admin", "pwd": "p&w d"}
+
+        cam.password = "new"
+        cam.getDevState()
+        assert cam.url_opener.query()["pwd"] == "new"
+
+    def test_generated_base_methods(self):
+        from foscontrol import CamBase
+
+        cam = _cam(CamBase)
+        cam.setMotionDetectConfig(True, 5, 1, 0, 2, [1] * 7, areas=[3] * 10)
+        query = cam.url_opener.query()
+        assert query["isEnable"] == "1" and query["linkage"] == "5"
+        assert query["schedule6"] == "1" and query["area9"] == "3"
+        assert "areas" not in query
+
+        cam.getRecordList(0, startNo=10)
+        assert cam.url_opener.query()["startNo"] == "10"
+        assert "startTime" not in cam.url_opener.query()
+
+        assert list(inspect.signature(CamBase.setIPInfo).parameters) == [
+            "self", "isDHCP", "ip", "gate", "mask", "dns1", "dns2"]
+        with pytest.raises(TypeError):
+            cam.setPTZSpeed()
+
+    def test_cam_conversions(self):
+        from foscontrol import Cam
+
+        cam = _cam(Cam)
+        cam.setMotionDetectConfig(True, ["ring", "picture"], 1, 0, "high",
+                                  ["1" * 48] * 7, ["1" + "0" * 9] * 10)
+        query = cam.url_opener.query()
+        assert query["linkage"] == "5" and query["sensitivity"] == "2"
+        assert query["schedule0"] == str(2 ** 48 - 1) and query["area0"] == "512"
+
+        assert cam.getPTZSpeed()._speed_desc == "very slow"
+        with pytest.raises(ValueError):
+            cam.setPTZSpeed("warp")
+        cam.setSystemTime("manually", "", "YYYY-MM-DD", "24 hours", -3600, False, 0,
+                          2026, 10, 18, 12, 0, 0)
+        query = cam.url_opener.query()
+        assert query["timeSource"] == "1" and query["timeFormat"] == "1"
+        assert query["timeZone"] == "-3600" and query["isDst"] == "0"
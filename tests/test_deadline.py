@@ -0,0 +1,75 @@
+# coding=utf-8
+
+import asyncio
+import time
+
+import pytest
+
+
+def _slow_reply(request):
+    if request.cmd != "getDevState":
+        time.sleep(0.3)
+    return "<CGI_Result><result>0</result></CGI_Result>"
+
+
+@pytest.fixture
+def server(stub_camera):
+    return stub_camera(_slow_reply).address
+
+
+class TestDeadline(object):
+    def test_nested_budget_never_extends(self):
+        from foscontrol.utils.deadline import Deadline, current_deadline
+
+        with Deadline(1.0) as outer:
+            with Deadline(60.0):
+                assert current_deadline() is outer
+        assert current_deadline() is None
+
+    def test_exhausted_budget_raises(self):
+        from foscontrol.utils.deadline import Deadline, CamTimeoutError
+
+        with pytest.raises(CamTimeoutError) as e:
+            Deadline(-1.0).timeout("connect")
+        assert e.value.phase == "connect"
+
+
+class TestCamTimeouts(object):
+    def test_per_call_timeout(self, server):
+        from foscontrol import CamBase, CamTimeoutError
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        cam = CamBase("http", host, port, "admin", "", pool=ConnectionPool())
+        with pytest.raises(CamTimeoutError) as e:
+            cam.sendcommand("getProductModel", timeout=0.1)
+        assert e.value.phase == "response"
+        assert cam.getDevState().result == 0
+
+    def test_shared_budget(self, server):
+        from foscontrol import CamBase, CamTimeoutError
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        cam = CamBase("http", host, port, "admin", "", pool=ConnectionPool())
+        start = time.monotonic()
+        with pytest.raises(CamTimeoutError):
+            with cam.budget(0.5):
+                cam.sendcommand("getProductModel")
+                cam.sendcommand("getProductName")
+        assert time.monotonic() - start < 0.7
+
+    def test_async_timeout(self, server):
+        from foscontrol import AsyncCamBase, CamTimeoutError
+        from foscontrol.utils.aionetwork import AsyncConnectionPool
+
+        host, port = server
+
+        async def run():
+            cam = AsyncCamBase("http", host, port, "admin", "", pool=AsyncConnectionPool())
+            with pytest.raises(CamTimeoutError) as e:
+                await cam.sendcommand("getProductModel", timeout=0.1)
+            assert e.value.phase == "response"
+            assert (await cam.getDevState()).result == 0
+
+        asyncio.run(run())
@@ -0,0 +1,28 @@
+# coding=utf-8
+
+from array import array
+
+
+class TestCodecs(object):
+    def test_dictbits(self):
+        from foscontrol.utils.dictionaries import BD_alarmAction, DictBits
+
+        assert BD_alarmAction.toArray(5) == ["ring", "picture"]
+        assert BD_alarmAction.toTuple(5) is BD_alarmAction.toTuple(5 | 64)
+        assert BD_alarmAction.fromArray(["video", "ring", "unknown"]) == 9
+        assert BD_alarmAction.toTuples(array("q", [0, 15, -1])) == [
+            (), ("ring", "mail", "picture", "video"), ("ring", "mail", "picture", "video")]
+        assert BD_alarmAction.fromArrays([["mail"], []]) == [2, 0]
+
+        # too wide for a table: same results from the item scan
+        wide = DictBits({0: "a", 20: "b"})
+        assert wide.toArray(1 | 1 << 20) == ["a", "b"] and wide.fromArray(["b"]) == 1 << 20
+
+    def test_dictchar(self):
+        from foscontrol.utils.dictionaries import DC_ptzSpeedList, DictChar
+
+        assert DC_ptzSpeedList.rlookup("fast") == "1" and DC_ptzSpeedList.rlookup("x") is None
+        assert DC_ptzSpeedList.lookupMany(["0", 4, None, 9]) == [
+            "very fast", "very slow", None, None]
+        assert DC_ptzSpeedList.rlookupMany(["slow", "fast"]) == ["3", "1"]
+        assert DictChar({"1": "same", "2": "same"}).rlookup("same") == "1"
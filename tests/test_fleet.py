@@ -0,0 +1,90 @@
+# coding=utf-8
+
+import time
+import threading
+
+
+def _inventory(n):
+    from foscontrol.fleet import CameraSpec
+    return [CameraSpec("127.0.0.1", 1, "admin", "", name=f"cam{i}") for i in range(n)]
+
+
+class TestCamFleet(object):
+    def test_streams_results_and_reports_failures(self):
+        from foscontrol.fleet import CamFleet
+
+        def probe(cam, name_of):
+            name = name_of[id(cam)]
+            if name == "cam0":
+                time.sleep(1.0)
+            if name == "cam1":
+                raise ConnectionRefusedError("dead host")
+            return name
+
+        with CamFleet(_inventory(5), max_concurrency=4, timeout=0.3) as fleet:
+            name_of = {id(fleet.camera(n)): n for n in fleet}
+            start = time.monotonic()
+            results = list(fleet.run(probe, name_of))
+            elapsed = time.monotonic() - start
+
+        assert elapsed < 0.9
+        by_name = {r.name: r for r in results}
+        assert by_name["cam0"].timed_out
+        assert isinstance(by_name["cam1"].error, ConnectionRefusedError)
+        assert [by_name[f"cam{i}"].value for i in range(2, 5)] == ["cam2", "cam3", "cam4"]
+        # the slow camera comes last
+        assert results[-1].name == "cam0"
+
+    def test_timeout_counts_from_start(self):
+        from foscontrol.fleet import CamFleet
+
+        def probe(cam):
+            if cam is slow:
+                time.sleep(0.8)
+            return True
+
+        with CamFleet(_inventory(2), max_concurrency=1, timeout=0.3) as fleet:
+            slow = fleet.camera("cam0")
+            results = {r.name: r for r in fleet.run(probe, cameras=["cam0", "cam1"])}
+
+        # cam1 waits for the worker of the abandoned call, then gets its full time
+        assert results["cam0"].timed_out
+        assert results["cam1"].ok and results["cam1"].elapsed < 0.3
+
+    def test_concurrency_limits(self):
+        from foscontrol.fleet import CamFleet
+
+        lock = threading.Lock()
+        active = {"total": 0, "max_total": 0, "per_cam": {}, "max_per_cam": 0}
+
+        def work(cam):
+            with lock:
+                active["total"] += 1
+                active["per_cam"][id(cam)] = active["per_cam"].get(id(cam), 0) + 1
+                active["max_total"] = max(active["max_total"], active["total"])
+                active["max_per_cam"] = max(active["max_per_cam"], active["per_cam"][id(cam)])
+            time.sleep(0.02)
+            with lock:
+                active["total"] -= 1
+                active["per_cam"][id(cam)] -= 1
+
+        with CamFleet(_inventory(10), max_concurrency=3) as fleet:
+            runs = [threading.Thread(target=lambda: list(fleet.run(work))) for _ in range(3)]
+            for t in runs:
+                t.start()
+            for t in runs:
+                t.join()
+
+        assert active["max_total"] <= 3
+        assert active["max_per_cam"] == 1
+
+    def test_from_config(self, tmp_path):
+        from foscontrol.fleet import CamFleet
+
+        cfg = tmp_path / "fleet.cfg"
+        cfg.write_text("[front]\nprotocol=https\nhost=10.0.0.1\nport=443\nuser=admin\npassword=x\n"
+                       "[back]\nhost=10.0.0.2\nport=88\nuser=admin\npassword=y\n")
+        fleet = CamFleet.from_config(str(cfg))
+        assert list(fleet) == ["front", "back"]
+        assert fleet.camera("front").base == "https://10.0.0.1:443/cgi-bin/CGIProxy.fcgi"
+        assert fleet.specs["back"].prot == "http"
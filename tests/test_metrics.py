@@ -0,0 +1,64 @@
+# coding=utf-8
+
+
+import pytest
+
+
+def _reply(request):
+    return "<CGI_Result><result>0</result><model>1234</model></CGI_Result>"
+
+
+@pytest.fixture
+def server(stub_camera):
+    return stub_camera(_reply).address
+
+
+class TestHistogram(object):
+    def test_percentiles(self):
+        from foscontrol.utils.metrics import Histogram
+
+        hist = Histogram()
+        for i in range(1, 101):
+            hist.record(i / 1000.0)
+        assert hist.count == 100
+        assert hist.min == 0.001 and hist.max == 0.1
+        assert 0.049 <= hist.percentile(50) <= 0.057
+        assert hist.percentile(100) == 0.1
+        assert sum(n for _, n in hist.buckets()) == 100
+
+
+class TestObservers(object):
+    def test_collects_phases(self, server):
+        from foscontrol import CamBase
+        from foscontrol.utils.metrics import MetricsCollector
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        cam = CamBase("http", host, port, "admin", "", pool=ConnectionPool())
+        timings = []
+        collector = MetricsCollector()
+        cam.add_observer(timings.append)
+        cam.add_observer(collector)
+        for _ in range(3):
+            cam.getDevState()
+
+        assert [t.command for t in timings] == ["getDevState"] * 3
+        assert timings[0].connect > 0
+        assert timings[1].connect == 0.0
+        assert all(t.ttfb > 0 and t.parse > 0 and t.bytes_in > 0 for t in timings)
+
+        stats = collector.stats()[(cam.base, "getDevState")]
+        assert stats.count == 3 and stats.errors == 0
+        assert stats.bytes_in == sum(t.bytes_in for t in timings)
+        assert collector.by_command()["getDevState"].count == 3
+
+    def test_reports_errors(self):
+        from foscontrol import CamBase
+        from foscontrol.utils.network import ConnectionPool
+
+        cam = CamBase("http", "127.0.0.1", 1, "admin", "", pool=ConnectionPool())
+        timings = []
+        cam.add_observer(timings.append)
+        with pytest.raises(OSError):
+            cam.getDevState()
+        assert len(timings) == 1 and isinstance(timings[0].error, OSError)
@@ -0,0 +1,106 @@
+# coding=utf-8
+
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+def _frame(i):
+    return b"\xff\xd8" + bytes([i % 256]) * (1000 + 37 * i) + b"\xff\xd9"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+    frames = 30
+    with_length = True
+    stall = 0.0
+
+    def do_GET(self):
+        assert self.path.startswith("/cgi-bin/CGIStream.cgi?cmd=GetMJStream")
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace;boundary=ipcamera")
+        self.end_headers()
+        for i in range(self.frames):
+            frame = _frame(i)
+            head = b"--ipcamera\r\nContent-Type: image/jpeg\r\n"
+            if self.with_length:
+                head += b"Content-Length: %d\r\n" % len(frame)
+            self.wfile.write(head + b"\r\n" + frame + b"\r\n")
+            self.wfile.flush()
+        time.sleep(self.stall)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv.server_address
+    srv.shutdown()
+    srv.server_close()
+
+
+class TestMJPEGStream(object):
+    @pytest.mark.parametrize("with_length", [True, False])
+    def test_frames(self, server, with_length):
+        from foscontrol import CamBase
+
+        _Handler.with_length = with_length
+        cam = CamBase("http", *server, "admin", "")
+        stream = cam.openMJStream(queue_size=64, max_frame_size=4096)
+        frames = [bytes(f) for f in stream]
+        assert frames == [_frame(i) for i in range(30)]
+        assert stream.stats().frames == 30 and stream.stats().dropped == 0
+
+    def test_slow_consumer_drops_oldest(self, server):
+        from foscontrol import CamBase
+
+        _Handler.with_length = True
+        stream = CamBase("http", *server, "admin", "").openMJStream(queue_size=2, max_frame_size=4096)
+        time.sleep(0.3)
+        frames = [bytes(f) for f in stream]
+        stats = stream.stats()
+        assert stats.frames == 30
+        assert stats.dropped > 0
+        assert len(frames) == 30 - stats.dropped
+        # the newest frames survive
+        assert frames[-1] == _frame(29)
+        assert all(f.startswith(b"\xff\xd8") and f.endswith(b"\xff\xd9") for f in frames)
+
+    def test_close_stalled(self, server):
+        from foscontrol import CamBase
+
+        # more than one read's worth, then nothing
+        _Handler.with_length, _Handler.frames, _Handler.stall = True, 40, 1.5
+        try:
+            stream = CamBase("http", *server, "admin", "").openMJStream(queue_size=64,
+                                                                        max_frame_size=4096)
+            frames = iter(stream)
+            assert bytes(next(frames)) == _frame(0)
+            # the camera sends nothing more; close must not wait for it
+            stream.close()
+            stream._thread.join(0.5)
+            assert not stream._thread.is_alive()
+        finally:
+            _Handler.frames, _Handler.stall = 30, 0.0
+
+    def test_async(self, server):
+        import asyncio
+        from foscontrol import AsyncCamBase
+
+        _Handler.with_length = False
+
+        async def run():
+            cam = AsyncCamBase("http", *server, "admin", "")
+            async with await cam.openMJStream(queue_size=64, max_frame_size=4096) as stream:
+                with pytest.raises(TypeError):
+                    iter(stream)
+                return [bytes(f) async for f in stream], stream.stats()
+
+        frames, stats = asyncio.run(run())
+        assert frames == [_frame(i) for i in range(30)]
+        assert stats.frames == 30 and stats.dropped == 0
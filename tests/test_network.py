@@ -0,0 +1,140 @@
+# coding=utf-8
+
+import hashlib
+import io
+import threading
+from urllib.parse import urlsplit
+
+import pytest
+
+
+def _reply(request):
+    if request.data is None:
+        body = f"<CGI_Result><result>0</result><port>{request.client_address[1]}</port></CGI_Result>"
+        return (404 if "missing" in request.path else 200), body
+    digest = hashlib.sha1(request.data).hexdigest()
+    query = urlsplit(request.path).query.replace("&", ",")
+    return (f"<CGI_Result><result>0</result><query>{query}</query>"
+            f"<size>{len(request.data)}</size><sha1>{digest}</sha1></CGI_Result>")
+
+
+@pytest.fixture
+def server(stub_camera):
+    return stub_camera(_reply).address
+
+
+class TestConnectionPool(object):
+    def test_reuses_connection(self, server):
+        from foscontrol import CamBase
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        cam = CamBase("http", host, port, "admin", "", pool=ConnectionPool())
+        ports = {cam.getDevState().port for _ in range(5)}
+        assert len(ports) == 1
+
+    def test_no_keepalive(self, server):
+        from foscontrol import CamBase
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        cam = CamBase("http", host, port, "admin", "", pool=ConnectionPool(maxsize=0))
+        ports = {cam.getDevState().port for _ in range(3)}
+        assert len(ports) == 3
+
+    def test_idle_eviction(self, server):
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        pool = ConnectionPool(idle_timeout=0.0)
+        url = f"http://{host}:{port}/"
+        first = pool.urlopen(url).read()
+        import time
+        time.sleep(0.01)
+        second = pool.urlopen(url).read()
+        assert first != second
+
+    def test_http_error(self, server):
+        from urllib.error import HTTPError
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        with pytest.raises(HTTPError):
+            ConnectionPool().urlopen(f"http://{host}:{port}/missing")
+
+    def test_http_error_releases_slot(self, server):
+        from urllib.error import HTTPError
+        from foscontrol.utils import Deadline
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        pool = ConnectionPool(max_connections=1)
+        errors = []
+        for _ in range(3):
+            # the errors are kept, unread and unclosed
+            with pytest.raises(HTTPError) as info:
+                pool.urlopen(f"http://{host}:{port}/missing", deadline=Deadline.after(2.0))
+            errors.append(info.value)
+        assert errors[0].read().startswith(b"<CGI_Result>")
+        assert pool.urlopen(f"http://{host}:{port}/", deadline=Deadline.after(2.0)).read()
+
+    def test_threads_bounded(self, server):
+        from foscontrol.utils.network import ConnectionPool
+
+        host, port = server
+        pool = ConnectionPool(maxsize=2, max_connections=2)
+        url = f"http://{host}:{port}/"
+        seen = []
+
+        def worker():
+            for _ in range(10):
+                seen.append(pool.urlopen(url).read())
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(seen) == 60
+        assert len(set(seen)) <= 2
+
+
+class TestMultipartEncoder(object):
+    def test_body(self, tmp_path):
+        from foscontrol.utils import MultipartEncoder, encode_multipart
+
+        blob = bytes(range(256)) * 300
+        path = tmp_path / "fw.bin"
+        path.write_bytes(blob)
+        enc = MultipartEncoder({"a": 1}, {"fw": {"filename": "fw.bin", "content": path},
+                                          "cfg": {"filename": "c.bin", "content": io.BytesIO(blob)}},
+                               boundary="XyZ", chunk_size=1000)
+        body = enc.to_bytes()
+        assert len(body) == len(enc) == int(enc.headers["Content-Length"])
+        assert body.count(blob) == 2 and enc.to_bytes() == body
+        assert max(len(c) for c in enc) == 1000
+
+        # text content gives the same body as before, binary content is kept
+        data, headers = encode_multipart({"x": "y"}, {"f": {"filename": "t", "content": "ä"}}, "B")
+        assert data == ('--B\r\nContent-Disposition: form-data; name="x"\r\n\r\ny\r\n'
+                        '--B\r\nContent-Disposition: form-data; name="f"; filename="t"\r\n'
+                        'Content-Type: application/octet-stream\r\n\r\nä\r\n--B--\r\n').encode()
+        assert headers["Content-Length"] == str(len(data))
+        data, _ = encode_multipart({}, {"f": {"filename": "t", "content": b"\xff\xfe"}})
+        assert b"\xff\xfe" in data
+
+    def test_upload(self, server, tmp_path):
+        from foscontrol import CamBase
+        from foscontrol.utils import MultipartEncoder
+        from foscontrol.utils.network import ConnectionPool
+
+        blob = b"\x00\xff" * 200000
+        path = tmp_path / "fw.bin"
+        path.write_bytes(blob)
+        enc = MultipartEncoder({}, {"file": {"filename": "fw.bin", "content": path}})
+        host, port = server
+        cam = CamBase("http", host, port, "admin", "", pool=ConnectionPool())
+        res = cam.sendcommand("importConfig", data=enc)
+        assert res.query.startswith("cmd=importConfig,usr=admin")
+        assert int(res.size) == len(enc)
+        assert res.sha1 == hashlib.sha1(enc.to_bytes()).hexdigest()
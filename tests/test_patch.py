@@ -0,0 +1,98 @@
+# coding=utf-8
+
+import threading
+
+from .test_records import _cam
+
+
+class _Counting(object):
+    """Cam.sendcommand wrapper counting commands, optionally holding the first setter"""
+
+    def __init__(self, cam, hold=None):
+        self.send = cam.sendcommand
+        self.commands = []
+        self.hold = hold
+        self.started = threading.Event()
+
+    def __call__(self, cmd, param=None, **kwargs):
+        self.commands.append(cmd)
+        if cmd.startswith("set") and self.hold is not None:
+            self.started.set()
+            self.hold.wait(5)
+            self.hold = None
+        return self.send(cmd, param, **kwargs)
+
+
+class TestPatch(object):
+    def test_merge_onto_snapshot(self):
+        from foscontrol import Cam
+        from foscontrol.camera.patch import Patcher
+
+        cam = _cam(Cam)
+        cam._patcher = Patcher()
+        cam.sendcommand = sent = _Counting(cam)
+
+        assert cam.patchMotionDetectConfig(sensitivity="high", linkage=["ring"]).result == 0
+        assert cam.patchMotionDetectConfig(snapInterval=3).result == 0
+        assert cam.patchMotionDetectConfig(snapInterval=3) is None
+        assert sent.commands == ["getMotionDetectConfig", "setMotionDetectConfig",
+                                 "setMotionDetectConfig"]
+
+        cfg = cam.getMotionDetectConfig()
+        assert cfg._sensitivity == "high" and cfg._linkage == ["ring"]
+        assert cfg.snapInterval == "3" and len(cfg._schedules) == 7
+
+        # a write through the normal setter makes the snapshot unknown
+        cam.setMotionDetectConfig(False, [], 1, 0, "low", ["0" * 48] * 7, ["0" * 10] * 10)
+        cam.patchMotionDetectConfig(isEnable=True)
+        assert sent.commands[-2:] == ["getMotionDetectConfig", "setMotionDetectConfig"]
+        assert cam.getMotionDetectConfig()._sensitivity == "low"
+
+    def test_stale_snapshot_and_wifi(self):
+        from foscontrol import Cam
+        from foscontrol.camera.patch import Patcher
+
+        now = [0.0]
+        cam = _cam(Cam)
+        cam._patcher = Patcher(ttl=10, clock=lambda: now[0])
+        cam.sendcommand = sent = _Counting(cam)
+
+        cam.patchWifiConfig(ssid="home", authMode="Shared key", psk="a b&c")
+        now[0] = 11
+        cam.patchWifiConfig(netType=1)
+        assert sent.commands.count("getWifiConfig") == 2
+        assert cam._patcher.reads == 2 and cam._patcher.writes == 2
+        cfg = cam.getWifiConfig()
+        assert (cfg.ssid, cfg.netType, cfg.psk, cfg._auth_desc) == ("home", "1", "a b&c", "Shared key")
+
+    def test_concurrent_patches_merge(self):
+        from foscontrol import Cam
+        from foscontrol.camera.patch import Patcher
+
+        cam = _cam(Cam)
+        cam._patcher = Patcher()
+        hold = threading.Event()
+        cam.sendcommand = sent = _Counting(cam, hold)
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(
+            cam.patchMotionDetectConfig(sensitivity="low")))
+        first.start()
+        assert sent.started.wait(5)
+        others = [threading.Thread(target=lambda kw=kw: results.append(
+            cam.patchMotionDetectConfig(**kw)))
+            for kw in ({"snapInterval": 2}, {"triggerInterval": 1}, {"snapInterval": 4})]
+        for t in others:
+            t.start()
+        while cam._patcher._open.get((cam.base, "setMotionDetectConfig")) is None or \
+                cam._patcher._open[(cam.base, "setMotionDetectConfig")].patches < 3:
+            threading.Event().wait(0.01)
+        hold.set()
+        for t in [first] + others:
+            t.join(5)
+
+        assert sent.commands.count("setMotionDetectConfig") == 2
+        assert len(results) == 4 and all(r.result == 0 for r in results)
+        assert cam._patcher.merged == 2
+        cfg = cam.getMotionDetectConfig()
+        assert (cfg.snapInterval, cfg.triggerInterval, cfg._sensitivity) == ("4", "1", "low")
@@ -0,0 +1,70 @@
+# coding=utf-8
+
+import asyncio
+
+import pytest
+
+BASE = 1767225600
+
+
+class TestRecordList(object):
+    def test_parse(self):
+        from foscontrol.camera import RecordEntry, ResultObj
+        from foscontrol.camera.recordlist import parse_page, parse_record
+
+        entry = parse_record("/mnt/sd/a,b.avi,100,160,1")
+        assert entry == RecordEntry("/mnt/sd/a,b.avi", 100, 160, 1) and entry.duration == 60
+        assert parse_record("/mnt/sd/x.avi,100") is None
+        page = ResultObj({"result": "0", "totalCnt": "12", "curCnt": "3",
+                          "record0": "/a.avi,1,2,0", "record1": "broken", "record2": "/c.avi,5,6,1"})
+        assert parse_page(page) == ([("/a.avi", 1, 2, 0), ("/c.avi", 5, 6, 1)], 12, 3)
+        with pytest.raises(RuntimeError):
+            parse_page(ResultObj({"result": "-2"}))
+
+    def test_iterate_pages(self):
+        from foscontrol import AsyncCamBase, CamBase
+        from foscontrol.simulator import CameraProfile, Simulator
+
+        sim = Simulator()
+        vcam = sim.add_camera(profile=CameraProfile(record_count=25))
+        with sim:
+            cam = CamBase("http", *vcam.address, "admin", "")
+            entries = list(cam.iterRecordList(0))
+            assert len(entries) == 25 and vcam.requests == 3
+            assert entries[11].path.endswith("alarm_000011.avi")
+            assert [e.start for e in entries] == sorted(e.start for e in entries)
+
+            # overlaps recordings 5 .. 20, two pages
+            start = vcam.requests
+            window = list(cam.iterRecordList(0, BASE + 600 * 5 + 30, BASE + 600 * 20))
+            assert (window[0].start, window[-1].start) == (BASE + 3000, BASE + 12000)
+            assert len(window) == 16 and vcam.requests - start == 2
+
+            async def walk():
+                acam = AsyncCamBase("http", *vcam.address, "admin", "")
+                return [e async for e in acam.iterRecordList(0, recordType=1)]
+            assert [e.path for e in asyncio.run(walk())] == [e.path for e in entries]
+
+    def test_fleet_merge(self):
+        from foscontrol.fleet import CamFleet
+        from foscontrol.simulator import CameraProfile, CommandProfile, Simulator
+
+        sim = Simulator()
+        for name, count in (("a", 12), ("b", 3), ("c", 25)):
+            sim.add_camera(name, profile=CameraProfile(record_count=count))
+        sim.add_camera("broken", profile=CameraProfile(
+            commands={"getRecordList": CommandProfile(error_rate=1.0)}))
+        with sim:
+            fleet = CamFleet(sim.inventory())
+            try:
+                errors = {}
+                merged = list(fleet.records(0, endTime=BASE + 600 * 15, errors=errors))
+                assert list(errors) == ["broken"]
+                assert len(merged) == 12 + 3 + 16
+                starts = [entry.start for _, entry in merged]
+                assert starts == sorted(starts)
+                assert [name for name, _ in merged[:3]] == ["a", "b", "c"]
+                with pytest.raises(RuntimeError):
+                    list(fleet.records(0))
+            finally:
+                fleet.close()
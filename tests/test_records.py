@@ -0,0 +1,122 @@
+# coding=utf-8
+
+import io
+import pickle
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+
+class _Simulated(object):
+    """url_opener stand-in answering from a VirtualCamera"""
+
+    def __init__(self):
+        from foscontrol.simulator import VirtualCamera
+        self.vcam = VirtualCamera("rec")
+
+    def __call__(self, url, **kwargs):
+        query = {k: v[0] for k, v in parse_qs(urlsplit(url).query,
+                                              keep_blank_values=True).items()}
+        return io.BytesIO(self.vcam.handle(query.pop("cmd"), query)[2])
+
+
+def _cam(cls, **kwargs):
+    cam = cls("http", "127.0.0.1", 88, "admin", "", coalesce=[], **kwargs)
+    cam.url_opener = _Simulated()
+    return cam
+
+
+class TestResultRecord(object):
+    def test_typed_fields(self):
+        from foscontrol import CamBase
+        from foscontrol.camera.commands import DevStateRecord
+
+        res = _cam(CamBase, typed=True).getDevState()
+        assert type(res) is DevStateRecord
+        assert not hasattr(res, "__dict__")
+        assert res.result == 0 and res._result == "Success"
+        assert res.motionDetectAlarm == 1 and res.sdFreeSpace == "7340032k"
+        assert res.get("sdState") == 1 and res.url is None
+        assert res.data["IOAlarm"] == 0 and res.data["_result"] == "Success"
+
+        mirror = _cam(CamBase, typed=True).getMirrorAndFlipSetting()
+        assert mirror.isMirror is False
+
+    def test_compatible_with_resultobj(self):
+        from foscontrol import CamBase, ResultObj
+        from foscontrol.camera.commands import RECORDS
+
+        assert type(_cam(CamBase).getDevState()) is ResultObj
+        assert type(_cam(CamBase, typed=True).getDevName()) is ResultObj
+
+        res = RECORDS["getDevInfo"]({"result": "0", "year": "2026", "newField": "x"})
+        assert res.year == 2026 and res.newField == "x"
+        assert res.mon is None and res.missing is None
+        res.set("_note", [1, 2])
+        res.set("day", 3)
+        assert res.get("_note") == [1, 2] and res.day == 3
+
+    def test_cam_decoders(self):
+        from foscontrol import Cam
+
+        cam = _cam(Cam, typed=True)
+        cam.setMotionDetectConfig(True, ["ring"], 1, 0, "high", ["1" * 48] * 7,
+                                  ["0" * 10] * 10)
+        res = cam.getMotionDetectConfig()
+        assert res.isEnable is True and res.linkage == 1
+        assert res._sensitivity == "high" and res._schedules == ["1" * 48] * 7
+        assert res._linkage == ["ring"]
+
+    def test_pickle(self):
+        from foscontrol import CamBase
+
+        res = _cam(CamBase, typed=True).getDevState()
+        res.set("_note", "x")
+        copy = pickle.loads(pickle.dumps(res))
+        assert copy == res and copy._note == "x"
+
+
+    def test_copy(self):
+        from foscontrol import CamBase
+        from foscontrol.camera.commands import _decode_motion_detect_config
+        from foscontrol.camera.result import ResultObj, copy_result
+
+        for res in (_cam(CamBase, typed=True).getDevState(), _cam(CamBase).getDevState()):
+            copy = res.copy()
+            copy.set("motionDetectAlarm", 2)
+            copy.set("_note", "x")
+            assert res.get("motionDetectAlarm") != 2 and res.get("_note") is None
+            assert type(copy) is type(res) and copy.result == 0
+        assert copy_result(b"raw") == b"raw"
+
+        res = _decode_motion_detect_config(ResultObj({"result": "0", "sensitivity": "2"}))
+        assert res.copy()._sensitivity == "high" and "_sensitivity" not in res._data
+
+
+class TestDerivedFields(object):
+    def test_computed_on_first_access(self):
+        from foscontrol.camera.commands import _decode_motion_detect_config
+        from foscontrol.camera.result import ResultObj
+
+        res = _decode_motion_detect_config(ResultObj({
+            "result": "0", "sensitivity": "2", "linkage": "3",
+            **{f"schedule{d}": "1" * 47 for d in range(7)}}))
+        assert "_sensitivity" not in res._data
+        assert res._sensitivity == "high" and res.get("_linkage") == ["ring", "mail"]
+        assert "_sensitivity" in res._data and "_schedules" not in res._data
+        # bad binary strings only fail when the derived field is read
+        with pytest.raises(ValueError):
+            res._schedules
+        res.set("schedule0", None)
+        assert res._schedules is None and res._areas is None
+        assert "_sensitivity" in res.data
+
+    def test_records_and_pickle(self):
+        from foscontrol import Cam
+
+        cam = _cam(Cam, typed=True)
+        res = cam.getWifiConfig()
+        assert res._extra is None
+        assert res._auth_desc == "Open Mode"
+        copy = pickle.loads(pickle.dumps(cam.getPTZSpeed()))
+        assert copy._extra == {"_speed_desc": "normal speed"}
@@ -0,0 +1,55 @@
+# coding=utf-8
+
+import pytest
+
+from .test_records import _cam
+
+
+class TestMotionSchedule(object):
+    def test_compile_and_query(self):
+        from foscontrol.camera import MotionSchedule
+
+        sched = MotionSchedule.compile("mon-fri 08:00-18:00, 20:00-20:30\nsun 23:00-01:00")
+        assert sched.active(0, 16) and not sched.active(0, 15) and sched.active(4, 35)
+        assert not sched.active(5, 16) and sched.active_at(6, 23, 45)
+        assert sched.active(0, 0) and sched.active(0, 1) and not sched.active(0, 2)
+        assert sched.intervals(0) == [(0, 2), (16, 36), (40, 41)]
+        assert sched.describe().startswith("mon 00:00-01:00, 08:00-18:00, 20:00-20:30; tue")
+        assert MotionSchedule.compile(sched.describe()) == sched
+        assert MotionSchedule.compile("daily 00:00-24:00") == MotionSchedule.always()
+        assert MotionSchedule.compile("sat, sun 10:00-12:00") == MotionSchedule.compile("sat,sun 10:00-12:00")
+        assert MotionSchedule.compile("sat , sun 10:00-12:00").intervals(6) == [(20, 24)]
+        for spec in ("mon 08:15-09:00", "funday 08:00-09:00", "mon", "mon 08:00"):
+            with pytest.raises(ValueError):
+                MotionSchedule.compile(spec)
+
+    def test_cgi_round_trip(self):
+        from foscontrol.camera import MotionSchedule
+        from foscontrol.utils import binaryarray2int
+
+        strings = [format((0xF0F0F0F0F0F0 >> d) | 1 << 47, "048b") for d in range(7)]
+        sched = MotionSchedule.from_cgi(strings)
+        assert sched.to_strings() == strings
+        assert sched.to_cgi() == binaryarray2int(strings)
+        assert MotionSchedule.from_cgi(sched.to_cgi()) == sched
+        assert sched.active(0, 47) and sched.active(0, 4) and not sched.active(0, 0)
+
+    def test_diff(self):
+        from foscontrol.camera import MotionSchedule
+        from foscontrol.camera.schedule import schedule_changes
+
+        old = MotionSchedule.compile("mon-fri 08:00-18:00")
+        new = MotionSchedule.compile("mon-thu 08:00-18:00; sat 08:00-09:00")
+        on, off = old.diff(new)
+        assert on.describe() == "sat 08:00-09:00" and off.describe() == "fri 08:00-18:00"
+        assert old.changed_days(new) == [4, 5]
+        assert schedule_changes([("a", old), ("b", new)], new) == [("a", [4, 5])]
+
+    def test_cam(self):
+        from foscontrol.camera import MotionSchedule
+        from foscontrol import Cam
+
+        cam = _cam(Cam)
+        sched = MotionSchedule.compile("sat,sun 10:00-12:00")
+        cam.setMotionDetectConfig(True, ["ring"], 1, 0, "high", sched, ["0" * 10] * 10)
+        assert cam.getMotionDetectConfig()._schedule == sched
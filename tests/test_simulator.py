@@ -0,0 +1,113 @@
+# coding=utf-8
+
+import time
+import threading
+import http.client
+
+import pytest
+
+
+@pytest.fixture
+def sim():
+    from foscontrol.simulator import Simulator
+
+    simulator = Simulator()
+    yield simulator
+    simulator.stop()
+
+
+class TestSimulator(object):
+    def test_cam_against_simulator(self, sim):
+        from foscontrol import Cam
+        from foscontrol.utils.network import ConnectionPool
+
+        vcam = sim.add_camera("front", password="secret")
+        sim.start()
+        cam = Cam("http", *vcam.address, "admin", "secret", pool=ConnectionPool())
+
+        assert cam.getDevInfo().devName == "front"
+        cfg = cam.getMotionDetectConfig()
+        assert cfg.isEnable is False
+        schedules = ["1" * 48] * 7
+        areas = ["0" * 9 + "1"] * 10
+        assert cam.setMotionDetectConfig(True, ["ring"], 1, 0, "high", schedules, areas).result == 0
+        cfg = cam.getMotionDetectConfig()
+        assert cfg.isEnable is True
+        assert cfg._schedules == schedules and cfg._areas == areas
+        assert cfg._sensitivity == "high" and cfg._linkage == ["ring"]
+
+        assert cam.snapPicture2() == vcam.snapshot
+        assert Cam("http", *vcam.address, "admin", "wrong").getDevState().result == -2
+
+    def test_error_injection(self, sim):
+        from foscontrol import Cam
+        from foscontrol.simulator import CameraProfile, CommandProfile
+
+        profile = CameraProfile(commands={"getDevState": CommandProfile(error_rate=1.0)})
+        vcam = sim.add_camera(profile=profile)
+        sim.start()
+        cam = Cam("http", *vcam.address, "admin", "")
+        assert cam.getDevState().result == -4
+        assert cam.getDevInfo().result == 0
+        assert vcam.errors == 1
+
+    def test_serialized_cgi(self, sim):
+        from foscontrol import CamBase
+        from foscontrol.simulator import CameraProfile, CommandProfile
+
+        slow = CommandProfile(latency=0.1)
+        serial = sim.add_camera("serial", profile=CameraProfile(slow))
+        parallel = sim.add_camera("parallel", profile=CameraProfile(slow, serialize=False))
+        sim.start()
+
+        def elapsed(vcam):
+            cam = CamBase("http", *vcam.address, "admin", "", coalesce=[])
+            threads = [threading.Thread(target=cam.getDevState) for _ in range(3)]
+            start = time.monotonic()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            return time.monotonic() - start
+
+        assert elapsed(serial) >= 0.3
+        assert elapsed(parallel) < 0.25
+
+    def test_virtual_hosts(self, sim):
+        cams = sim.add_cameras(3, vhosts=True)
+        sim.start()
+        assert len({cam.address for cam in cams}) == 1
+
+        host, port = cams[0].address
+        conn = http.client.HTTPConnection(host, port)
+        for cam in cams:
+            conn.request("GET", "/cgi-bin/CGIProxy.fcgi?cmd=getDevInfo&usr=admin&pwd=",
+                         headers={"Host": f"{cam.name}:{port}"})
+            assert f"<devName>{cam.name}</devName>".encode() in conn.getresponse().read()
+        conn.close()
+
+    def test_mjpeg_stream(self, sim):
+        from foscontrol import CamBase
+        from foscontrol.simulator import CameraProfile
+
+        vcam = sim.add_camera(profile=CameraProfile(snapshot_size=5000, mjpeg_fps=50))
+        sim.start()
+        cam = CamBase("http", *vcam.address, "admin", "")
+        with cam.openMJStream() as stream:
+            frames = []
+            for frame in stream:
+                frames.append(bytes(frame))
+                if len(frames) == 3:
+                    break
+        assert frames == [vcam.snapshot] * 3
+
+    def test_record_list(self, sim):
+        from foscontrol import CamBase
+        from foscontrol.simulator import CameraProfile
+
+        vcam = sim.add_camera(profile=CameraProfile(record_count=12))
+        sim.start()
+        res = CamBase("http", *vcam.address, "admin", "").sendcommand(
+            "getRecordList", {"recordPath": 0, "startNo": 10})
+        assert res.totalCnt == "12" and res.curCnt == "2"
+        assert res.record1.startswith("/mnt/sd/record/alarm_000011.avi,")
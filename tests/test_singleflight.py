@@ -0,0 +1,155 @@
+# coding=utf-8
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+
+def _reply(request):
+    time.sleep(0.2)
+    return "<CGI_Result><result>0</result></CGI_Result>"
+
+
+@pytest.fixture
+def stub(stub_camera):
+    return stub_camera(_reply)
+
+
+@pytest.fixture
+def server(stub):
+    return stub.address
+
+
+def _parallel(fn, n):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(fn())) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestCoalescing(object):
+    def test_getters_share_one_request(self, server, stub):
+        from foscontrol import Cam
+
+        host, port = server
+        cam = Cam("http", host, port, "admin", "")
+        results = _parallel(cam.getDevState, 8)
+        assert len(results) == 8 and all(r.result == 0 for r in results)
+        # each caller has a result of its own
+        assert len({id(r) for r in results}) == 8
+        results[0].set("motionDetectAlarm", "9")
+        assert results[1].motionDetectAlarm is None
+        assert stub.calls == ["getDevState"]
+
+    def test_moves_never_merged(self, server, stub):
+        from foscontrol import Cam
+
+        host, port = server
+        cam = Cam("http", host, port, "admin", "")
+        _parallel(cam.ptzMoveUp, 3)
+        assert stub.calls == ["ptzMoveUp"] * 3
+
+    def test_configurable(self, server, stub):
+        from foscontrol import Cam
+
+        host, port = server
+        cam = Cam("http", host, port, "admin", "", coalesce=[])
+        _parallel(cam.getDevState, 3)
+        assert len(stub.calls) == 3
+        with pytest.raises(ValueError):
+            Cam("http", host, port, "admin", "", coalesce=["ptzMoveUp"])
+
+    def test_async(self, server, stub):
+        from foscontrol import AsyncCam
+
+        host, port = server
+
+        async def run():
+            cam = AsyncCam("http", host, port, "admin", "")
+            return await asyncio.gather(*[cam.getDevState() for _ in range(5)])
+
+        results = asyncio.run(run())
+        assert len(results) == 5 and len({id(r) for r in results}) == 5
+        assert stub.calls == ["getDevState"]
+
+    def test_errors_shared(self):
+        from foscontrol.utils.singleflight import SingleFlight
+
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.1)
+            raise OSError("down")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("k", fail)
+            except OSError as e:
+                errors.append(e)
+
+        _parallel(call, 4)
+        assert len(errors) == 4 and flight.executed == 1 and flight.coalesced == 3
+
+    def test_async_leader_cancelled(self):
+        from foscontrol.utils.singleflight import AsyncSingleFlight
+
+        flight = AsyncSingleFlight()
+        started = []
+
+        async def slow():
+            started.append(1)
+            await asyncio.sleep(0.1)
+            return "done"
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do("k", slow))
+            follower = asyncio.ensure_future(flight.do("k", slow))
+            await asyncio.sleep(0.02)
+            leader.cancel()
+            assert await follower == "done"
+            assert leader.cancelled()
+
+            # without anyone waiting the request is cancelled
+            alone = asyncio.ensure_future(flight.do("k", slow))
+            await asyncio.sleep(0.02)
+            alone.cancel()
+            await asyncio.sleep(0)
+            assert flight._calls == {}
+            return await flight.do("k", slow)
+
+        assert asyncio.run(run()) == "done"
+        assert len(started) == 3 and flight.executed == 3 and flight.coalesced == 1
+
+    def test_followers_bounded_by_deadline(self, server, stub):
+        from foscontrol import AsyncCam, Cam
+        from foscontrol.utils import CamTimeoutError
+
+        host, port = server
+        cam = Cam("http", host, port, "admin", "")
+        leader = threading.Thread(target=cam.getDevState)
+        leader.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        with pytest.raises(CamTimeoutError) as info:
+            cam.sendcommand("getDevState", timeout=0.05)
+        assert time.monotonic() - start < 0.12 and info.value.phase == "response"
+        leader.join()
+
+        async def run():
+            acam = AsyncCam("http", host, port, "admin", "")
+            first = asyncio.ensure_future(acam.getDevState())
+            await asyncio.sleep(0.05)
+            with pytest.raises(CamTimeoutError):
+                with acam.budget(0.05):
+                    await acam.getDevState()
+            return await first
+
+        assert asyncio.run(run()).result == 0
+        assert stub.calls == ["getDevState"] * 2
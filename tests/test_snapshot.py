@@ -0,0 +1,85 @@
+# coding=utf-8
+
+import io
+import asyncio
+import socket
+import threading
+
+import pytest
+
+JPEG = b"\xff\xd8" + bytes(range(256)) * 1200 + b"\xff\xd9"
+
+
+def _reply(request):
+    if request.query["pwd"][0] == "secret":
+        return JPEG
+    return b"<CGI_Result>\n    <result>-2</result>\n</CGI_Result>\n"
+
+
+@pytest.fixture
+def server(stub_camera):
+    return stub_camera(_reply).address
+
+
+class TestSnapPictureTo(object):
+    def test_file(self, server):
+        from foscontrol import Cam
+        from foscontrol.utils.network import ConnectionPool
+
+        pool = ConnectionPool()
+        cam = Cam("http", *server, "admin", "secret", pool=pool)
+        out = io.BytesIO()
+        info = cam.snapPictureTo(out, chunk_size=4096)
+        assert info.ok and info.nbytes == len(JPEG)
+        assert out.getvalue() == JPEG
+        assert 0 <= info.first_byte <= info.elapsed
+        # connection went back to the pool
+        assert sum(len(idle) for idle in pool._idle.values()) == 1
+
+    def test_buffer(self, server):
+        from foscontrol import Cam
+
+        cam = Cam("http", *server, "admin", "secret")
+        buf = bytearray(len(JPEG))
+        info = cam.snapPictureTo(buf)
+        assert info.nbytes == len(JPEG) and bytes(buf) == JPEG
+
+        with pytest.raises(ValueError):
+            cam.snapPictureTo(bytearray(1000))
+
+    def test_socket(self, server):
+        from foscontrol import Cam
+
+        cam = Cam("http", *server, "admin", "secret")
+        a, b = socket.socketpair()
+        received = bytearray()
+        reader = threading.Thread(target=lambda: [received.extend(c) for c in iter(lambda: b.recv(65536), b"")])
+        reader.start()
+        info = cam.snapPictureTo(a)
+        a.close()
+        reader.join()
+        b.close()
+        assert info.nbytes == len(JPEG) and bytes(received) == JPEG
+
+    def test_error_answer(self, server):
+        from foscontrol import Cam
+
+        cam = Cam("http", *server, "admin", "wrong")
+        out = io.BytesIO()
+        info = cam.snapPictureTo(out)
+        assert not info.ok and info.nbytes == 0
+        assert info.result.result == -2
+        assert out.getvalue() == b""
+
+    def test_async(self, server):
+        from foscontrol import AsyncCam
+
+        async def run():
+            out = io.BytesIO()
+            ok = await AsyncCam("http", *server, "admin", "secret").snapPictureTo(out)
+            err = await AsyncCam("http", *server, "admin", "wrong").snapPictureTo(io.BytesIO())
+            return out.getvalue(), ok, err
+
+        data, ok, err = asyncio.run(run())
+        assert data == JPEG and ok.nbytes == len(JPEG)
+        assert err.result.result == -2
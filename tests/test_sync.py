@@ -0,0 +1,87 @@
+# coding=utf-8
+
+
+class TestFleetSync(object):
+    def test_plan_and_apply(self):
+        from foscontrol.camera import MotionSchedule
+        from foscontrol.fleet import CamFleet, FleetSync
+        from foscontrol.simulator import Simulator
+
+        sim = Simulator()
+        vcams = sim.add_cameras(4)
+        vcams[0].state["infraLedConfig"]["mode"] = 1
+        vcams[1].state["ptzSpeed"]["speed"] = 1
+        with sim:
+            fleet = CamFleet(sim.inventory(), max_concurrency=4)
+            try:
+                week = MotionSchedule.compile("daily 22:00-06:00")
+                sync = FleetSync(fleet, {
+                    "infraLed": {"mode": "auto"},
+                    "ptzSpeed": {"speed": "normal speed"},
+                    "motion": {"sensitivity": "high", "schedules": week},
+                    "time": {"timeFormat": "24 hours"},
+                })
+                plan = sync.plan()
+                assert not plan.errors and plan.unchanged == []
+                assert sorted(c.setter for c in plan.by_camera()["cam0000"]) == [
+                    "setInfraLedConfig", "setMotionDetectConfig"]
+                change = [c for c in plan.changes if c.camera == "cam0001"
+                          and c.setter == "setPTZSpeed"][0]
+                assert change.fields == {"speed": ("1", "2")}
+                assert all(vcam.requests == 4 for vcam in vcams)
+                assert "6 writes on 4 cameras" in plan.describe()
+
+                results = list(sync.apply(plan))
+                assert len(results) == 4 and all(r.ok for r in results)
+                assert vcams[0].state["infraLedConfig"]["mode"] == 0
+                assert vcams[2].state["motionDetectConfig"]["sensitivity"] == 2
+                assert vcams[3].state["motionDetectConfig"]["schedule0"] == week.day(0)
+
+                plan, results = sync.sync()
+                assert len(plan) == 0 and results == []
+                assert sorted(plan.unchanged) == [v.name for v in vcams]
+            finally:
+                fleet.close()
+
+    def test_unknown_argument(self):
+        import pytest
+        from foscontrol.fleet import CamFleet, FleetSync
+
+        with pytest.raises(ValueError):
+            FleetSync(CamFleet([]), {"ptzSpeed": {"sped": "fast"}})
+        with pytest.raises(ValueError):
+            FleetSync(CamFleet([]), {"ptzSpeed": {"speed": "warp"}})
+
+    def test_writes_update_cache_and_patches(self):
+        import time
+        from foscontrol.camera import ResultCache
+        from foscontrol.camera.patch import Patcher
+        from foscontrol.fleet import CamFleet, FleetSync
+        from foscontrol.simulator import Simulator
+
+        sim = Simulator()
+        vcam = sim.add_camera("one")
+        vcam.state["devTimeConfig"]["timeZone"] = -3600
+        with sim:
+            fleet = CamFleet(sim.inventory(), cache=ResultCache())
+            try:
+                cam = fleet.camera("one")
+                cam._patcher = Patcher()
+                assert cam.getMirrorAndFlipSetting().isMirror is False
+                cam.patchMotionDetectConfig(sensitivity="high")
+
+                sync = FleetSync(fleet, {"mirrorFlip": {"isMirror": True},
+                                         "motion": {"snapInterval": 7},
+                                         "time": {"timeFormat": "12 hours"}})
+                plan = sync.plan()
+                clock = [c for c in plan.changes if c.setter == "setSystemTime"][0]
+                assert clock.params["hour"] == ""
+                assert sync._complete(clock)["hour"] == str(time.gmtime(time.time() + 3600).tm_hour)
+                assert all(r.ok for r in sync.apply(plan))
+
+                assert cam.getMirrorAndFlipSetting().isMirror is True
+                cam.patchMotionDetectConfig(sensitivity="low")
+                cfg = cam.getMotionDetectConfig()
+                assert cfg.snapInterval == "7" and cfg._sensitivity == "low"
+            finally:
+                fleet.close()
@@ -0,0 +1,142 @@
+# coding=utf-8
+
+import json
+import time
+
+
+class TestTokenBucket(object):
+    def test_reserve(self):
+        from foscontrol.fleet import TokenBucket
+
+        now = [0.0]
+        bucket = TokenBucket(100, clock=lambda: now[0])
+        assert bucket.reserve(100) == 0.0
+        assert bucket.reserve(50) == 0.5
+        now[0] = 1.0
+        assert bucket.reserve(50) == 0.0
+        now[0] = 100.0
+        # idle credit is capped at the burst
+        assert bucket.reserve(150) == 0.5
+        bucket.refund(1000)
+        assert bucket.tokens == 100
+
+    def test_resent_body(self):
+        from foscontrol.fleet import TokenBucket
+        from foscontrol.fleet.upload import _ThrottledBody
+        from foscontrol.utils.network import MultipartEncoder
+
+        bucket = TokenBucket(1e6, clock=lambda: 0.0)
+        sent = []
+        body = _ThrottledBody(MultipartEncoder({"a": "x" * 100}, {}, chunk_size=32),
+                              [bucket], sent.append)
+        first = b"".join(body)
+        # a retry on a fresh connection sends it again
+        assert b"".join(body) == first
+        assert sent[-1] == len(body) == len(first) and max(sent) == len(first)
+        assert bucket.tokens == 1e6 - len(first)
+
+
+class TestFleetUpload(object):
+    def test_rollout_and_resume(self, tmp_path):
+        from foscontrol.fleet import CamFleet, FleetUpload
+        from foscontrol.simulator import Simulator
+
+        image = tmp_path / "backup.bin"
+        image.write_bytes(bytes(range(256)) * 1200)
+        progress = tmp_path / "rollout.json"
+
+        sim = Simulator()
+        vcams = sim.add_cameras(3)
+        with sim:
+            fleet = CamFleet(sim.inventory(), max_concurrency=4)
+            try:
+                upload = FleetUpload(fleet, "importConfig", str(image), rate=600e3,
+                                     site_rate=1e6, sites={"cam0000": "a", "cam0001": "a"},
+                                     per_site=1, progress=str(progress))
+                start = time.monotonic()
+                results = list(upload.run())
+                assert time.monotonic() - start >= 0.4
+                assert len(results) == 3 and all(r.ok for r in results)
+                assert results[0].value.firmwareVer is not None
+                size = vcams[0].uploads[0][1]
+                assert size > image.stat().st_size
+                assert all(v.uploads == [("importConfig", size)] for v in vcams)
+
+                saved = json.loads(progress.read_text())
+                assert saved["upload"].startswith("importConfig:backup.bin:307200:")
+                assert {c["state"] for c in saved["cameras"].values()} == {"verified"}
+                assert saved["cameras"]["cam0002"]["sent"] == size
+
+                # a new run with the same file only redoes what is not verified
+                saved["cameras"]["cam0001"]["state"] = "uploaded"
+                saved["cameras"]["cam0002"]["state"] = "failed"
+                progress.write_text(json.dumps(saved))
+                again = FleetUpload(fleet, "importConfig", str(image), progress=str(progress))
+                assert again.pending() == ["cam0001", "cam0002"]
+                assert sorted(r.name for r in again.run()) == ["cam0001", "cam0002"]
+                assert [len(v.uploads) for v in vcams] == [1, 1, 2]
+                assert again.progress.summary() == {"verified": 3}
+
+                rejected = FleetUpload(fleet, "importConfig", str(image),
+                                       verify=lambda info: info.firmwareVer == "9.9",
+                                       verify_timeout=0.1, verify_interval=0.05)
+                failed = list(rejected.run(cameras=["cam0000"]))
+                assert not failed[0].ok and "Not verified" in str(failed[0].error)
+                assert rejected.progress.state("cam0000") == "failed"
+            finally:
+                fleet.close()
+
+    def test_busy_site_leaves_slots_to_others(self, tmp_path):
+        from foscontrol.fleet import CamFleet, FleetUpload
+        from foscontrol.simulator import CameraProfile, CommandProfile, Simulator
+
+        image = tmp_path / "backup.bin"
+        image.write_bytes(b"\0" * 1024)
+
+        sim = Simulator()
+        sim.add_cameras(4, profile=CameraProfile(
+            commands={"importConfig": CommandProfile(latency=0.3)}))
+        with sim:
+            # as many workers as cameras a busy site could tie up
+            fleet = CamFleet(sim.inventory(), max_concurrency=2)
+            try:
+                # three cameras behind one uplink, more than the global slots
+                upload = FleetUpload(fleet, "importConfig", str(image), parallel=2, per_site=1,
+                                     sites={"cam0000": "a", "cam0001": "a", "cam0002": "a",
+                                            "cam0003": "b"})
+                start = time.monotonic()
+                done = {}
+                for res in upload.run():
+                    assert res.ok
+                    done[res.name] = time.monotonic() - start
+                # b's upload runs alongside the first of a's, not after it
+                assert done["cam0003"] < 0.5
+                assert max(done.values()) >= 0.9
+            finally:
+                fleet.close()
+
+    def test_run_timeout_ends_verification(self, tmp_path):
+        from foscontrol.fleet import CamFleet, FleetUpload
+        from foscontrol.simulator import CameraProfile, CommandProfile, Simulator
+
+        image = tmp_path / "backup.bin"
+        image.write_bytes(b"\0" * 1024)
+
+        sim = Simulator()
+        sim.add_camera(profile=CameraProfile(
+            commands={"getDevInfo": CommandProfile(latency=1.0)}))
+        with sim:
+            fleet = CamFleet(sim.inventory())
+            try:
+                upload = FleetUpload(fleet, "importConfig", str(image), verify_timeout=5,
+                                     verify_interval=0.01)
+                assert not list(upload.run(timeout=0.3))[0].ok
+                # the worker gives up with the run instead of polling on
+                for _ in range(50):
+                    if upload.progress.state("cam0000") == "failed":
+                        break
+                    time.sleep(0.02)
+                assert upload.progress.state("cam0000") == "failed"
+                assert "timed out" in upload.progress.cameras["cam0000"]["error"]
+            finally:
+                fleet.close()
@@ -0,0 +1,41 @@
+# coding=utf-8
+
+import pytest
+
+BODIES = [
+    b"<CGI_Result>\n    <result>0</result>\n    <isEnable>1</isEnable>\n</CGI_Result>\n",
+    b"<CGI_Result>\r\n  <result>0</result>\r\n<a>x&amp;y&#65;&#x42;</a><b></b><d>1\r\n2</d></CGI_Result>\n",
+    b"<?xml version='1.0' encoding='UTF-8'?>\n<CGI_Result><result>0</result></CGI_Result>",
+    "<CGI_Result><ssid>café</ssid><x>1</x><x>2</x><x></x></CGI_Result>".encode(),
+    b"<CGI_Result></CGI_Result>",
+    # not flat: handled by the generic parser
+    b"<CGI_Result><result>0</result><a><![CDATA[x<y]]></a></CGI_Result>",
+    b"<CGI_Result><a b='1'>x</a><c/></CGI_Result>",
+    b"<CGI_Result><outer><inner>1</inner></outer></CGI_Result>",
+]
+
+
+class TestParseCgiResult(object):
+    @pytest.mark.parametrize("body", BODIES)
+    def test_same_as_dom(self, body):
+        from foscontrol.utils.xmlparse import parse_cgi_result, parse_generic
+        assert parse_cgi_result(body) == parse_generic(body)
+        assert list(parse_cgi_result(body)) == list(parse_generic(body))
+
+    def test_scanner_used_for_flat_answers(self):
+        from foscontrol.utils.xmlparse import parse_flat
+        assert parse_flat(BODIES[0]) == {"CGI_Result": "\n    ", "result": "0", "isEnable": "1"}
+        assert parse_flat(BODIES[5]) is None
+        assert parse_flat(b"<CGI_Result><a>&nbsp;</a></CGI_Result>") is None
+        assert parse_flat(b"<CGI_Result><a>x</b></CGI_Result>") is None
+
+    @pytest.mark.parametrize("body", [
+        b"<CGI_Result><a>&nbsp;</a></CGI_Result>",
+        b"<CGI_Result><a>&#11;</a></CGI_Result>",
+        b"<CGI_Result><a>x</b></CGI_Result>",
+    ])
+    def test_malformed_still_rejected(self, body):
+        from xml.parsers.expat import ExpatError
+        from foscontrol.utils.xmlparse import parse_cgi_result
+        with pytest.raises(ExpatError):
+            parse_cgi_result(body)